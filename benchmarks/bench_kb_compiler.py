@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compiled Knowledge Base Benchmark
+Compares load time and query latency of a compiled knowledge base with the JSON file it was
+compiled from, on synthetic corpora of several sizes.
+
+Usage:
+    python benchmarks/bench_kb_compiler.py [--sizes 1000,20000] [--queries 2000] [--scorer weighted]
+                                           [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from bench_pipeline import percentiles
+from kb_compiler import compile_knowledge_base
+from knowledge_retriever import KnowledgeRetriever
+from question_processor import QuestionProcessor
+from synthetic_corpus import generate_corpus, generate_queries, write_corpus
+
+
+def time_queries(path: str, queries: List[Dict], scorer: str) -> Dict:
+    """
+    Load a knowledge base and time every query against it.
+
+    Args:
+        path: Knowledge base JSON or compiled file
+        queries: Processed queries
+        scorer: Relevance scorer name
+
+    Returns:
+        Load time and query latency summary
+    """
+    start = time.perf_counter()
+    retriever = KnowledgeRetriever(path, scorer)
+    load_time = time.perf_counter() - start
+
+    perf_counter = time.perf_counter
+    samples = []
+    for query in queries:
+        t0 = perf_counter()
+        retriever.retrieve(query)
+        samples.append(perf_counter() - t0)
+
+    return {'load_time_s': load_time, 'latency': percentiles(samples)}
+
+
+def run_size(size: int, query_count: int, scorer: str, workdir: str) -> Dict:
+    """
+    Benchmark both formats of one corpus size.
+
+    Args:
+        size: Number of knowledge base entries
+        query_count: Number of queries
+        scorer: Relevance scorer name
+        workdir: Directory for the generated files
+
+    Returns:
+        Result dictionary
+    """
+    corpus = generate_corpus(size)
+    json_path = os.path.join(workdir, f"kb-{size}.json")
+    compiled_path = os.path.join(workdir, f"kb-{size}.kbc")
+    write_corpus(corpus, json_path)
+
+    start = time.perf_counter()
+    compile_knowledge_base(json_path, compiled_path)
+    compile_time = time.perf_counter() - start
+
+    processor = QuestionProcessor()
+    processor.set_vocabulary(corpus['data'])
+    queries = [processor.process_question(question) for question, _ in generate_queries(corpus, query_count)]
+    del corpus
+
+    return {
+        'size': size,
+        'compile_time_s': compile_time,
+        'json': time_queries(json_path, queries, scorer),
+        'compiled': time_queries(compiled_path, queries, scorer)
+    }
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,20000', help='Comma-separated knowledge base sizes')
+    parser.add_argument('--queries', type=int, default=2000, help='Queries per size')
+    parser.add_argument('--scorer', default='weighted', help='Relevance scorer name')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {'benchmark': 'kb_compiler', 'scorer': args.scorer, 'queries_per_size': args.queries, 'runs': []}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in [int(size) for size in args.sizes.split(',')]:
+            print(f"Benchmarking {size} entries...", file=sys.stderr)
+            results['runs'].append(run_size(size, args.queries, args.scorer, workdir))
+
+    print(f"{'size':>7} {'format':>9} {'load (s)':>9} {'mean (ms)':>10} {'p50 (ms)':>9} {'p95 (ms)':>9} "
+          f"{'p99 (ms)':>9} {'total (s)':>10}")
+    for run in results['runs']:
+        for name in ('json', 'compiled'):
+            latency = run[name]['latency']
+            print(f"{run['size']:>7} {name:>9} {run[name]['load_time_s']:>9.3f} {latency['mean_ms']:>10.3f} "
+                  f"{latency['p50_ms']:>9.3f} {latency['p95_ms']:>9.3f} {latency['p99_ms']:>9.3f} "
+                  f"{latency['mean_ms'] * latency['count'] / 1000:>10.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
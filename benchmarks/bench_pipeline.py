@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pipeline Benchmark
+Replays a synthetic query mix through QuestionProcessor, KnowledgeRetriever and AnswerGenerator
+at several knowledge base sizes, with the LLM replaced by a deterministic local stub.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 1000,10000,100000] [--queries 2000]
+                                        [--scorer weighted] [--shards 0] [--output results.json]
+                                        [--compare previous.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Add src directory and repository root (stub servers) to path
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, ROOT)
+
+from synthetic_corpus import generate_corpus, generate_queries, write_corpus
+
+STAGES = ['question_processor', 'knowledge_retriever', 'answer_generator', 'llm', 'total']
+
+
+def percentiles(samples: List[float]) -> Dict:
+    """
+    Summarize latency samples.
+
+    Args:
+        samples: Latencies in seconds
+
+    Returns:
+        Dictionary with count, mean and p50/p95/p99 in milliseconds
+    """
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean_ms': sum(ordered) / len(ordered) * 1000,
+        'p50_ms': pick(0.5),
+        'p95_ms': pick(0.95),
+        'p99_ms': pick(0.99),
+        'max_ms': ordered[-1] * 1000
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Get the peak resident set size of this process.
+
+    Returns:
+        Peak RSS in MiB, or None where the resource module is unavailable
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_worker(knowledge_base_path: str, queries_path: str, scorer: str, shards: int = 0) -> Dict:
+    """
+    Load one knowledge base and replay the query mix; runs in its own process
+    so that peak RSS and load time belong to this size alone.
+
+    Args:
+        knowledge_base_path: Path to the synthetic knowledge base
+        queries_path: Path to the JSON list of [question, is_follow_up] pairs
+        scorer: Relevance scorer name
+        shards: Number of retrieval worker processes (0 retrieves in this process)
+
+    Returns:
+        Result dictionary
+    """
+    from answer_generator import AnswerGenerator
+    from dialogue_manager import DialogueManager
+    from knowledge_retriever import KnowledgeRetriever
+    from llm_backend import LLMBackend
+    from question_processor import QuestionProcessor
+    from sharded_retriever import ShardedRetriever
+
+    with open(queries_path, 'r', encoding='utf-8') as f:
+        queries = json.load(f)
+    rss_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    if shards:
+        retriever = ShardedRetriever(knowledge_base_path, shards, scorer=scorer)
+    else:
+        retriever = KnowledgeRetriever(knowledge_base_path, scorer=scorer)
+    load_time = time.perf_counter() - start
+    rss_loaded = peak_rss_mb()
+
+    start = time.perf_counter()
+    question_processor = QuestionProcessor()
+    question_processor.set_terms(retriever.index.terms())
+    vocabulary_time = time.perf_counter() - start
+    answer_generator = AnswerGenerator()
+    llm_backend = LLMBackend()
+    # Every miss reaches the stub, so LLM latency is measured per call
+    llm_backend.answer_cache = None
+    dialogue = DialogueManager()
+
+    samples = {stage: [] for stage in STAGES}
+    sources = {'knowledge_base': 0, 'llm': 0}
+    perf_counter = time.perf_counter
+
+    run_start = perf_counter()
+    for question, is_follow_up in queries:
+        query_start = perf_counter()
+        context = dialogue.get_recent_context() if is_follow_up else None
+
+        t0 = perf_counter()
+        query = question_processor.process_question(question, context)
+        t1 = perf_counter()
+        entries = retriever.retrieve(query)
+        t2 = perf_counter()
+        samples['question_processor'].append(t1 - t0)
+        samples['knowledge_retriever'].append(t2 - t1)
+
+        if entries:
+            answer = answer_generator.generate_answer(entries, query, context)
+            samples['answer_generator'].append(perf_counter() - t2)
+            sources['knowledge_base'] += 1
+        else:
+            answer = llm_backend.generate_answer(question, context)
+            samples['llm'].append(perf_counter() - t2)
+            sources['llm'] += 1
+
+        dialogue.add_turn('user', question, question_processor.analyze_turn(question, query=query))
+        dialogue.add_turn('system', answer,
+                          question_processor.analyze_turn(answer, entry_ids=[entry['id'] for entry in entries]))
+        samples['total'].append(perf_counter() - query_start)
+    elapsed = perf_counter() - run_start
+    if shards:
+        retriever.close()
+
+    return {
+        'entries': len(retriever.knowledge_base['data']),
+        'queries': len(queries),
+        'load_time_s': load_time,
+        'vocabulary_time_s': vocabulary_time,
+        'throughput_qps': len(queries) / elapsed if elapsed else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'index_rss_mb': rss_loaded - rss_before if rss_before is not None else None,
+        'sources': sources,
+        'latency': {stage: percentiles(samples[stage]) for stage in STAGES}
+    }
+
+
+def run_size(size: int, query_count: int, scorer: str, shards: int, workdir: str, env: Dict) -> Dict:
+    """
+    Generate the corpus of one size and benchmark it in a subprocess.
+
+    Args:
+        size: Number of knowledge base entries
+        query_count: Number of queries to replay
+        scorer: Relevance scorer name
+        shards: Number of retrieval worker processes
+        workdir: Directory for the generated files
+        env: Environment of the worker process
+
+    Returns:
+        Result dictionary
+    """
+    corpus = generate_corpus(size)
+    knowledge_base_path = os.path.join(workdir, f"kb-{size}.json")
+    queries_path = os.path.join(workdir, f"queries-{size}.json")
+    write_corpus(corpus, knowledge_base_path)
+    with open(queries_path, 'w', encoding='utf-8') as f:
+        json.dump(generate_queries(corpus, query_count), f, ensure_ascii=False)
+    del corpus
+
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', knowledge_base_path, queries_path, '--scorer', scorer,
+         '--shards', str(shards)],
+        env=env, check=True, stdout=subprocess.PIPE, text=True
+    ).stdout
+    # The worker prints its result as the last line, after any log output
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_commit() -> Optional[str]:
+    """
+    Get the current commit of the repository.
+
+    Returns:
+        Commit hash, or None outside a git checkout
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, check=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: Dict, previous: Optional[Dict] = None):
+    """
+    Print a results table, with ratios to a previous run if given.
+
+    Args:
+        results: Benchmark results
+        previous: Earlier results to compare against
+    """
+    previous_runs = {run['size']: run for run in previous['runs']} if previous else {}
+    print(f"{'size':>7} {'load (s)':>9} {'rss (MB)':>9} {'qps':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} "
+          f"{'p99 (ms)':>9} {'retrieve p95':>13}" + (f" {'qps vs prev':>12}" if previous else ''))
+    for run in results['runs']:
+        total, retrieve = run['latency']['total'], run['latency']['knowledge_retriever']
+        line = (f"{run['size']:>7} {run['load_time_s']:>9.3f} {run['peak_rss_mb'] or 0:>9.1f} "
+                f"{run['throughput_qps']:>9.1f} {total['p50_ms']:>9.3f} {total['p95_ms']:>9.3f} "
+                f"{total['p99_ms']:>9.3f} {retrieve['p95_ms']:>13.3f}")
+        if run['size'] in previous_runs:
+            line += f" {run['throughput_qps'] / previous_runs[run['size']]['throughput_qps']:>11.2f}x"
+        print(line)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Comma-separated knowledge base sizes')
+    parser.add_argument('--queries', type=int, default=2000, help='Queries replayed per size')
+    parser.add_argument('--scorer', default='weighted', help='Relevance scorer name')
+    parser.add_argument('--shards', type=int, default=0, help='Retrieval worker processes (0 for in-process)')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/pipeline-<commit>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare throughput against')
+    parser.add_argument('--worker', nargs=2, metavar=('KB', 'QUERIES'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker[0], args.worker[1], args.scorer, args.shards)))
+        return
+
+    from stub_llm_server import StubLLMServer
+
+    # Deterministic LLM replies with a fixed upstream delay
+    stub = StubLLMServer(delay=0.005)
+    stub.start()
+    env = dict(os.environ, OPENAI_API_KEY='bench-key', OPENAI_API_BASE=stub.base_url, LLM_CACHE_PATH=':memory:')
+
+    commit = git_commit()
+    results = {
+        'benchmark': 'pipeline',
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scorer': args.scorer,
+        'shards': args.shards,
+        'queries_per_size': args.queries,
+        'llm_stub_delay_s': stub.delay,
+        'runs': []
+    }
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for size in [int(size) for size in args.sizes.split(',')]:
+                print(f"Benchmarking {size} entries...", file=sys.stderr)
+                run = run_size(size, args.queries, args.scorer, args.shards, workdir, env)
+                run['size'] = size
+                results['runs'].append(run)
+    finally:
+        stub.stop()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{(commit or 'local')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    print_results(results, previous)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Question Processor Benchmark
+Measures the per-question cost of QuestionProcessor stages on a synthetic query mix,
+next to the regex and replace passes the compiled pipeline replaced.
+
+Usage:
+    python benchmarks/bench_question_processor.py [--size 10000] [--queries 5000] [--repeat 5]
+                                                  [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Callable, Dict, List
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from question_processor import YEAR_RELATED_WORDS, QuestionProcessor
+from segmenter import Segmenter
+from synthetic_corpus import generate_corpus, generate_queries
+
+# Question patterns as matched before the compiled pipeline, checked in dict order
+LEGACY_QUESTION_PATTERNS = {
+    'why': ['为什么', '为啥', '何故', '何以'],
+    'what': ['什么', '啥', '何谓', '是什么'],
+    'when': ['什么时候', '何时', '几时', '什么时候'],
+    'how': ['怎么', '如何', '怎样', '如何做'],
+    'where': ['哪里', '哪儿', '在什么地方', '位置']
+}
+
+
+def legacy_clean(question: str) -> str:
+    """
+    Clean a question with the two regex substitutions of the previous pipeline.
+
+    Args:
+        question: User question
+
+    Returns:
+        Cleaned question
+    """
+    cleaned = re.sub(r'[，。！？；："\'（）]', ' ', question)
+    return re.sub(r'\s+', ' ', cleaned).strip()
+
+
+def legacy_scan(question: str):
+    """
+    Find the intent, strip the question words and look up the year-related words
+    with the per-pattern passes of the previous pipeline.
+
+    Args:
+        question: Cleaned question
+
+    Returns:
+        Tuple of (intent, question without question words, year-related words found)
+    """
+    intent = 'what'
+    for pattern_intent, patterns in LEGACY_QUESTION_PATTERNS.items():
+        if any(pattern in question for pattern in patterns):
+            intent = pattern_intent
+            break
+    stripped = question
+    for patterns in LEGACY_QUESTION_PATTERNS.values():
+        for pattern in patterns:
+            stripped = stripped.replace(pattern, '')
+    year_words = [word for word in YEAR_RELATED_WORDS if word in question]
+    return intent, stripped, year_words
+
+
+def time_per_question(function: Callable[[str], object], questions: List[str], repeat: int) -> float:
+    """
+    Time a function over all questions and keep the best of several rounds.
+
+    Args:
+        function: Function called with each question
+        questions: Questions to process
+        repeat: Number of rounds
+
+    Returns:
+        Best time per question in microseconds
+    """
+    best = float('inf')
+    perf_counter = time.perf_counter
+    for _ in range(repeat):
+        start = perf_counter()
+        for question in questions:
+            function(question)
+        best = min(best, perf_counter() - start)
+    return best / len(questions) * 1e6
+
+
+def run(size: int, query_count: int, repeat: int) -> Dict:
+    """
+    Benchmark the question processor stages.
+
+    Args:
+        size: Number of synthetic knowledge base entries for the vocabulary
+        query_count: Number of questions in the mix
+        repeat: Number of timing rounds per stage
+
+    Returns:
+        Result dictionary with microseconds per question for each stage
+    """
+    corpus = generate_corpus(size)
+    questions = [question for question, _ in generate_queries(corpus, query_count)]
+
+    start = time.perf_counter()
+    processor = QuestionProcessor()
+    processor.set_vocabulary(corpus['data'])
+    vocabulary_time = time.perf_counter() - start
+    # Same dictionary without the LRU cache, so every question is segmented
+    uncached = QuestionProcessor(Segmenter.from_entries(corpus['data'], cache_size=0))
+
+    cleaned = [processor._clean_question(question) for question in questions]
+    legacy_cleaned = [legacy_clean(question) for question in questions]
+
+    stages = {
+        'clean_legacy_regex': time_per_question(legacy_clean, questions, repeat),
+        'clean_translate': time_per_question(processor._clean_question, questions, repeat),
+        'scan_legacy_replace': time_per_question(legacy_scan, legacy_cleaned, repeat),
+        'scan_longest_match': time_per_question(processor._scan, cleaned, repeat),
+        'process_question_uncached': time_per_question(uncached.process_question, questions, repeat),
+        'process_question': time_per_question(processor.process_question, questions, repeat),
+    }
+
+    return {
+        'benchmark': 'question_processor',
+        'entries': size,
+        'questions': len(questions),
+        'distinct_questions': len(set(questions)),
+        'vocabulary_words': len(processor.segmenter.trie),
+        'vocabulary_time_s': vocabulary_time,
+        'us_per_question': stages,
+        'questions_per_second': {stage: 1e6 / cost for stage, cost in stages.items()}
+    }
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=10000, help='Knowledge base entries for the vocabulary')
+    parser.add_argument('--queries', type=int, default=5000, help='Questions in the mix')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing rounds per stage (best is kept)')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = run(args.size, args.queries, args.repeat)
+
+    print(f"{results['questions']} questions ({results['distinct_questions']} distinct), "
+          f"{results['vocabulary_words']} dictionary words built in {results['vocabulary_time_s']:.2f}s")
+    print(f"{'stage':<28} {'us/question':>12} {'questions/s':>12}")
+    for stage, cost in results['us_per_question'].items():
+        print(f"{stage:<28} {cost:>12.2f} {results['questions_per_second'][stage]:>12.0f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
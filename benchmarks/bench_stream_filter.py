@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Stream Filter Benchmark
+Compares the automaton-based StreamFilter with the previous find-based think-tag loop.
+"""
+
+import os
+import sys
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from stream_filter import THINK_END_TAGS, THINK_START_TAGS, StreamFilter
+
+
+def find_based_filter(chunks):
+    """
+    Previous streaming filter: searches the whole buffer for every tag on each chunk.
+
+    Args:
+        chunks: Raw stream chunks
+
+    Returns:
+        Generator of filtered chunks
+    """
+    buffer = ""
+    in_thinking_block = False
+    for content in chunks:
+        buffer += content
+        while True:
+            if in_thinking_block:
+                end_pos, found = -1, None
+                for tag in THINK_END_TAGS:
+                    pos = buffer.find(tag)
+                    if pos != -1 and (end_pos == -1 or pos < end_pos):
+                        end_pos, found = pos, tag
+                if end_pos == -1:
+                    break
+                buffer = buffer[end_pos + len(found):]
+                in_thinking_block = False
+            else:
+                start_pos, found = -1, None
+                for tag in THINK_START_TAGS:
+                    pos = buffer.find(tag)
+                    if pos != -1 and (start_pos == -1 or pos < start_pos):
+                        start_pos, found = pos, tag
+                if start_pos == -1:
+                    if buffer:
+                        yield buffer
+                        buffer = ""
+                    break
+                rest = buffer[start_pos + len(found):]
+                end_pos, end_found = -1, None
+                for tag in THINK_END_TAGS:
+                    pos = rest.find(tag)
+                    if pos != -1 and (end_pos == -1 or pos < end_pos):
+                        end_pos, end_found = pos, tag
+                if end_pos == -1:
+                    buffer = buffer[:start_pos]
+                    in_thinking_block = True
+                    break
+                buffer = buffer[:start_pos] + rest[end_pos + len(end_found):]
+    if buffer and not in_thinking_block:
+        yield buffer
+
+
+def stream_filter(chunks, clean=False):
+    """
+    Filter chunks with StreamFilter.
+
+    Args:
+        chunks: Raw stream chunks
+        clean: Whether to apply the post-processing rules too
+
+    Returns:
+        Generator of filtered chunks
+    """
+    filter_ = StreamFilter(clean=clean)
+    for content in chunks:
+        output = filter_.feed(content)
+        if output:
+            yield output
+    output = filter_.flush()
+    if output:
+        yield output
+
+
+def make_stream(reasoning_chars: int, answer_chars: int, chunk_size: int):
+    """
+    Build a stream with one reasoning block followed by the answer.
+
+    Args:
+        reasoning_chars: Length of the reasoning block
+        answer_chars: Length of the answer
+        chunk_size: Characters per chunk
+
+    Returns:
+        List of chunks
+    """
+    reasoning = ('用户问的是春节习俗，我需要想一想。' * (reasoning_chars // 17 + 1))[:reasoning_chars]
+    answer = ('贴春联是春节的传统习俗，寓意辞旧迎新。' * (answer_chars // 19 + 1))[:answer_chars]
+    text = f"<think>{reasoning}</think>{answer}"
+    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+
+def bench(function, chunks, repeat):
+    """
+    Time a filter over a stream.
+
+    Args:
+        function: Filter generator function
+        chunks: Raw stream chunks
+        repeat: Number of runs
+
+    Returns:
+        Best run time in milliseconds
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in function(chunks):
+            pass
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    """Run the benchmark."""
+    print(f"{'reasoning':>10} {'answer':>7} {'chunk':>6} {'find (ms)':>10} {'filter (ms)':>12} "
+          f"{'clean (ms)':>11} {'find leaks tags':>16}")
+    for reasoning_chars, answer_chars, chunk_size in [
+        (200, 200, 4),
+        (2000, 500, 4),
+        (20000, 500, 4),
+        (20000, 500, 8),
+        (50000, 1000, 8),
+    ]:
+        chunks = make_stream(reasoning_chars, answer_chars, chunk_size)
+        assert 'think>' not in ''.join(stream_filter(chunks))
+        leaks = 'think>' in ''.join(find_based_filter(chunks))
+        repeat = 5 if reasoning_chars <= 2000 else 2
+        print(f"{reasoning_chars:>10} {answer_chars:>7} {chunk_size:>6} "
+              f"{bench(find_based_filter, chunks, repeat):>10.2f} "
+              f"{bench(stream_filter, chunks, repeat):>12.2f} "
+              f"{bench(lambda c: stream_filter(c, clean=True), chunks, repeat):>11.2f} {str(leaks):>16}")
+
+
+if __name__ == "__main__":
+    main()
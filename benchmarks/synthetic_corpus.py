@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Synthetic Corpus Module
+Generates knowledge bases in the openspec/knowledge-base.json schema and matching query mixes.
+"""
+
+import json
+import os
+import random
+import sys
+from itertools import accumulate
+from typing import Dict, List, Tuple
+
+SEED_KNOWLEDGE_BASE = os.path.join(os.path.dirname(__file__), '..', 'openspec', 'knowledge-base.json')
+
+REGIONS = [
+    '北京', '天津', '河北', '山西', '内蒙古', '辽宁', '吉林', '黑龙江', '上海', '江苏', '浙江', '安徽',
+    '福建', '江西', '山东', '河南', '湖北', '湖南', '广东', '广西', '海南', '重庆', '四川', '贵州',
+    '云南', '西藏', '陕西', '甘肃', '青海', '宁夏', '新疆', '台湾', '香港', '澳门', '潮汕', '客家',
+    '闽南', '徽州', '江南', '岭南', '关中', '胶东', '湘西', '川西', '苏北', '皖南', '黔东南', '滇西'
+]
+
+# Common characters used to coin custom names, so synthetic titles share realistic bigrams
+NAME_CHARS = (
+    '春节年夜饭饺子汤圆灯笼对联鞭炮烟花红包压岁钱福字窗花年画门神庙会舞龙舞狮拜年守岁祭祖扫尘'
+    '腊八粥糖瓜灶王爷元宵花灯猜谜社火秧歌高跷旱船花馍年糕米酒腊肉香肠团圆吉祥如意平安富贵'
+    '长寿健康财神喜鹊梅花桃符爆竹剪纸春联贴挂迎送接请供拜祭守烧放吃喝穿戴走串回娘家开市'
+)
+
+TIMES = ['腊月二十三', '腊月二十四', '除夕', '大年初一', '正月初二', '正月初五', '正月初七', '正月十五', '腊八']
+PLACES = ['门上', '窗户上', '院子里', '祠堂里', '灶台边', '村口', '街上', '厅堂里']
+METHODS = ['全家一起动手准备', '由长辈带领晚辈', '邻里结伴进行', '按照老规矩一步步完成']
+MEANINGS = ['辞旧迎新', '驱邪避灾', '祈求丰收', '阖家团圆', '招财进宝', '健康长寿']
+
+QUESTION_TEMPLATES = {
+    'why': ['为什么要{title}？', '{title}是为啥？', '为啥{region}人要{title}？'],
+    'when': ['{title}是什么时候？', '什么时候{title}？'],
+    'how': ['{title}怎么做？', '{region}人如何{title}？'],
+    'where': ['{title}在哪里进行？'],
+    'what': ['{title}是什么？', '{keyword}是什么意思？', '{keyword}']
+}
+
+MISS_QUESTIONS = [
+    '圣诞节在中国有什么习俗？', '万圣节为什么要讨糖？', '感恩节吃什么？', '复活节彩蛋是什么？',
+    '情人节送什么花？', '你好', '今天天气怎么样？', '推荐一部电影'
+]
+
+FOLLOW_UPS = ['那{title}什么时候开始？', '那为什么要这样做？', '还有别的讲究吗？', '那{region}呢？']
+
+
+def load_seed_entries(path: str = SEED_KNOWLEDGE_BASE) -> List[Dict]:
+    """
+    Load the hand-written entries the synthetic corpus starts from.
+
+    Args:
+        path: Path to the seed knowledge base
+
+    Returns:
+        List of knowledge base entries
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['data']
+
+
+def _coin_name(rng: random.Random, used: set) -> str:
+    """
+    Coin an unused custom name from common characters.
+
+    Args:
+        rng: Random generator
+        used: Names already taken
+
+    Returns:
+        New name of three or four characters
+    """
+    while True:
+        name = ''.join(rng.choice(NAME_CHARS) for _ in range(rng.choice((3, 4))))
+        if name not in used:
+            used.add(name)
+            return name
+
+
+def generate_corpus(size: int, seed: int = 0) -> Dict:
+    """
+    Generate a knowledge base with size entries.
+
+    The seed entries come first; the rest are regional variants with coined
+    names whose descriptions contain reason, time, method and place phrases,
+    so every answer generator branch is exercised.
+
+    Args:
+        size: Number of entries
+        seed: Random seed; the same seed gives the same corpus
+
+    Returns:
+        Knowledge base dictionary
+    """
+    rng = random.Random(seed)
+    entries = [dict(entry) for entry in load_seed_entries()][:size]
+    used = {entry['title'] for entry in entries}
+    seed_ids = [entry['id'] for entry in entries]
+
+    for number in range(len(entries), size):
+        region = rng.choice(REGIONS)
+        name = _coin_name(rng, used)
+        title = f"{region}{name}"
+        keywords = [name, title, name[:2], rng.choice(MEANINGS)]
+        time_phrase, place, method, meaning = (rng.choice(TIMES), rng.choice(PLACES),
+                                               rng.choice(METHODS), rng.choice(MEANINGS))
+        entries.append({
+            'id': f"synthetic-{number}",
+            'title': title,
+            'description': (
+                f"{title}是{region}地区的春节习俗。人们通常在{time_phrase}{name}，{method}，"
+                f"一般在{place}进行。因为{name}寓意{meaning}，所以这个习俗流传至今。"
+            ),
+            'keywords': keywords,
+            'scenarios': [f"{time_phrase}{name}", f"{name}的寓意", f"{region}的{name}"],
+            'related': []
+        })
+
+    ids = seed_ids + [entry['id'] for entry in entries[len(seed_ids):]]
+    for entry in entries[len(seed_ids):]:
+        entry['related'] = rng.sample(ids, min(3, len(ids)))
+
+    return {'version': '1.0', 'data': entries}
+
+
+def generate_queries(corpus: Dict, count: int, seed: int = 0,
+                     miss_rate: float = 0.1, follow_up_rate: float = 0.1) -> List[Tuple[str, bool]]:
+    """
+    Generate a query mix for a corpus.
+
+    Most queries ask about an entry with one of the intent templates; a
+    miss_rate share asks about topics outside the knowledge base, and a
+    follow_up_rate share are follow-ups that rely on the previous turn.
+
+    Args:
+        corpus: Knowledge base dictionary
+        count: Number of queries
+        seed: Random seed; the same seed gives the same queries
+        miss_rate: Share of queries without a knowledge base answer
+        follow_up_rate: Share of follow-up queries
+
+    Returns:
+        List of (question, is_follow_up) tuples
+    """
+    rng = random.Random(seed)
+    entries = corpus['data']
+    # Popular entries are asked far more often than the long tail
+    cum_weights = list(accumulate(1.0 / (rank + 1) for rank in range(len(entries))))
+    intents = list(QUESTION_TEMPLATES)
+
+    queries = []
+    for _ in range(count):
+        roll = rng.random()
+        entry = rng.choices(entries, cum_weights=cum_weights)[0]
+        region = rng.choice(REGIONS)
+        if roll < miss_rate:
+            queries.append((rng.choice(MISS_QUESTIONS), False))
+        elif roll < miss_rate + follow_up_rate and queries:
+            queries.append((rng.choice(FOLLOW_UPS).format(title=entry['title'], region=region), True))
+        else:
+            template = rng.choice(QUESTION_TEMPLATES[rng.choice(intents)])
+            keyword = rng.choice(entry['keywords']) if entry['keywords'] else entry['title']
+            queries.append((template.format(title=entry['title'], region=region, keyword=keyword), False))
+    return queries
+
+
+def write_corpus(corpus: Dict, path: str):
+    """
+    Write a knowledge base to a JSON file.
+
+    Args:
+        corpus: Knowledge base dictionary
+        path: Output path
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(corpus, f, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python benchmarks/synthetic_corpus.py <size> <output.json> [seed]")
+        sys.exit(1)
+    corpus = generate_corpus(int(sys.argv[1]), int(sys.argv[3]) if len(sys.argv) > 3 else 0)
+    write_corpus(corpus, sys.argv[2])
+    print(f"Wrote {len(corpus['data'])} entries to {sys.argv[2]}")
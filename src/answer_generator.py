@@ -6,14 +6,26 @@ Answer Generation Module
 Generates colloquial answers based on retrieved knowledge entries.
 """
 
-from typing import Dict, List
-import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from text_rewriter import COLLOQUIAL_REPLACEMENTS, TextRewriter
+
+COLLOQUIAL_REWRITER = TextRewriter(COLLOQUIAL_REPLACEMENTS)
+PERIOD_COLLAPSER = TextRewriter({}, collapse='。')
+
 
 class AnswerGenerator:
     """Generates colloquial answers based on retrieved knowledge entries."""
 
-    def __init__(self):
-        """Initialize the answer generator."""
+    def __init__(self, max_rendered: int = 4096):
+        """
+        Initialize the answer generator.
+
+        Args:
+            max_rendered: Maximum number of rendered answers kept (0 disables them)
+        """
         # Intent-specific templates
         self.intent_templates = {
             'why': '因为{reason}，所以{action}。',
@@ -22,8 +34,15 @@ class AnswerGenerator:
             'how': '{action}的方法是{method}。',
             'where': '{action}通常在{place}。'
         }
-
-    def generate_answer(self, retrieved_entries: List[Dict], query: Dict, context: List[Dict] = None) -> str:
+        # Least recently used rendered answers keyed on (entry id, intent), dropped on every reload
+        self.max_rendered = max_rendered
+        self._rendered_answers: 'OrderedDict[Tuple[str, Optional[str]], str]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by clear_rendered_answers(); answers rendered before a clear are not stored after it
+        self.generation = 0
+
+    def generate_answer(self, retrieved_entries: List[Dict], query: Dict, context: List[Dict] = None,
+                        generation: Optional[int] = None) -> str:
         """
         Generate a colloquial answer based on retrieved knowledge entries.
 
@@ -31,6 +50,7 @@ class AnswerGenerator:
             retrieved_entries: List of retrieved knowledge entries
             query: Processed query dictionary
             context: Dialogue history for context-aware generation
+            generation: Generation read before the entries were retrieved
 
         Returns:
             Colloquial answer as a string
@@ -38,25 +58,8 @@ class AnswerGenerator:
         if not retrieved_entries:
             return "抱歉，我暂时没有关于这个问题的信息。"
 
-        # Get the most relevant entry
-        top_entry = retrieved_entries[0]
-
-        # Extract information from the top entry
-        title = top_entry.get('title', '')
-        description = top_entry.get('description', '')
-        scenarios = top_entry.get('scenarios', [])
-
-        # Get intent from query
-        intent = query.get('intent', 'what')
-
-        # Generate answer based on intent
-        if intent in self.intent_templates:
-            answer = self._generate_intent_based_answer(top_entry, intent, query)
-        else:
-            answer = self._generate_generic_answer(top_entry, query)
-
-        # Make answer more colloquial
-        colloquial_answer = self._make_colloquial(answer)
+        # Answer from the most relevant entry, rendered once per intent
+        colloquial_answer = self.render_answer(retrieved_entries[0], query.get('intent', 'what'), generation)
 
         # Add context if available
         if context and query.get('context_aware', False):
@@ -64,6 +67,54 @@ class AnswerGenerator:
 
         return colloquial_answer
 
+    def render_answer(self, entry: Dict, intent: str, generation: Optional[int] = None) -> str:
+        """
+        Get the colloquial answer for an entry and intent, rendering it on first use.
+
+        Args:
+            entry: Knowledge entry
+            intent: Intent type
+            generation: Generation read before the entry was retrieved; the answer
+                is not stored if the rendered answers were cleared since
+
+        Returns:
+            Colloquial answer string, without the dialogue context
+        """
+        # Intents without a template share the generic answer
+        template_intent = intent if intent in self.intent_templates else None
+        key = (entry.get('id'), template_intent)
+
+        with self._lock:
+            answer = self._rendered_answers.get(key)
+            if answer is not None:
+                self._rendered_answers.move_to_end(key)
+                return answer
+
+        if template_intent is not None:
+            answer = self._generate_intent_based_answer(entry, intent, {'intent': intent})
+        else:
+            answer = self._generate_generic_answer(entry, {'intent': intent})
+        # Make answer more colloquial
+        answer = self._make_colloquial(answer)
+
+        # Entries without an id have no stable key
+        if self.max_rendered <= 0 or key[0] is None:
+            return answer
+        with self._lock:
+            if generation is None or generation == self.generation:
+                self._rendered_answers[key] = answer
+                while len(self._rendered_answers) > self.max_rendered:
+                    self._rendered_answers.popitem(last=False)
+        return answer
+
+    def clear_rendered_answers(self):
+        """
+        Drop the rendered answers, e.g. after a knowledge base reload removed or changed entries.
+        """
+        with self._lock:
+            self._rendered_answers.clear()
+            self.generation += 1
+
     def _generate_intent_based_answer(self, entry: Dict, intent: str, query: Dict) -> str:
         """
         Generate an answer based on the specific intent.
@@ -236,22 +287,7 @@ class AnswerGenerator:
             Colloquial answer string
         """
         # Replace formal expressions with colloquial ones
-        colloquial_replacements = {
-            '是因为': '因为',
-            '因此': '所以',
-            '例如': '比如',
-            '也就是说': '就是说',
-            '此外': '另外',
-            '综上所述': '总之',
-            '需要注意的是': '要注意的是',
-            '可以': '可以啊',
-            '应该': '应该吧',
-            '必须': '一定要'
-        }
-
-        colloquial_answer = answer
-        for formal, colloquial in colloquial_replacements.items():
-            colloquial_answer = colloquial_answer.replace(formal, colloquial)
+        colloquial_answer = COLLOQUIAL_REWRITER.rewrite(answer)
 
         # Add some colloquial particles
         if not any(particle in colloquial_answer for particle in ['啊', '呀', '呢', '吧', '嘛']):
@@ -261,7 +297,7 @@ class AnswerGenerator:
                 colloquial_answer += '呢'
 
         # Remove duplicate punctuation
-        colloquial_answer = re.sub(r'。+', '。', colloquial_answer)
+        colloquial_answer = PERIOD_COLLAPSER.rewrite(colloquial_answer)
 
         return colloquial_answer
 
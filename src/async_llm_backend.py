@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Async LLM Backend Module
+Asyncio variant of the LLM backend with a pooled keep-alive client and bounded concurrency.
+"""
+
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from llm_backend import LLMBackend
+from llm_cache import replay
+from stream_filter import StreamFilter
+
+
+class AsyncLLMBackend(LLMBackend):
+    """
+    LLM Backend for generating answers with the async OpenAI client.
+
+    All calls share one HTTP connection pool, at most max_concurrency calls are
+    in flight at a time and every call is bounded by a timeout.
+    """
+
+    def __init__(self, max_concurrency: int = 8, timeout: float = 30.0,
+                 max_connections: int = 20, max_keepalive_connections: int = 10,
+                 max_retries: int = 2):
+        """
+        Initialize the async LLM backend.
+
+        Args:
+            max_concurrency: Maximum number of concurrent upstream calls
+            timeout: Per-call timeout in seconds
+            max_connections: Maximum number of pooled connections
+            max_keepalive_connections: Maximum number of idle keep-alive connections
+            max_retries: Number of retries on connection errors
+        """
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.max_retries = max_retries
+
+        super().__init__()
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _create_client(self) -> AsyncOpenAI:
+        """
+        Create the async OpenAI client on a shared keep-alive connection pool.
+
+        Returns:
+            AsyncOpenAI client
+        """
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections
+            ),
+            timeout=self.timeout
+        )
+
+        kwargs = {
+            'api_key': self.api_key,
+            'http_client': http_client,
+            'timeout': self.timeout,
+            'max_retries': self.max_retries
+        }
+        if self.api_base:
+            kwargs['base_url'] = self.api_base
+        return AsyncOpenAI(**kwargs)
+
+    def _completion_params(self, question: str, context: Optional[List[Dict]], stream: bool) -> Dict:
+        """
+        Build the chat completion request parameters.
+
+        Args:
+            question: User question as a string
+            context: Dialogue history for context-aware generation
+            stream: Whether to use streaming output
+
+        Returns:
+            Keyword arguments for chat.completions.create
+        """
+        return {
+            'model': self.config['model'],
+            'messages': self._build_messages(question, context),
+            'temperature': self.config['temperature'],
+            'max_tokens': self.config['max_tokens'],
+            'top_p': self.config['top_p'],
+            'frequency_penalty': self.config['frequency_penalty'],
+            'presence_penalty': self.config['presence_penalty'],
+            'stream': stream
+        }
+
+    async def generate_answer(self, question: str, context: Optional[List[Dict]] = None) -> str:
+        """
+        Generate an answer using OpenAI API.
+
+        Args:
+            question: User question as a string
+            context: Dialogue history for context-aware generation
+
+        Returns:
+            Generated answer as a string
+        """
+        start_time = time.time()
+
+        # Serve repeated questions from the answer cache
+        if self.answer_cache is not None:
+            cached = self.answer_cache.get(question, self.config, context)
+            if cached is not None:
+                return cached
+
+        try:
+            async with self._semaphore:
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(**self._completion_params(question, context, False)),
+                    self.timeout
+                )
+
+            # Extract answer
+            answer = response.choices[0].message.content.strip()
+
+            # Update monitoring
+            self._update_monitoring(response, time.time() - start_time)
+
+            # Quality control
+            if self._contains_inappropriate_content(answer):
+                return "抱歉，我无法回答这个问题。"
+
+            processed_answer = self._post_process_answer(answer)
+            self._cache_answer(question, context, processed_answer)
+            return processed_answer
+
+        except Exception as e:
+            print(f"LLM API call failed: {e!r}")
+            return "抱歉，我暂时无法回答这个问题。"
+
+    async def generate_stream(self, question: str, context: Optional[List[Dict]] = None) -> AsyncIterator[str]:
+        """
+        Stream an answer using OpenAI API, filtered and cleaned by StreamFilter.
+
+        The concurrency slot is held until the stream is exhausted or closed.
+
+        Args:
+            question: User question as a string
+            context: Dialogue history for context-aware generation
+
+        Returns:
+            Async generator of answer chunks
+        """
+        start_time = time.time()
+
+        # Replay repeated questions from the answer cache
+        if self.answer_cache is not None:
+            cached = self.answer_cache.get(question, self.config, context)
+            if cached is not None:
+                for chunk in replay(cached):
+                    yield chunk
+                return
+
+        async with self._semaphore:
+            try:
+                response = await self.client.chat.completions.create(
+                    **self._completion_params(question, context, True)
+                )
+            except Exception as e:
+                print(f"LLM API call failed: {e!r}")
+                yield "抱歉，我暂时无法回答这个问题。"
+                return
+
+            stream_filter = StreamFilter(clean=True)
+            outputs = []
+            completed = False
+            try:
+                async for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        output = stream_filter.feed(chunk.choices[0].delta.content)
+                        if output:
+                            outputs.append(output)
+                            yield output
+                completed = True
+            except Exception as e:
+                print(f"LLM stream failed: {e!r}")
+            finally:
+                await response.close()
+
+            # Handle any remaining content after stream ends
+            output = stream_filter.flush()
+            if output:
+                outputs.append(output)
+                yield output
+
+        # Cache only answers whose stream completed
+        if completed:
+            self._cache_answer(question, context, ''.join(outputs))
+
+        # Update monitoring once per call
+        self.monitoring['total_calls'] += 1
+        self.monitoring['avg_response_time'] = (
+            (self.monitoring['avg_response_time'] * (self.monitoring['total_calls'] - 1) + (time.time() - start_time)) /
+            self.monitoring['total_calls']
+        )
+
+    async def aclose(self):
+        """
+        Close the pooled connections.
+        """
+        await self.client.close()
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Dense Retrieval Module
+Embedding-based semantic retrieval over a memory-mapped vector index (requires NumPy).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only the dense scorers need it
+    np = None
+
+from knowledge_index import (
+    KnowledgeIndex, EntryFeatures,
+    TITLE_WEIGHT, DESCRIPTION_WEIGHT, KEYWORD_WEIGHT, SCENARIO_WEIGHT
+)
+from scorers import RelevanceScorer, WeightedScorer
+
+
+class HashedNgramEncoder:
+    """Deterministic CPU-only text encoder hashing character n-grams into a fixed-size vector."""
+
+    def __init__(self, dim: int = 512, ngram_range: Tuple[int, int] = (2, 3)):
+        """
+        Initialize the encoder.
+
+        Args:
+            dim: Dimension of the embeddings
+            ngram_range: Smallest and largest n-gram length
+        """
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def config(self) -> Dict:
+        """
+        Get the encoder settings that determine the embeddings.
+
+        Returns:
+            Encoder settings as a dictionary
+        """
+        return {'encoder': 'hashed-ngram', 'dim': self.dim, 'ngram_range': list(self.ngram_range)}
+
+    def add_text(self, vector: 'np.ndarray', text: str, weight: float = 1.0):
+        """
+        Accumulate the hashed n-grams of a text into a vector.
+
+        Args:
+            vector: Float32 vector to update in place
+            text: Input text
+            weight: Weight of every n-gram of the text
+        """
+        text = ''.join(text.split())
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(text) - n + 1):
+                # crc32 is stable across processes, unlike hash()
+                digest = zlib.crc32(text[i:i + n].encode('utf-8'))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                vector[digest % self.dim] += sign * weight
+
+    def encode(self, text: str) -> 'np.ndarray':
+        """
+        Encode a text into a unit-length embedding.
+
+        Args:
+            text: Input text
+
+        Returns:
+            Float32 embedding
+        """
+        vector = np.zeros(self.dim, dtype=np.float32)
+        self.add_text(vector, text)
+        return normalize(vector)
+
+    def encode_entry(self, features: EntryFeatures) -> 'np.ndarray':
+        """
+        Encode a knowledge entry, weighting its fields like the keyword scorer.
+
+        Args:
+            features: Precomputed entry features
+
+        Returns:
+            Float32 embedding
+        """
+        vector = np.zeros(self.dim, dtype=np.float32)
+        self.add_text(vector, features.title, TITLE_WEIGHT)
+        self.add_text(vector, features.description, DESCRIPTION_WEIGHT)
+        for keyword in features.keywords:
+            self.add_text(vector, keyword, KEYWORD_WEIGHT)
+        for scenario in features.scenarios:
+            self.add_text(vector, scenario, SCENARIO_WEIGHT)
+        return normalize(vector)
+
+
+def normalize(vector: 'np.ndarray') -> 'np.ndarray':
+    """
+    Scale a vector to unit length.
+
+    Args:
+        vector: Input vector
+
+    Returns:
+        The vector, normalized in place
+    """
+    norm = float(np.linalg.norm(vector))
+    if norm:
+        vector /= norm
+    return vector
+
+
+def top_k(scores: 'np.ndarray', k: int) -> 'np.ndarray':
+    """
+    Get the positions of the k largest scores, best first.
+
+    Args:
+        scores: Score array
+        k: Number of positions to return
+
+    Returns:
+        Array of positions
+    """
+    if k <= 0 or not len(scores):
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        positions = np.argpartition(-scores, k - 1)[:k]
+    else:
+        positions = np.arange(len(scores))
+    return positions[np.lexsort((positions, -scores[positions]))]
+
+
+class IVFIndex:
+    """Inverted-file index: spherical k-means cells searched by their nearest centroids."""
+
+    def __init__(self, vectors: 'np.ndarray', num_lists: int = 0, num_probes: int = 4,
+                 iterations: int = 10, seed: int = 0):
+        """
+        Cluster the vectors into inverted lists.
+
+        Args:
+            vectors: Unit-length entry vectors
+            num_lists: Number of cells, about sqrt(N) if 0
+            num_probes: Number of cells searched per query
+            iterations: Number of k-means iterations
+            seed: Seed for the initial centroids
+        """
+        count = len(vectors)
+        num_lists = num_lists or max(1, int(count ** 0.5))
+        num_lists = min(num_lists, max(count, 1))
+        self.num_probes = num_probes
+
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(count, num_lists, replace=False)].copy() if count else \
+            np.zeros((1, vectors.shape[1]), dtype=np.float32)
+        assignment = np.zeros(count, dtype=np.int64)
+        for _ in range(iterations):
+            if not count:
+                break
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            for cell in range(len(centroids)):
+                members = vectors[assignment == cell]
+                if len(members):
+                    centroids[cell] = normalize(members.sum(axis=0))
+
+        self.centroids = centroids
+        self.lists = [np.flatnonzero(assignment == cell) for cell in range(len(centroids))]
+
+    def candidates(self, query_vector: 'np.ndarray') -> 'np.ndarray':
+        """
+        Get the entries of the cells nearest to the query.
+
+        Args:
+            query_vector: Unit-length query embedding
+
+        Returns:
+            Array of candidate entry positions
+        """
+        cells = top_k(self.centroids @ query_vector, self.num_probes)
+        return np.concatenate([self.lists[cell] for cell in cells]) if len(cells) else np.empty(0, dtype=np.int64)
+
+
+class DenseScorer(RelevanceScorer):
+    """Semantic scorer ranking entries by cosine similarity of their embeddings."""
+
+    name = 'dense'
+
+    def __init__(self, encoder: Optional[HashedNgramEncoder] = None, vector_path: Optional[str] = None,
+                 min_similarity: float = 0.2, use_ivf: bool = False, num_lists: int = 0, num_probes: int = 4,
+                 candidate_pool: int = 50):
+        """
+        Initialize the dense scorer.
+
+        Args:
+            encoder: Text encoder, a HashedNgramEncoder if omitted
+            vector_path: Path of the memory-mapped .npy vector file, vectors stay in memory if None
+            min_similarity: Minimum cosine similarity for an entry to count as relevant
+            use_ivf: Whether to search an IVF index instead of brute force
+            num_lists: Number of IVF cells, about sqrt(N) if 0
+            num_probes: Number of IVF cells searched per query
+            candidate_pool: Number of nearest entries returned by score()
+        """
+        if np is None:
+            raise ImportError("NumPy is required for dense retrieval")
+
+        self.encoder = encoder or HashedNgramEncoder()
+        self.vector_path = vector_path
+        self.min_similarity = min_similarity
+        self.use_ivf = use_ivf
+        self.num_lists = num_lists
+        self.num_probes = num_probes
+        self.candidate_pool = candidate_pool
+
+    def build(self, index: KnowledgeIndex, previous: Optional[RelevanceScorer] = None):
+        """
+        Load or compute the entry vectors and build the optional IVF index.
+
+        Args:
+            index: Knowledge index of the loaded knowledge base
+            previous: Dense scorer of the previous version; vectors of unchanged entries are reused
+        """
+        super().build(index)
+        self.vectors = self._load_vectors(index.features, previous)
+        self.ivf = IVFIndex(self.vectors, self.num_lists, self.num_probes) if self.use_ivf else None
+
+    def _fingerprint(self, features: List[EntryFeatures]) -> str:
+        """
+        Fingerprint the entries and encoder settings that the vectors depend on.
+
+        Args:
+            features: Precomputed entry features
+
+        Returns:
+            Hex digest
+        """
+        digest = hashlib.sha1(json.dumps(self.encoder.config(), sort_keys=True).encode('utf-8'))
+        for entry in features:
+            digest.update(json.dumps(
+                [entry.title, entry.description, sorted(entry.keywords), list(entry.scenarios)],
+                ensure_ascii=False
+            ).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _load_vectors(self, features: List[EntryFeatures], previous: Optional['DenseScorer'] = None) -> 'np.ndarray':
+        """
+        Map the vector file if it matches the entries, otherwise encode the entries.
+
+        Args:
+            features: Precomputed entry features
+            previous: Dense scorer of the previous version
+
+        Returns:
+            Float32 matrix with one unit-length row per entry
+        """
+        shape = (len(features), self.encoder.dim)
+        if not self.vector_path:
+            return self._encode_all(features, np.zeros(shape, dtype=np.float32), previous)
+
+        fingerprint = self._fingerprint(features)
+        meta_path = self.vector_path + '.meta.json'
+        vectors = self._map_vectors(meta_path, fingerprint, shape)
+        if vectors is not None:
+            return vectors
+
+        # Build both files under unique names and rename them into place: a mapping held by
+        # in-flight queries stays valid, and workers building at the same time never share a file
+        directory = os.path.dirname(os.path.abspath(self.vector_path))
+        prefix = os.path.basename(self.vector_path) + '.'
+        fd, vector_temp = tempfile.mkstemp(suffix='.tmp.npy', prefix=prefix, dir=directory)
+        os.close(fd)
+        meta_temp = None
+        try:
+            vectors = np.lib.format.open_memmap(vector_temp, mode='w+', dtype=np.float32, shape=shape)
+            self._encode_all(features, vectors, previous)
+            vectors.flush()
+            checksum = zlib.crc32(vectors)
+            del vectors
+
+            fd, meta_temp = tempfile.mkstemp(suffix='.tmp.json', prefix=prefix, dir=directory)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'fingerprint': fingerprint, 'shape': list(shape), 'crc32': checksum}, f)
+
+            # Map the file before the rename, another builder may replace the path right after
+            vectors = np.load(vector_temp, mmap_mode='r')
+            os.replace(vector_temp, self.vector_path)
+            os.replace(meta_temp, meta_path)
+        except BaseException:
+            for path in (vector_temp, meta_temp):
+                if path and os.path.exists(path):
+                    os.remove(path)
+            raise
+        return vectors
+
+    def _map_vectors(self, meta_path: str, fingerprint: str, shape: Tuple[int, int]) -> Optional['np.ndarray']:
+        """
+        Map the vector file if it was built for the entries.
+
+        Vectors and meta are renamed into place one after the other, so a
+        reader may see a vector file from another build than the meta; the
+        checksum in the meta catches such a pair.
+
+        Args:
+            meta_path: Path of the meta JSON file
+            fingerprint: Fingerprint of the entries
+            shape: Expected matrix shape
+
+        Returns:
+            Memory-mapped vectors, or None if they have to be built
+        """
+        if not (os.path.exists(self.vector_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('fingerprint') != fingerprint:
+                return None
+            vectors = np.load(self.vector_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        if vectors.shape != shape or zlib.crc32(vectors) != meta.get('crc32'):
+            return None
+        return vectors
+
+    def _encode_all(self, features: List[EntryFeatures], vectors: 'np.ndarray',
+                    previous: Optional['DenseScorer'] = None) -> 'np.ndarray':
+        """
+        Encode every entry into a preallocated matrix.
+
+        Args:
+            features: Precomputed entry features
+            vectors: Float32 matrix to fill
+            previous: Dense scorer of the previous version; rows of entries whose
+                features were carried over unchanged are copied from it
+
+        Returns:
+            The filled matrix
+        """
+        previous_rows = {}
+        if isinstance(previous, DenseScorer) and previous.encoder.config() == self.encoder.config():
+            previous_rows = {entry: row for row, entry in enumerate(previous.index.features)}
+
+        for position, entry in enumerate(features):
+            row = previous_rows.get(entry)
+            if row is not None:
+                vectors[position] = previous.vectors[row]
+            else:
+                vectors[position] = self.encoder.encode_entry(entry)
+        return vectors
+
+    def encode_query(self, query: Dict) -> 'np.ndarray':
+        """
+        Encode a processed query, preferring its keywords over the full question.
+
+        Args:
+            query: Processed query dictionary
+
+        Returns:
+            Float32 query embedding
+        """
+        keywords = query.get('keywords', [])
+        text = ' '.join(keywords) if keywords else query.get('cleaned_question', '')
+        return self.encoder.encode(text)
+
+    def search(self, query: Dict, k: int) -> List[Tuple[int, float]]:
+        """
+        Find the k entries most similar to the query above the similarity threshold.
+
+        Args:
+            query: Processed query dictionary
+            k: Number of entries to return
+
+        Returns:
+            List of (entry position, cosine similarity), best first
+        """
+        query_vector = self.encode_query(query)
+        if self.ivf is not None:
+            positions = self.ivf.candidates(query_vector)
+            similarities = self.vectors[positions] @ query_vector
+            best = top_k(similarities, k)
+            results = zip(positions[best].tolist(), similarities[best].tolist())
+        else:
+            similarities = self.vectors @ query_vector
+            best = top_k(similarities, k)
+            results = zip(best.tolist(), similarities[best].tolist())
+        return [(position, similarity) for position, similarity in results if similarity >= self.min_similarity]
+
+    def score(self, query: Dict) -> Dict[int, float]:
+        """
+        Score the nearest entries by cosine similarity.
+
+        Args:
+            query: Processed query dictionary
+
+        Returns:
+            Dict mapping entry index to similarity
+        """
+        return dict(self.search(query, self.candidate_pool))
+
+    def rank(self, query: Dict, top_n: int = 3) -> List[int]:
+        """
+        Get the positions of the top N most similar entries.
+
+        Args:
+            query: Processed query dictionary
+            top_n: Number of top relevant entries to return
+
+        Returns:
+            Entry positions by descending similarity
+        """
+        return [position for position, _ in self.search(query, top_n)]
+
+
+class HybridScorer(RelevanceScorer):
+    """Fuses dense similarity with the normalized keyword score."""
+
+    name = 'hybrid'
+
+    def __init__(self, dense_scorer: Optional[DenseScorer] = None,
+                 keyword_scorer: Optional[RelevanceScorer] = None, dense_weight: float = 0.5):
+        """
+        Initialize the hybrid scorer.
+
+        Args:
+            dense_scorer: Dense scorer, a default DenseScorer if omitted
+            keyword_scorer: Keyword scorer, a WeightedScorer if omitted
+            dense_weight: Weight of the dense similarity, the keyword score gets the rest
+        """
+        self.dense_scorer = dense_scorer or DenseScorer()
+        self.keyword_scorer = keyword_scorer or WeightedScorer()
+        self.dense_weight = dense_weight
+
+    def build(self, index: KnowledgeIndex, previous: Optional[RelevanceScorer] = None):
+        """
+        Build both underlying scorers.
+
+        Args:
+            index: Knowledge index of the loaded knowledge base
+            previous: Hybrid scorer of the previous version
+        """
+        super().build(index)
+        previous_dense = previous.dense_scorer if isinstance(previous, HybridScorer) else None
+        previous_keyword = previous.keyword_scorer if isinstance(previous, HybridScorer) else None
+        self.dense_scorer.build(index, previous_dense)
+        self.keyword_scorer.build(index, previous_keyword)
+
+    def clone(self) -> 'HybridScorer':
+        """
+        Copy the scorer settings together with the underlying scorers.
+
+        Returns:
+            Unbuilt copy of the scorer
+        """
+        scorer = super().clone()
+        scorer.dense_scorer = self.dense_scorer.clone()
+        scorer.keyword_scorer = self.keyword_scorer.clone()
+        return scorer
+
+    def score(self, query: Dict) -> Dict[int, float]:
+        """
+        Fuse the dense and keyword scores of the candidate entries.
+
+        Args:
+            query: Processed query dictionary
+
+        Returns:
+            Dict mapping entry index to fused score
+        """
+        keyword_scores = self.keyword_scorer.score(query)
+        dense_scores = self.dense_scorer.score(query)
+
+        max_keyword_score = max(keyword_scores.values(), default=0.0)
+        keyword_weight = 1.0 - self.dense_weight
+
+        scores: Dict[int, float] = {}
+        for index, similarity in dense_scores.items():
+            scores[index] = self.dense_weight * similarity
+        if max_keyword_score > 0:
+            for index, score in keyword_scores.items():
+                if score > 0:
+                    scores[index] = scores.get(index, 0.0) + keyword_weight * score / max_keyword_score
+        return scores
@@ -6,7 +6,36 @@ Dialogue Management Module
 Manages dialogue history and context for multi-turn conversations.
 """
 
-from typing import Dict, List
+from collections import deque
+from itertools import islice
+from typing import Dict, List, Optional
+
+# Rough per-turn overhead in bytes (dict, role, timestamp) used for memory accounting
+TURN_OVERHEAD_BYTES = 300
+
+# Rough overhead in bytes of a turn analysis (dict, lists) and of each string in it
+ANALYSIS_OVERHEAD_BYTES = 200
+ANALYSIS_ITEM_OVERHEAD_BYTES = 50
+
+
+def analysis_size(analysis: Optional[Dict]) -> int:
+    """
+    Estimate the memory held by a turn analysis.
+
+    Args:
+        analysis: Turn analysis, or None
+
+    Returns:
+        Approximate size in bytes
+    """
+    if not analysis:
+        return 0
+    size = ANALYSIS_OVERHEAD_BYTES
+    for value in analysis.values():
+        items = value if isinstance(value, (list, tuple)) else [value]
+        size += sum(len(str(item).encode('utf-8')) + ANALYSIS_ITEM_OVERHEAD_BYTES for item in items)
+    return size
+
 
 class DialogueManager:
     """Manages dialogue history and context for multi-turn conversations."""
@@ -19,43 +48,47 @@ class DialogueManager:
             max_history_length: Maximum number of dialogue turns to keep
         """
         self.max_history_length = max_history_length
-        self.dialogue_history = []
+        # Ring buffer: the oldest turn drops out once max_history_length is reached
+        self.dialogue_history = deque(maxlen=max_history_length)
 
-    def add_turn(self, role: str, content: str):
+    def add_turn(self, role: str, content: str, analysis: Optional[Dict] = None):
         """
         Add a turn to the dialogue history.
 
         Args:
             role: Role of the speaker ('user' or 'system')
             content: Content of the message
+            analysis: Precomputed analysis of the content (keywords, intent, entry_ids),
+                reused when later questions refer back to this turn
         """
         turn = {
             'role': role,
             'content': content,
             'timestamp': self._get_timestamp()
         }
+        if analysis is not None:
+            turn['analysis'] = analysis
 
-        # Add to history
+        # Add to history, dropping the oldest turn if the history is full
         self.dialogue_history.append(turn)
 
-        # Truncate history if it exceeds max length
-        if len(self.dialogue_history) > self.max_history_length:
-            self.dialogue_history = self.dialogue_history[-self.max_history_length:]
-
     def get_history(self) -> List[Dict]:
         """
         Get the dialogue history.
 
         Returns:
-            List of dialogue turns
+            List of dialogue turns, without their precomputed analysis
         """
-        return self.dialogue_history
+        return [
+            {key: value for key, value in turn.items() if key != 'analysis'} if 'analysis' in turn else turn
+            for turn in self.dialogue_history
+        ]
 
     def clear_history(self):
         """
         Clear the dialogue history.
         """
-        self.dialogue_history = []
+        self.dialogue_history.clear()
 
     def get_recent_context(self, num_turns: int = 3) -> List[Dict]:
         """
@@ -67,7 +100,8 @@ class DialogueManager:
         Returns:
             List of recent dialogue turns
         """
-        return self.dialogue_history[-num_turns:]
+        start = max(len(self.dialogue_history) - num_turns, 0)
+        return list(islice(self.dialogue_history, start, None))
 
     def is_follow_up_question(self, question: str) -> bool:
         """
@@ -92,6 +126,45 @@ class DialogueManager:
 
         return False
 
+    def memory_size(self) -> int:
+        """
+        Estimate the memory held by the dialogue history.
+
+        Returns:
+            Approximate size in bytes
+        """
+        return sum(
+            len(turn['content'].encode('utf-8')) + TURN_OVERHEAD_BYTES + analysis_size(turn.get('analysis'))
+            for turn in self.dialogue_history
+        )
+
+    def to_dict(self) -> Dict:
+        """
+        Serialize the dialogue state.
+
+        Returns:
+            Dictionary with the history length limit and the turns
+        """
+        return {
+            'max_history_length': self.max_history_length,
+            'history': list(self.dialogue_history)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DialogueManager':
+        """
+        Restore a dialogue manager serialized by to_dict.
+
+        Args:
+            data: Serialized dialogue state
+
+        Returns:
+            Dialogue manager with the restored history
+        """
+        manager = cls(max_history_length=data.get('max_history_length', 5))
+        manager.dialogue_history.extend(data.get('history', []))
+        return manager
+
     def _get_timestamp(self) -> str:
         """
         Get the current timestamp.
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Knowledge Base Compiler Module
+Compiles the knowledge base JSON into a binary file that is memory-mapped at startup.
+
+Layout (little-endian):
+    header   magic b'KBC1', format version, ngram size, section count
+    sections (name, offset, length) directory followed by the sections:
+        meta      JSON of the top-level fields other than 'data'
+        entries   table of per-entry UTF-8 JSON blobs
+        features  table of per-entry scoring fields as UTF-8 JSON lists
+        grams     table n-gram -> (entry index, field bits) pairs
+        keywords  table keyword -> entry indexes
+        intents   table intent -> entry indexes
+        ids       table entry id -> entry indexes
+        terms     JSON list of the keywords and titles, the question segmenter vocabulary
+
+A table holds a key count, key and value offset arrays, then the key and value bytes.
+Keys are sorted by their UTF-8 bytes so lookups are a binary search over the mapping.
+Worker processes mapping the same file share its pages, and startup no longer parses
+or indexes the whole corpus.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from knowledge_index import INTENT_FLAGS, KnowledgeIndex, EntryFeatures
+from segmenter import knowledge_terms
+
+MAGIC = b'KBC1'
+FORMAT_VERSION = 3
+HEADER = struct.Struct('<4sIII')
+SECTION = struct.Struct('<8sQQ')
+SECTION_NAMES = ('meta', 'entries', 'features', 'grams', 'keywords', 'intents', 'ids', 'terms')
+
+
+def _uint32_bytes(values: Sequence[int]) -> bytes:
+    """
+    Pack integers as little-endian uint32.
+
+    Args:
+        values: Integers to pack
+
+    Returns:
+        Packed bytes
+    """
+    packed = array('I', values)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _feature_record(features: EntryFeatures) -> List:
+    """
+    Get the scoring fields of an entry as stored in the features section.
+
+    Args:
+        features: Entry features
+
+    Returns:
+        List of id, title, description, scenarios, keywords, related ids and intent flag bits
+    """
+    intent_bits = 0
+    for bit, intent in enumerate(INTENT_FLAGS):
+        if features.has_intent_cue(intent):
+            intent_bits |= 1 << bit
+    return [features.entry_id, features.title, features.description, list(features.scenarios),
+            sorted(features.keywords), list(features.related), intent_bits]
+
+
+def _pack_table(items: Dict[bytes, bytes]) -> bytes:
+    """
+    Serialize a key -> value table with keys sorted by bytes.
+
+    Args:
+        items: Encoded keys and values
+
+    Returns:
+        Serialized table
+    """
+    keys = sorted(items)
+    key_offsets = [0]
+    value_offsets = [0]
+    for key in keys:
+        key_offsets.append(key_offsets[-1] + len(key))
+        value_offsets.append(value_offsets[-1] + len(items[key]))
+
+    return b''.join([
+        struct.pack('<I', len(keys)),
+        struct.pack(f'<{len(keys) + 1}Q', *key_offsets),
+        struct.pack(f'<{len(keys) + 1}Q', *value_offsets),
+        b''.join(keys),
+        b''.join(items[key] for key in keys)
+    ])
+
+
+def compile_knowledge_base(json_path: str, output_path: str, ngram_size: int = 2):
+    """
+    Compile a knowledge base JSON file into the binary format.
+
+    Args:
+        json_path: Path to the knowledge base JSON file
+        output_path: Path of the compiled file
+        ngram_size: Length of the character n-grams in the prebuilt index
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        knowledge_base = json.load(f)
+
+    entries = knowledge_base['data']
+    index = KnowledgeIndex(entries, ngram_size)
+
+    meta = {key: value for key, value in knowledge_base.items() if key != 'data'}
+    sections = {
+        'meta': json.dumps(meta, ensure_ascii=False).encode('utf-8'),
+        'entries': _pack_table({
+            struct.pack('>I', position): json.dumps(entry, ensure_ascii=False).encode('utf-8')
+            for position, entry in enumerate(entries)
+        }),
+        'features': _pack_table({
+            struct.pack('>I', position): json.dumps(_feature_record(features), ensure_ascii=False).encode('utf-8')
+            for position, features in enumerate(index.features)
+        }),
+        'grams': _pack_table({
+            gram.encode('utf-8'): _uint32_bytes([value for item in sorted(postings.items()) for value in item])
+            for gram, postings in index.gram_postings.items()
+        }),
+        'keywords': _pack_table({
+            keyword.encode('utf-8'): _uint32_bytes(positions)
+            for keyword, positions in index.keyword_postings.items()
+        }),
+        'intents': _pack_table({
+            intent.encode('utf-8'): _uint32_bytes(positions)
+            for intent, positions in index.intent_postings.items()
+        }),
+        'ids': _pack_table({
+            str(entry_id).encode('utf-8'): _uint32_bytes(positions)
+            for entry_id, positions in index.id_postings.items()
+        }),
+        'terms': json.dumps(knowledge_terms(entries), ensure_ascii=False).encode('utf-8')
+    }
+
+    offset = HEADER.size + SECTION.size * len(SECTION_NAMES)
+    directory = []
+    for name in SECTION_NAMES:
+        directory.append(SECTION.pack(name.encode('ascii'), offset, len(sections[name])))
+        offset += len(sections[name])
+
+    # Write under a unique name next to the target and rename, so mapped readers keep the old
+    # file intact and concurrent compilers never write to the same file
+    temp_file = tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(output_path)),
+                                            prefix=os.path.basename(output_path) + '.', suffix='.tmp', delete=False)
+    try:
+        with temp_file as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, ngram_size, len(SECTION_NAMES)))
+            f.write(b''.join(directory))
+            for name in SECTION_NAMES:
+                f.write(sections[name])
+        os.replace(temp_file.name, output_path)
+    except BaseException:
+        if os.path.exists(temp_file.name):
+            os.remove(temp_file.name)
+        raise
+
+
+def is_compiled_knowledge_base(path: str) -> bool:
+    """
+    Check whether a file is a compiled knowledge base.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        True if the file starts with the compiled format magic, False otherwise
+    """
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _uint64_view(buffer: memoryview) -> Sequence[int]:
+    """
+    Read an array of little-endian uint64.
+
+    Args:
+        buffer: Packed bytes
+
+    Returns:
+        The mapped bytes viewed as integers on little-endian machines, a byte-swapped copy elsewhere
+    """
+    if sys.byteorder == 'little':
+        return buffer.cast('Q')
+    values = array('Q')
+    values.frombytes(buffer)
+    values.byteswap()
+    return values
+
+
+class MappedTable:
+    """Read-only key -> value table over a memory-mapped section."""
+
+    def __init__(self, buffer: memoryview, decode_value, key_type=str):
+        """
+        Parse the table directory.
+
+        Args:
+            buffer: Section bytes
+            decode_value: Function turning value bytes into the Python value
+            key_type: str for UTF-8 keys, bytes for raw keys
+        """
+        self.buffer = buffer
+        self.decode_value = decode_value
+        self.key_type = key_type
+        (self.count,) = struct.unpack_from('<I', buffer, 0)
+        offsets_size = 8 * (self.count + 1)
+        self.key_offsets = _uint64_view(buffer[4:4 + offsets_size])
+        self.value_offsets = _uint64_view(buffer[4 + offsets_size:4 + 2 * offsets_size])
+        self.keys_start = 4 + 2 * offsets_size
+        self.values_start = self.keys_start + self.key_offsets[self.count]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _key_at(self, position: int) -> bytes:
+        start = self.keys_start + self.key_offsets[position]
+        end = self.keys_start + self.key_offsets[position + 1]
+        return bytes(self.buffer[start:end])
+
+    def value_at(self, position: int):
+        """
+        Decode the value stored at a table position.
+
+        Args:
+            position: Position in key order
+
+        Returns:
+            Decoded value
+        """
+        start = self.values_start + self.value_offsets[position]
+        end = self.values_start + self.value_offsets[position + 1]
+        return self.decode_value(self.buffer[start:end])
+
+    def _find(self, key: bytes) -> int:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self._key_at(low) == key:
+            return low
+        return -1
+
+    def get(self, key, default=None):
+        """
+        Look up a key.
+
+        Args:
+            key: Key to look up
+            default: Value returned if the key is missing
+
+        Returns:
+            Decoded value or the default
+        """
+        if key is None:
+            return default
+        encoded = key.encode('utf-8') if isinstance(key, str) else key
+        position = self._find(encoded)
+        return self.value_at(position) if position >= 0 else default
+
+    def items(self) -> Iterator[Tuple]:
+        """
+        Iterate over all keys and decoded values.
+
+        Yields:
+            Tuples of (key, value)
+        """
+        for position in range(self.count):
+            key = self._key_at(position)
+            yield (key.decode('utf-8') if self.key_type is str else key), self.value_at(position)
+
+
+def _decode_uint32(buffer: memoryview) -> List[int]:
+    values = array('I')
+    values.frombytes(buffer)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tolist()
+
+
+def _decode_gram_postings(buffer: memoryview) -> Dict[int, int]:
+    values = _decode_uint32(buffer)
+    return dict(zip(values[0::2], values[1::2]))
+
+
+class MappedEntries(Sequence):
+    """Lazily decoded sequence of knowledge entries stored in the mapped file."""
+
+    def __init__(self, table: MappedTable, cache_size: int = 4096):
+        """
+        Initialize the entry sequence.
+
+        Args:
+            table: Entries table keyed by big-endian position
+            cache_size: Maximum number of decoded entries kept in memory
+        """
+        self.table = table
+        self.cache_size = cache_size
+        self._cache: Dict[int, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError('entry index out of range')
+
+        entry = self._cache.get(position)
+        if entry is None:
+            # Keys are big-endian positions, so key order is position order
+            entry = json.loads(bytes(self.table.value_at(position)).decode('utf-8'))
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[position] = entry
+        return entry
+
+    def raw(self, position: int) -> bytes:
+        """
+        Get the encoded entry at a position without decoding it.
+
+        Args:
+            position: Entry position
+
+        Returns:
+            UTF-8 JSON of the entry
+        """
+        return bytes(self.table.value_at(position))
+
+
+class StoredFeatures(EntryFeatures):
+    """Entry features read from the features section instead of being computed from the entry."""
+
+    __slots__ = ('_ngram_size', '_ngrams')
+
+    def __init__(self, record: List, ngram_size: int):
+        """
+        Unpack a stored feature record.
+
+        Args:
+            record: Record written by _feature_record
+            ngram_size: Character n-gram size of the index
+        """
+        self.entry_id, self.title, self.description, scenarios, keywords, related, intent_bits = record
+        self.scenarios = tuple(scenarios)
+        self.keywords = frozenset(keywords)
+        self.related = tuple(related)
+        for bit, flag in enumerate(INTENT_FLAGS.values()):
+            setattr(self, flag, bool(intent_bits >> bit & 1))
+        self._ngram_size = ngram_size
+        self._ngrams = None
+
+    @property
+    def ngrams(self) -> Dict[str, int]:
+        """n-gram -> field bits, derived on first use as mapped indexes read the grams section instead."""
+        if self._ngrams is None:
+            fields = {'title': self.title, 'description': self.description, 'scenarios': list(self.scenarios)}
+            self._ngrams = EntryFeatures(fields, self._ngram_size).ngrams
+        return self._ngrams
+
+
+class MappedFeatures(Sequence):
+    """
+    Entry features decoded on first access from the features section.
+
+    A query touches every entry sharing an n-gram with its keywords, thousands on
+    large corpora, so decoded features are kept in an LRU cache; without n-grams
+    they take a fraction of the memory of a parsed knowledge base.
+    """
+
+    def __init__(self, table: 'MappedTable', ngram_size: int, cache_size: int = 65536):
+        """
+        Initialize the feature sequence.
+
+        Args:
+            table: Features table keyed by big-endian position
+            ngram_size: Character n-gram size of the index
+            cache_size: Maximum number of decoded features kept in memory
+        """
+        self.table = table
+        self.ngram_size = ngram_size
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[int, EntryFeatures]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+
+        cache = self._cache
+        features = cache.get(position)
+        if features is not None:
+            try:
+                cache.move_to_end(position)
+            except KeyError:
+                # Evicted by a concurrent query in between
+                pass
+            return features
+
+        if not 0 <= position < len(self):
+            raise IndexError('feature index out of range')
+        record = json.loads(bytes(self.table.value_at(position)).decode('utf-8'))
+        features = StoredFeatures(record, self.ngram_size)
+        cache[position] = features
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return features
+
+
+class MappedKnowledgeIndex(KnowledgeIndex):
+    """KnowledgeIndex whose posting lists are read from the compiled file on demand."""
+
+    def __init__(self, compiled: 'CompiledKnowledgeBase'):
+        """
+        Wrap the prebuilt tables of a compiled knowledge base.
+
+        Args:
+            compiled: Opened compiled knowledge base
+        """
+        self.entries = compiled.entries
+        self.ngram_size = compiled.ngram_size
+        self.features = MappedFeatures(compiled.table('features', lambda value: value, key_type=bytes),
+                                       compiled.ngram_size)
+        self.gram_postings = compiled.table('grams', _decode_gram_postings)
+        self.keyword_postings = compiled.table('keywords', _decode_uint32)
+        self.intent_postings = dict(compiled.table('intents', _decode_uint32).items())
+        self.id_postings = compiled.table('ids', _decode_uint32)
+        # Filled on demand by related_indexes()
+        self.related_graph = {}
+        self._compiled = compiled
+        self._build_common_questions()
+
+    def terms(self) -> List[str]:
+        """
+        Get the keywords and titles of the entries from the compiled section, without decoding any entry.
+
+        Returns:
+            Distinct terms in knowledge base order
+        """
+        return json.loads(bytes(self._compiled.sections['terms']).decode('utf-8'))
+
+
+class CompiledKnowledgeBase:
+    """Memory-mapped compiled knowledge base."""
+
+    def __init__(self, path: str):
+        """
+        Map a compiled knowledge base file.
+
+        Args:
+            path: Path to the compiled file
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self._mmap)
+
+        magic, version, self.ngram_size, section_count = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Not a compiled knowledge base (format {FORMAT_VERSION}): {path}")
+
+        self.sections: Dict[str, memoryview] = {}
+        for i in range(section_count):
+            name, offset, length = SECTION.unpack_from(self.buffer, HEADER.size + i * SECTION.size)
+            self.sections[name.rstrip(b'\0').decode('ascii')] = self.buffer[offset:offset + length]
+
+        self.meta = json.loads(bytes(self.sections['meta']).decode('utf-8'))
+        self.entries = MappedEntries(self.table('entries', lambda value: value, key_type=bytes))
+
+    def table(self, name: str, decode_value, key_type=str) -> MappedTable:
+        """
+        Open a table section.
+
+        Args:
+            name: Section name
+            decode_value: Function turning value bytes into the Python value
+            key_type: str for UTF-8 keys, bytes for raw keys
+
+        Returns:
+            Mapped table
+        """
+        return MappedTable(self.sections[name], decode_value, key_type)
+
+    def knowledge_base(self) -> Dict:
+        """
+        Get the knowledge base dictionary with lazily decoded entries.
+
+        Returns:
+            Knowledge base dictionary
+        """
+        knowledge_base = dict(self.meta)
+        knowledge_base['data'] = self.entries
+        return knowledge_base
+
+    def index(self) -> MappedKnowledgeIndex:
+        """
+        Get the prebuilt index.
+
+        Returns:
+            Knowledge index backed by the mapping
+        """
+        return MappedKnowledgeIndex(self)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python kb_compiler.py <knowledge-base.json> <output.kbc>")
+        sys.exit(1)
+    compile_knowledge_base(sys.argv[1], sys.argv[2])
+    print(f"Compiled {sys.argv[1]} -> {sys.argv[2]}")
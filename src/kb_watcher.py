@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Knowledge Base Watcher Module
+Polls the knowledge base file and triggers an incremental reload when it changes.
+"""
+
+import os
+import threading
+from typing import Callable, Optional, Tuple
+
+
+class KnowledgeBaseWatcher:
+    """Background thread that watches a file by modification time and size."""
+
+    def __init__(self, path: str, on_change: Callable[[], None], interval: float = 2.0):
+        """
+        Initialize the watcher.
+
+        Args:
+            path: Path of the watched file
+            on_change: Callback invoked from the watcher thread after the file changed
+            interval: Polling interval in seconds
+        """
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_signature = self._signature()
+
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        """
+        Get the modification time and size of the watched file.
+
+        Returns:
+            Tuple of (mtime in nanoseconds, size), or None if the file is missing
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self) -> bool:
+        """
+        Check the file once and invoke the callback if it changed.
+
+        Returns:
+            True if a change was detected, False otherwise
+        """
+        signature = self._signature()
+        if signature is None or signature == self._last_signature:
+            return False
+
+        try:
+            self.on_change()
+        except Exception as e:
+            # Keep the old signature so that the reload is retried on the next poll,
+            # e.g. when the file was caught half-written
+            print(f"Knowledge base reload failed: {e}")
+            return False
+
+        self._last_signature = signature
+        return True
+
+    def _run(self):
+        """
+        Poll the file until the watcher is stopped.
+        """
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """
+        Start watching in a daemon thread.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='kb-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop watching and wait for the thread to exit.
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
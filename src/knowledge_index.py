@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Knowledge Index Module
+Builds an inverted index over the knowledge base so that retrieval only scores candidate entries.
+"""
+
+from bisect import insort
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+from pattern_matcher import AhoCorasick
+from segmenter import knowledge_terms
+
+# Field weights used by the hand-weighted relevance score
+TITLE_WEIGHT = 3.0
+TITLE_EXACT_BONUS = 2.0
+DESCRIPTION_WEIGHT = 2.0
+KEYWORD_WEIGHT = 2.5
+SCENARIO_WEIGHT = 1.5
+INTENT_BONUS = 1.5
+COMMON_QUESTION_BONUS = 5.0
+
+# Field bits stored in the n-gram posting lists
+FIELD_TITLE = 1
+FIELD_DESCRIPTION = 2
+FIELD_SCENARIOS = 4
+ALL_FIELDS = FIELD_TITLE | FIELD_DESCRIPTION | FIELD_SCENARIOS
+
+# Cue words in an entry description that earn the intent bonus
+INTENT_CUE_WORDS = {
+    'why': ['因为', '由于', '是因为', '源于', '起因'],
+    'when': ['时间', '时候', '何时', '什么时候', '通常', '一般'],
+    'how': ['如何', '怎么', '怎样', '方法', '步骤'],
+    'where': ['地方', '位置', '地点', '在', '于']
+}
+
+# Common question phrases and the entry they boost
+COMMON_QUESTIONS = {
+    '过年': 'spring-festival',
+    '春节': 'spring-festival',
+    '除夕': 'new-years-eve',
+    '守岁': 'shou-sui',
+    '压岁钱': 'lucky-money',
+    '红包': 'red-packets',
+    '春联': 'couplets',
+    '福字': 'fu-character',
+    '倒贴福': 'fu-character',
+    '年糕': 'rice-cake',
+    '饺子': 'dumplings',
+    '放鞭炮': 'firecrackers',
+    '烟花': 'firecrackers',
+    '庙会': 'temple-fair',
+    '舞龙': 'dragon-lion-dance',
+    '舞狮': 'dragon-lion-dance',
+    '元宵节': 'lantern-festival',
+    '灯会': 'lanterns',
+    '猜灯谜': 'lantern-riddles',
+    '清明': 'qingming-festival',
+    '端午节': 'dragon-boat-festival',
+    '粽子': 'dragon-boat-festival',
+    '七夕': 'qixi-festival',
+    '中秋': 'mid-autumn-festival',
+    '月饼': 'mid-autumn-festival',
+    '重阳': 'double-ninth-festival'
+}
+
+# Intent -> EntryFeatures flag set from its cue words
+INTENT_FLAGS = {
+    'why': 'has_reason',
+    'when': 'has_time',
+    'how': 'has_method',
+    'where': 'has_place'
+}
+
+# Cue word -> intents it signals, matched over each description in one pass
+CUE_WORD_INTENTS = {
+    cue_word: [intent for intent, words in INTENT_CUE_WORDS.items() if cue_word in words]
+    for cue_words in INTENT_CUE_WORDS.values()
+    for cue_word in cue_words
+}
+CUE_WORD_MATCHER = AhoCorasick(CUE_WORD_INTENTS)
+
+
+class EntryFeatures:
+    """Compact precomputed form of a knowledge entry used for scoring."""
+
+    __slots__ = (
+        'entry_id', 'title', 'description', 'scenarios', 'keywords', 'related', 'ngrams',
+        'has_reason', 'has_time', 'has_method', 'has_place'
+    )
+
+    def __init__(self, entry: Dict, ngram_size: int = 2):
+        """
+        Precompute the scoring features of a knowledge entry.
+
+        Args:
+            entry: Knowledge entry dictionary
+            ngram_size: Length of the character n-grams
+        """
+        self.entry_id = entry.get('id')
+        self.title = entry.get('title', '')
+        self.description = entry.get('description', '')
+        self.scenarios = tuple(entry.get('scenarios', []))
+        self.keywords = frozenset(entry.get('keywords', []))
+        self.related = tuple(entry.get('related', []))
+
+        # n-gram -> field bits of the fields containing it
+        self.ngrams: Dict[str, int] = {}
+        self._add_grams(self.title, FIELD_TITLE, ngram_size)
+        self._add_grams(self.description, FIELD_DESCRIPTION, ngram_size)
+        for scenario in self.scenarios:
+            self._add_grams(scenario, FIELD_SCENARIOS, ngram_size)
+
+        intents = set()
+        for cue_word in CUE_WORD_MATCHER.find_all(self.description):
+            intents.update(CUE_WORD_INTENTS[cue_word])
+        for intent, flag in INTENT_FLAGS.items():
+            setattr(self, flag, intent in intents)
+
+    def _add_grams(self, text: str, field: int, ngram_size: int):
+        """
+        Record the n-grams of a field value.
+
+        Args:
+            text: Field value
+            field: Field bit of the value
+            ngram_size: Length of the character n-grams
+        """
+        ngrams = self.ngrams
+        for gram in ngram_set(text, ngram_size):
+            ngrams[gram] = ngrams.get(gram, 0) | field
+
+    def has_intent_cue(self, intent: str) -> bool:
+        """
+        Check whether the description carries a cue word for the intent.
+
+        Args:
+            intent: Query intent
+
+        Returns:
+            True if the intent bonus applies, False otherwise
+        """
+        flag = INTENT_FLAGS.get(intent)
+        return bool(flag) and getattr(self, flag)
+
+
+def ngram_set(text: str, ngram_size: int) -> Set[str]:
+    """
+    Get the distinct character n-grams of a string.
+
+    Args:
+        text: Input string
+        ngram_size: Length of the n-grams
+
+    Returns:
+        Set of n-grams
+    """
+    return {text[i:i + ngram_size] for i in range(len(text) - ngram_size + 1)}
+
+
+def diff_entries(old_ids: Sequence[Hashable], new_ids: Sequence[Hashable],
+                 same: Callable[[int, int], bool]) -> Tuple[List[Optional[int]], Dict[str, int]]:
+    """
+    Match the entries of a new knowledge base version to the previous version by id.
+
+    Args:
+        old_ids: Entry ids of the previous version, by position
+        new_ids: Entry ids of the new version, by position
+        same: Tells whether the previous entry at the first position equals the new entry at the second
+
+    Returns:
+        Tuple of (position of the equal previous entry for each new entry, None if added or updated;
+        counts of added, updated, removed and unchanged entries)
+    """
+    old_positions = {}
+    for position, entry_id in enumerate(old_ids):
+        old_positions.setdefault(entry_id, position)
+
+    matches: List[Optional[int]] = []
+    changes = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+    seen_ids = set()
+    for position, entry_id in enumerate(new_ids):
+        seen_ids.add(entry_id)
+        old_position = old_positions.get(entry_id)
+        if old_position is None:
+            changes['added'] += 1
+            matches.append(None)
+        elif same(old_position, position):
+            changes['unchanged'] += 1
+            matches.append(old_position)
+        else:
+            changes['updated'] += 1
+            matches.append(None)
+    changes['removed'] = len(set(old_positions) - seen_ids)
+    return matches, changes
+
+
+class KnowledgeIndex:
+    """Inverted index mapping character n-grams and keywords to knowledge entries."""
+
+    def __init__(self, entries: List[Dict], ngram_size: int = 2, features: Optional[List[EntryFeatures]] = None):
+        """
+        Build the index for a list of knowledge entries.
+
+        Args:
+            entries: Knowledge entries, addressed by their position in the list
+            ngram_size: Length of the character n-grams used for substring candidates
+            features: Precomputed features of the entries, computed here if omitted
+        """
+        self.entries = entries
+        self.ngram_size = ngram_size
+        if features is None:
+            features = [EntryFeatures(entry, ngram_size) for entry in entries]
+        self.features = features
+
+        # n-gram -> {entry index: field bits}
+        self.gram_postings: Dict[str, Dict[int, int]] = {}
+        # keyword -> entry indexes whose keywords field lists it
+        self.keyword_postings: Dict[str, List[int]] = {}
+        # intent -> entry indexes whose description carries a cue word
+        self.intent_postings: Dict[str, List[int]] = {intent: [] for intent in INTENT_FLAGS}
+        # entry id -> entry indexes
+        self.id_postings: Dict[str, List[int]] = {}
+
+        for index, entry_features in enumerate(features):
+            self._add_entry(index, entry_features)
+
+        # entry index -> indexes of its related entries
+        self.related_graph: Dict[int, List[int]] = {}
+        for index in range(len(features)):
+            self.related_indexes(index)
+
+        self._build_common_questions()
+
+    def _build_common_questions(self):
+        """
+        Compile the common question matcher and resolve the entries it boosts.
+        """
+        # Common question phrase -> boosted entry indexes
+        self.common_question_matcher = AhoCorasick(COMMON_QUESTIONS)
+        self.common_question_postings: Dict[str, List[int]] = {
+            question: self.id_postings.get(entry_id, [])
+            for question, entry_id in COMMON_QUESTIONS.items()
+        }
+
+    def _add_entry(self, index: int, features: EntryFeatures):
+        """
+        Add the features of a single entry to the posting lists.
+
+        Args:
+            index: Position of the entry in the entry list
+            features: Precomputed entry features
+        """
+        gram_postings = self.gram_postings
+        for gram, fields in features.ngrams.items():
+            postings = gram_postings.get(gram)
+            if postings is None:
+                gram_postings[gram] = {index: fields}
+            else:
+                postings[index] = fields
+
+        for keyword in features.keywords:
+            self.keyword_postings.setdefault(keyword, []).append(index)
+
+        for intent in INTENT_FLAGS:
+            if features.has_intent_cue(intent):
+                self.intent_postings[intent].append(index)
+
+        self.id_postings.setdefault(features.entry_id, []).append(index)
+
+    def related_indexes(self, index: int) -> List[int]:
+        """
+        Get the entries listed in the related field of an entry, in knowledge base order.
+
+        Args:
+            index: Position of the entry
+
+        Returns:
+            Positions of the related entries
+        """
+        related = self.related_graph.get(index)
+        if related is None:
+            positions = set()
+            for related_id in self.features[index].related:
+                positions.update(self.id_postings.get(related_id, []))
+            related = sorted(positions)
+            self.related_graph[index] = related
+        return related
+
+    def entry_ids(self) -> List[Hashable]:
+        """
+        Get the ids of the entries by position.
+
+        Returns:
+            Entry ids, None for entries without one
+        """
+        return [features.entry_id for features in self.features]
+
+    def updated(self, entries: List[Dict], features: List[EntryFeatures],
+                removed: List[int], added: List[int]) -> 'KnowledgeIndex':
+        """
+        Build the index of a new knowledge base version by patching the postings of this one.
+
+        Only the postings of the given entries are touched; they are copied before
+        the first change and all others are shared, so this index stays valid for
+        the queries still running on it. Every other entry must keep its position.
+
+        Args:
+            entries: Entries of the new version
+            features: Features of the new entries
+            removed: Positions in this index of the entries removed or changed
+            added: Positions in the new version of the entries added or changed
+
+        Returns:
+            Index of the new version
+        """
+        index = KnowledgeIndex.__new__(KnowledgeIndex)
+        index.entries = entries
+        index.ngram_size = self.ngram_size
+        index.features = features
+        index.gram_postings = dict(self.gram_postings)
+        index.keyword_postings = dict(self.keyword_postings)
+        index.intent_postings = dict(self.intent_postings)
+        index.id_postings = dict(self.id_postings)
+
+        # Posting lists already copied for the new index, by table and key
+        copied = set()
+
+        def own(table: Dict, key, empty):
+            postings = table.get(key)
+            if postings is None:
+                postings = table[key] = empty
+            elif (id(table), key) not in copied:
+                postings = table[key] = postings.copy()
+            copied.add((id(table), key))
+            return postings
+
+        def discard(table: Dict, key, position: int):
+            postings = own(table, key, [])
+            postings.remove(position)
+            if not postings:
+                del table[key]
+
+        changed_ids = set()
+        for position in removed:
+            old_features = self.features[position]
+            for gram in old_features.ngrams:
+                postings = own(index.gram_postings, gram, {})
+                del postings[position]
+                if not postings:
+                    del index.gram_postings[gram]
+            for keyword in old_features.keywords:
+                discard(index.keyword_postings, keyword, position)
+            for intent in INTENT_FLAGS:
+                if old_features.has_intent_cue(intent):
+                    own(index.intent_postings, intent, []).remove(position)
+            discard(index.id_postings, old_features.entry_id, position)
+            changed_ids.add(old_features.entry_id)
+
+        for position in added:
+            new_features = features[position]
+            for gram, fields in new_features.ngrams.items():
+                own(index.gram_postings, gram, {})[position] = fields
+            for keyword in new_features.keywords:
+                insort(own(index.keyword_postings, keyword, []), position)
+            for intent in INTENT_FLAGS:
+                if new_features.has_intent_cue(intent):
+                    insort(own(index.intent_postings, intent, []), position)
+            insort(own(index.id_postings, new_features.entry_id, []), position)
+            changed_ids.add(new_features.entry_id)
+
+        # Related links are resolved again for the changed entries and for entries linking to a changed id
+        index.related_graph = {
+            position: related for position, related in self.related_graph.items()
+            if position < len(features) and not changed_ids.intersection(features[position].related)
+        }
+        for position in added:
+            index.related_graph.pop(position, None)
+        for position in range(len(features)):
+            index.related_indexes(position)
+
+        index.common_question_matcher = self.common_question_matcher
+        index.common_question_postings = {
+            question: index.id_postings.get(entry_id, [])
+            for question, entry_id in COMMON_QUESTIONS.items()
+        }
+        return index
+
+    def terms(self) -> List[str]:
+        """
+        Get the keywords and titles of the entries, the vocabulary of the question segmenter.
+
+        Returns:
+            Distinct terms in knowledge base order
+        """
+        return knowledge_terms(self.entries)
+
+    def candidates(self, keyword: str) -> Dict[int, int]:
+        """
+        Get the entries that may contain a keyword, with the fields it may occur in.
+
+        Every n-gram of the keyword has to occur in a field for the keyword to be a
+        substring of it, so the result is a superset of the real matches.
+
+        Args:
+            keyword: Query keyword
+
+        Returns:
+            Dict mapping entry index to candidate field bits
+        """
+        if len(keyword) < self.ngram_size:
+            return {index: ALL_FIELDS for index in range(len(self.entries))}
+
+        posting_lists = []
+        for gram in ngram_set(keyword, self.ngram_size):
+            postings = self.gram_postings.get(gram)
+            if not postings:
+                return {}
+            posting_lists.append(postings)
+
+        # Intersect starting from the shortest posting list
+        posting_lists.sort(key=len)
+        result = dict(posting_lists[0])
+        for postings in posting_lists[1:]:
+            for index in list(result):
+                fields = result[index] & postings.get(index, 0)
+                if fields:
+                    result[index] = fields
+                else:
+                    del result[index]
+            if not result:
+                break
+
+        return result
+
+    def score_keywords(self, keywords: List[str],
+                       memo: Optional[Dict[str, List[Tuple[int, float]]]] = None) -> Dict[int, float]:
+        """
+        Score the keyword matches of candidate entries with the field weights.
+
+        Args:
+            keywords: List of keywords from the query
+            memo: Optional per-keyword contributions shared between the queries of a batch
+
+        Returns:
+            Dict mapping entry index to keyword score
+        """
+        scores: Dict[int, float] = {}
+
+        for keyword in keywords:
+            if memo is None:
+                contributions = self.keyword_contributions(keyword)
+            else:
+                contributions = memo.get(keyword)
+                if contributions is None:
+                    contributions = memo[keyword] = self.keyword_contributions(keyword)
+            for index, score in contributions:
+                scores[index] = scores.get(index, 0.0) + score
+
+        return scores
+
+    def keyword_contributions(self, keyword: str) -> List[Tuple[int, float]]:
+        """
+        Get the score additions of one keyword, in the order they are applied.
+
+        Args:
+            keyword: Query keyword
+
+        Returns:
+            List of (entry index, score) pairs; an entry appears twice if the keyword
+            matches both its text fields and its keyword list
+        """
+        contributions = []
+        features = self.features
+
+        for index, fields in self.candidates(keyword).items():
+            entry_features = features[index]
+            score = 0.0
+
+            if fields & FIELD_TITLE and keyword in entry_features.title:
+                score += TITLE_WEIGHT
+                if keyword == entry_features.title:
+                    score += TITLE_EXACT_BONUS
+
+            if fields & FIELD_DESCRIPTION and keyword in entry_features.description:
+                score += DESCRIPTION_WEIGHT
+
+            if fields & FIELD_SCENARIOS:
+                for scenario in entry_features.scenarios:
+                    if keyword in scenario:
+                        score += SCENARIO_WEIGHT
+
+            if score:
+                contributions.append((index, score))
+
+        for index in self.keyword_postings.get(keyword, []):
+            contributions.append((index, KEYWORD_WEIGHT))
+
+        return contributions
+
+    def common_question_hits(self, *texts: str) -> List[int]:
+        """
+        Get the entries boosted by the common question phrases found in the texts.
+
+        Args:
+            texts: Question texts to scan
+
+        Returns:
+            Entry indexes, repeated once per matched phrase
+        """
+        questions = set()
+        for text in texts:
+            questions |= self.common_question_matcher.find_all(text)
+
+        hits = []
+        for question in questions:
+            hits.extend(self.common_question_postings[question])
+        return hits
@@ -1,196 +1,358 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-
-"""
-Knowledge Retrieval Module
-Retrieves relevant information from the knowledge base based on processed queries.
-"""
-
-import json
-from typing import Dict, List, Tuple
-
-class KnowledgeRetriever:
-    """Retrieves relevant information from the knowledge base."""
-
-    def __init__(self, knowledge_base_path: str):
-        """
-        Initialize the knowledge retriever.
-
-        Args:
-            knowledge_base_path: Path to the knowledge base JSON file
-        """
-        self.knowledge_base_path = knowledge_base_path
-        self.knowledge_base = self._load_knowledge_base()
-
-    def _load_knowledge_base(self) -> Dict:
-        """
-        Load the knowledge base from the JSON file.
-
-        Returns:
-            Knowledge base as a dictionary
-        """
-        with open(self.knowledge_base_path, 'r', encoding='utf-8') as f:
-            knowledge_base = json.load(f)
-        return knowledge_base
-
-    def retrieve(self, query: Dict, top_n: int = 3) -> List[Dict]:
-        """
-        Retrieve relevant knowledge entries based on the processed query.
-
-        Args:
-            query: Processed query dictionary
-            top_n: Number of top relevant entries to return
-
-        Returns:
-            List of top N relevant knowledge entries
-        """
-        # Extract keywords from the query
-        keywords = query.get('keywords', [])
-
-        # Calculate relevance scores for each entry
-        scored_entries = []
-        for entry in self.knowledge_base['data']:
-            score = self._calculate_relevance(entry, keywords, query)
-            if score > 0:
-                scored_entries.append((score, entry))
-
-        # Sort by relevance score (descending)
-        scored_entries.sort(key=lambda x: x[0], reverse=True)
-
-        # Return top N entries
-        top_entries = [entry for _, entry in scored_entries[:top_n]]
-        return top_entries
-
-    def _calculate_relevance(self, entry: Dict, keywords: List[str], query: Dict) -> float:
-        """
-        Calculate the relevance score of a knowledge entry to the query.
-
-        Args:
-            entry: Knowledge entry dictionary
-            keywords: List of keywords from the query
-            query: Processed query dictionary
-
-        Returns:
-            Relevance score as a float
-        """
-        score = 0.0
-
-        # Get original question for better matching
-        original_question = query.get('original_question', '')
-        cleaned_question = query.get('cleaned_question', '')
-
-        # Match keywords in title
-        title = entry.get('title', '')
-        for keyword in keywords:
-            if keyword in title:
-                score += 3.0  # Higher weight for title matches
-                # Extra weight for exact matches
-                if keyword == title:
-                    score += 2.0
-
-        # Match keywords in description
-        description = entry.get('description', '')
-        for keyword in keywords:
-            if keyword in description:
-                score += 2.0  # Medium weight for description matches
-
-        # Match keywords in keywords field
-        entry_keywords = entry.get('keywords', [])
-        for keyword in keywords:
-            if keyword in entry_keywords:
-                score += 2.5  # Slightly higher weight for explicit keywords
-
-        # Match keywords in scenarios
-        scenarios = entry.get('scenarios', [])
-        for scenario in scenarios:
-            for keyword in keywords:
-                if keyword in scenario:
-                    score += 1.5  # Lower weight for scenario matches
-
-        # Adjust score based on intent
-        intent = query.get('intent', '')
-        if intent == 'why' and any(reason_word in description for reason_word in ['因为', '由于', '是因为', '源于', '起因']):
-            score += 1.5
-        elif intent == 'when' and any(time_word in description for time_word in ['时间', '时候', '何时', '什么时候', '通常', '一般']):
-            score += 1.5
-        elif intent == 'how' and any(method_word in description for method_word in ['如何', '怎么', '怎样', '方法', '步骤']):
-            score += 1.5
-        elif intent == 'where' and any(place_word in description for place_word in ['地方', '位置', '地点', '在', '于']):
-            score += 1.5
-
-        # Handle common questions
-        common_questions = {
-            '过年': 'spring-festival',
-            '春节': 'spring-festival',
-            '除夕': 'new-years-eve',
-            '守岁': 'shou-sui',
-            '压岁钱': 'lucky-money',
-            '红包': 'red-packets',
-            '春联': 'couplets',
-            '福字': 'fu-character',
-            '倒贴福': 'fu-character',
-            '年糕': 'rice-cake',
-            '饺子': 'dumplings',
-            '放鞭炮': 'firecrackers',
-            '烟花': 'firecrackers',
-            '庙会': 'temple-fair',
-            '舞龙': 'dragon-lion-dance',
-            '舞狮': 'dragon-lion-dance',
-            '元宵节': 'lantern-festival',
-            '灯会': 'lanterns',
-            '猜灯谜': 'lantern-riddles',
-            '清明': 'qingming-festival',
-            '端午节': 'dragon-boat-festival',
-            '粽子': 'dragon-boat-festival',
-            '七夕': 'qixi-festival',
-            '中秋': 'mid-autumn-festival',
-            '月饼': 'mid-autumn-festival',
-            '重阳': 'double-ninth-festival'
-        }
-
-        # Check for common questions
-        for question, entry_id in common_questions.items():
-            if question in original_question or question in cleaned_question:
-                if entry.get('id') == entry_id:
-                    score += 5.0  # High weight for common question matches
-
-        return score
-
-    def get_related_entries(self, entry_id: str, top_n: int = 2) -> List[Dict]:
-        """
-        Get related knowledge entries based on the entry ID.
-
-        Args:
-            entry_id: ID of the knowledge entry
-            top_n: Number of top related entries to return
-
-        Returns:
-            List of top N related knowledge entries
-        """
-        # Find the entry with the given ID
-        target_entry = None
-        for entry in self.knowledge_base['data']:
-            if entry.get('id') == entry_id:
-                target_entry = entry
-                break
-
-        if not target_entry:
-            return []
-
-        # Get related entry IDs
-        related_ids = target_entry.get('related', [])
-
-        # Find and return related entries
-        related_entries = []
-        for entry in self.knowledge_base['data']:
-            if entry.get('id') in related_ids:
-                related_entries.append(entry)
-
-        # Return top N related entries
-        return related_entries[:top_n]
-
-    def reload_knowledge_base(self):
-        """
-        Reload the knowledge base from the JSON file.
-        """
-        self.knowledge_base = self._load_knowledge_base()
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Knowledge Retrieval Module
+Retrieves relevant information from the knowledge base based on processed queries.
+"""
+
+import json
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from knowledge_index import KnowledgeIndex, EntryFeatures, diff_entries
+from kb_compiler import CompiledKnowledgeBase, MappedEntries, MappedKnowledgeIndex, is_compiled_knowledge_base
+from kb_watcher import KnowledgeBaseWatcher
+from scorers import RelevanceScorer, WeightedScorer, BM25Scorer
+from vector_scorer import VectorScorer
+from dense_retriever import DenseScorer, HybridScorer
+
+# Relevance scorers selectable by name
+SCORERS = {
+    WeightedScorer.name: WeightedScorer,
+    BM25Scorer.name: BM25Scorer,
+    VectorScorer.name: VectorScorer,
+    DenseScorer.name: DenseScorer,
+    HybridScorer.name: HybridScorer
+}
+
+class KnowledgeSnapshot:
+    """One loaded knowledge base version with the index and scorer built for it."""
+
+    __slots__ = ('knowledge_base', 'index', 'scorer')
+
+    def __init__(self, knowledge_base: Dict, index: KnowledgeIndex, scorer: RelevanceScorer):
+        """
+        Bundle a knowledge base version.
+
+        Args:
+            knowledge_base: Knowledge base dictionary
+            index: Index built for its entries
+            scorer: Scorer built on the index
+        """
+        self.knowledge_base = knowledge_base
+        self.index = index
+        self.scorer = scorer
+
+
+class KnowledgeRetriever:
+    """Retrieves relevant information from the knowledge base."""
+
+    def __init__(self, knowledge_base_path: str, scorer: Union[str, RelevanceScorer] = 'weighted'):
+        """
+        Initialize the knowledge retriever.
+
+        Args:
+            knowledge_base_path: Path to the knowledge base JSON file, or to a file
+                compiled by kb_compiler, which is memory-mapped instead of parsed
+            scorer: Relevance scorer or its name ('weighted', 'bm25', 'numpy', 'dense' or 'hybrid')
+        """
+        self.knowledge_base_path = knowledge_base_path
+        self._reload_lock = threading.Lock()
+        self._reload_listeners: List[Callable[[Dict], None]] = []
+        self._watcher: Optional[KnowledgeBaseWatcher] = None
+
+        # Queries read the snapshot reference once, reloads replace it in a single assignment
+        if is_compiled_knowledge_base(knowledge_base_path):
+            compiled = CompiledKnowledgeBase(knowledge_base_path)
+            knowledge_base, index = compiled.knowledge_base(), compiled.index()
+        else:
+            knowledge_base = self._load_knowledge_base()
+            index = KnowledgeIndex(knowledge_base['data'])
+        self._scorer_template = self._create_scorer(scorer)
+        self._snapshot = KnowledgeSnapshot(knowledge_base, index, self._build_scorer(index))
+
+    @property
+    def knowledge_base(self) -> Dict:
+        """Knowledge base dictionary of the current snapshot."""
+        return self._snapshot.knowledge_base
+
+    @property
+    def index(self) -> KnowledgeIndex:
+        """Knowledge index of the current snapshot."""
+        return self._snapshot.index
+
+    @property
+    def scorer(self) -> RelevanceScorer:
+        """Relevance scorer of the current snapshot."""
+        return self._snapshot.scorer
+
+    def _create_scorer(self, scorer: Union[str, RelevanceScorer]) -> RelevanceScorer:
+        """
+        Resolve a scorer name into a scorer instance.
+
+        Args:
+            scorer: Relevance scorer or its name
+
+        Returns:
+            Relevance scorer instance
+        """
+        if isinstance(scorer, RelevanceScorer):
+            return scorer
+        if scorer not in SCORERS:
+            raise ValueError(f"Unknown relevance scorer: {scorer}")
+        return SCORERS[scorer]()
+
+    def _build_scorer(self, index: KnowledgeIndex, previous: Optional[RelevanceScorer] = None) -> RelevanceScorer:
+        """
+        Build a fresh copy of the configured scorer for an index.
+
+        Args:
+            index: Knowledge index to build on
+            previous: Scorer of the previous snapshot
+
+        Returns:
+            Built relevance scorer
+        """
+        scorer = self._scorer_template.clone()
+        scorer.build(index, previous)
+        return scorer
+
+    def set_scorer(self, scorer: Union[str, RelevanceScorer]):
+        """
+        Switch the relevance scorer used for retrieval.
+
+        Args:
+            scorer: Relevance scorer or its name
+        """
+        with self._reload_lock:
+            snapshot = self._snapshot
+            self._scorer_template = self._create_scorer(scorer)
+            self._snapshot = KnowledgeSnapshot(
+                snapshot.knowledge_base, snapshot.index, self._build_scorer(snapshot.index)
+            )
+
+    def _load_knowledge_base(self) -> Dict:
+        """
+        Load the knowledge base from the JSON file.
+
+        Returns:
+            Knowledge base as a dictionary
+        """
+        with open(self.knowledge_base_path, 'r', encoding='utf-8') as f:
+            knowledge_base = json.load(f)
+        return knowledge_base
+
+    def retrieve(self, query: Dict, top_n: int = 3) -> List[Dict]:
+        """
+        Retrieve relevant knowledge entries based on the processed query.
+
+        Args:
+            query: Processed query dictionary
+            top_n: Number of top relevant entries to return
+
+        Returns:
+            List of top N relevant knowledge entries
+        """
+        # Rank the candidate entries with the scorer of a single snapshot
+        snapshot = self._snapshot
+        data = snapshot.knowledge_base['data']
+        top_entries = [data[index] for index in snapshot.scorer.rank(query, top_n)]
+        return top_entries
+
+    def retrieve_batch(self, queries: List[Dict], top_n: int = 3) -> List[List[Dict]]:
+        """
+        Retrieve the relevant entries for several processed queries at once.
+
+        All queries are ranked against the same snapshot, identical queries are
+        ranked once, and the scorer may share keyword matching between queries.
+
+        Args:
+            queries: Processed query dictionaries
+            top_n: Number of top relevant entries to return per query
+
+        Returns:
+            List of top N relevant entries per query, in query order
+        """
+        snapshot = self._snapshot
+        data = snapshot.knowledge_base['data']
+
+        # Ranking only depends on the question texts, intent and keywords
+        positions: Dict[Tuple, int] = {}
+        unique_queries = []
+        slots = []
+        for query in queries:
+            key = (query.get('original_question', ''), query.get('cleaned_question', ''),
+                   query.get('intent', ''), tuple(query.get('keywords', [])))
+            slot = positions.get(key)
+            if slot is None:
+                slot = positions[key] = len(unique_queries)
+                unique_queries.append(query)
+            slots.append(slot)
+
+        ranked = snapshot.scorer.rank_batch(unique_queries, top_n)
+        results = [[data[index] for index in indexes] for indexes in ranked]
+        return [list(results[slot]) for slot in slots]
+
+    def get_entry(self, entry_id: str) -> Optional[Dict]:
+        """
+        Get a knowledge entry by its ID.
+
+        Args:
+            entry_id: ID of the knowledge entry
+
+        Returns:
+            The first entry with the ID, or None
+        """
+        snapshot = self._snapshot
+        positions = snapshot.index.id_postings.get(entry_id)
+        return snapshot.knowledge_base['data'][positions[0]] if positions else None
+
+    def get_related_entries(self, entry_id: str, top_n: Optional[int] = 2, hops: int = 1) -> List[Dict]:
+        """
+        Get related knowledge entries based on the entry ID.
+
+        Args:
+            entry_id: ID of the knowledge entry
+            top_n: Number of top related entries to return, all of them if None
+            hops: Number of related links to follow, e.g. 2 for related entries of related entries
+
+        Returns:
+            List of top N related knowledge entries, nearer hops first
+        """
+        # Read the snapshot once so that a concurrent reload cannot mix versions
+        snapshot = self._snapshot
+        index = snapshot.index
+        data = snapshot.knowledge_base['data']
+
+        # Find the entry with the given ID
+        positions = index.id_postings.get(entry_id)
+        if not positions:
+            return []
+        target = positions[0]
+
+        # Breadth-first expansion over the related graph
+        related = list(index.related_indexes(target))
+        visited = {target} | set(related)
+        frontier = related
+        for _ in range(hops - 1):
+            next_frontier = []
+            for position in frontier:
+                for neighbour in index.related_indexes(position):
+                    if neighbour not in visited:
+                        visited.add(neighbour)
+                        next_frontier.append(neighbour)
+            next_frontier.sort()
+            related.extend(next_frontier)
+            frontier = next_frontier
+
+        # Return top N related entries
+        if top_n is not None:
+            related = related[:top_n]
+        return [data[position] for position in related]
+
+    def reload_knowledge_base(self) -> Dict[str, int]:
+        """
+        Reload the knowledge base from the JSON file.
+
+        Entries are diffed by id. When unchanged entries keep their positions, the
+        postings of the removed, updated and added entries are patched into a copy
+        of the index; otherwise the index is rebuilt from the carried-over features
+        of the unchanged entries. Either way the new index and scorer are built off
+        to the side before the snapshot is swapped in, so in-flight queries never
+        see a half-built state.
+
+        Returns:
+            Counts of added, updated, removed and unchanged entries
+        """
+        with self._reload_lock:
+            previous = self._snapshot
+            old_entries = previous.knowledge_base['data']
+            if is_compiled_knowledge_base(self.knowledge_base_path):
+                # A compiled file carries its own prebuilt index, map the new version as a whole
+                compiled = CompiledKnowledgeBase(self.knowledge_base_path)
+                knowledge_base, index = compiled.knowledge_base(), compiled.index()
+                _, changes = diff_entries(previous.index.entry_ids(), index.entry_ids(),
+                                          self._entry_comparer(old_entries, knowledge_base['data']))
+            else:
+                knowledge_base = self._load_knowledge_base()
+                index, changes = self._update_index(previous, knowledge_base['data'])
+            self._snapshot = KnowledgeSnapshot(knowledge_base, index, self._build_scorer(index, previous.scorer))
+
+        for listener in list(self._reload_listeners):
+            listener(changes)
+        return changes
+
+    @staticmethod
+    def _entry_comparer(old_entries: Sequence[Dict], new_entries: Sequence[Dict]) -> Callable[[int, int], bool]:
+        """
+        Get the equality check of entries of two versions for diff_entries.
+
+        Args:
+            old_entries: Entries of the previous version
+            new_entries: Entries of the new version
+
+        Returns:
+            Function telling whether the old entry at one position equals the new entry at another
+        """
+        if isinstance(old_entries, MappedEntries) and isinstance(new_entries, MappedEntries):
+            # Equal encodings need no decoding; different ones may still hold equal entries
+            return lambda old, new: old_entries.raw(old) == new_entries.raw(new) or old_entries[old] == new_entries[new]
+        return lambda old, new: old_entries[old] == new_entries[new]
+
+    def _update_index(self, previous: KnowledgeSnapshot, entries: List[Dict]) -> Tuple[KnowledgeIndex, Dict[str, int]]:
+        """
+        Build the index of newly loaded entries from the index of the previous snapshot.
+
+        Args:
+            previous: Snapshot being replaced
+            entries: Newly loaded knowledge entries
+
+        Returns:
+            Tuple of (index of the new entries, change counts)
+        """
+        old_index = previous.index
+        matches, changes = diff_entries(old_index.entry_ids(), [entry.get('id') for entry in entries],
+                                        self._entry_comparer(previous.knowledge_base['data'], entries))
+        features = [
+            old_index.features[old_position] if old_position is not None
+            else EntryFeatures(entry, old_index.ngram_size)
+            for entry, old_position in zip(entries, matches)
+        ]
+
+        # Mapped postings are read-only, and moved entries would shift every later posting
+        if isinstance(old_index, MappedKnowledgeIndex) or any(
+                old_position not in (None, position) for position, old_position in enumerate(matches)):
+            return KnowledgeIndex(entries, old_index.ngram_size, features), changes
+
+        kept = {old_position for old_position in matches if old_position is not None}
+        removed = [position for position in range(len(old_index.features)) if position not in kept]
+        added = [position for position, old_position in enumerate(matches) if old_position is None]
+        return old_index.updated(entries, features, removed, added), changes
+
+    def add_reload_listener(self, listener: Callable[[Dict], None]):
+        """
+        Register a callback invoked with the change counts after every reload.
+
+        Args:
+            listener: Callback taking the change counts
+        """
+        self._reload_listeners.append(listener)
+
+    def start_watching(self, interval: float = 2.0):
+        """
+        Watch the knowledge base file and reload it when it changes.
+
+        Args:
+            interval: Polling interval in seconds
+        """
+        if self._watcher is None:
+            self._watcher = KnowledgeBaseWatcher(self.knowledge_base_path, self.reload_knowledge_base, interval)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """
+        Stop watching the knowledge base file.
+        """
+        if self._watcher is not None:
+            self._watcher.stop()
@@ -8,10 +8,22 @@ Integrates with OpenAI API to generate answers when knowledge base retrieval fai
 
 import os
 import json
+import re
 import time
 from typing import Dict, List, Optional
 from openai import OpenAI
 
+from llm_cache import LLMAnswerCache, normalize_question, replay
+from single_flight import StreamCoalescer
+from stream_filter import ANSWER_PREFIXES, COLLOQUIAL_PARTICLES, WHITESPACE_REWRITER, StreamFilter
+
+# Think blocks and reasoning lines (思考：, 让我想想, ...) of a complete answer, removed in one pass
+REASONING_PATTERN = re.compile(r'(?s:<think>.*?</think>)|'
+                               r'(?:思考过程|分析过程|思考|分析|推理)[:：].*?(?:\n|$)|'
+                               r'让我[思考分析想一想推理].*?(?:\n|$)')
+
+SYSTEM_PROMPT = '你是一个中国年俗知识专家，负责回答用户关于中国传统节日和习俗的问题。请使用口语化的语言，确保回答准确、有趣。请直接回答问题，不要输出思考过程或分析内容。'
+
 class LLMBackend:
     """
     LLM Backend for generating answers using OpenAI API.
@@ -22,36 +34,24 @@ class LLMBackend:
         Initialize the LLM backend with configuration.
         """
         # Read configuration from file if exists
-        config_path = os.path.join(os.path.dirname(__file__), '..', 'config.json')
-        config = {
-            'model': 'gpt-3.5-turbo',
-            'temperature': 0.7,
-            'max_tokens': 150,
-            'top_p': 1.0,
-            'frequency_penalty': 0.0,
-            'presence_penalty': 0.0
-        }
-        
-        if os.path.exists(config_path):
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config.update(json.load(f))
+        self.config = self._load_config()
 
         # Read API key from environment variable or config
-        self.api_key = os.getenv('OPENAI_API_KEY') or config.get('api_key')
+        self.api_key = os.getenv('OPENAI_API_KEY') or self.config.get('api_key')
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable or api_key in config.json is not set")
 
         # Read API base URL from environment variable or config
-        self.api_base = os.getenv('OPENAI_API_BASE') or config.get('api_base')
+        self.api_base = os.getenv('OPENAI_API_BASE') or self.config.get('api_base')
 
         # Initialize OpenAI client
-        if self.api_base:
-            self.client = OpenAI(api_key=self.api_key, base_url=self.api_base)
-        else:
-            self.client = OpenAI(api_key=self.api_key)
+        self.client = self._create_client()
 
-        # Update configuration
-        self.config = config
+        # Initialize persistent answer cache
+        self.answer_cache = self._create_answer_cache()
+
+        # Coalesce identical in-flight streams
+        self.stream_coalescer = StreamCoalescer()
 
         # Initialize monitoring
         self.monitoring = {
@@ -67,6 +67,73 @@ class LLMBackend:
             '政治敏感', '歧视', '侮辱', '诈骗'
         ]
 
+    def _load_config(self) -> Dict:
+        """
+        Load the model configuration, overridden by config.json if it exists.
+
+        Returns:
+            Configuration dictionary
+        """
+        config_path = os.path.join(os.path.dirname(__file__), '..', 'config.json')
+        config = {
+            'model': 'gpt-3.5-turbo',
+            'temperature': 0.7,
+            'max_tokens': 150,
+            'top_p': 1.0,
+            'frequency_penalty': 0.0,
+            'presence_penalty': 0.0
+        }
+
+        if os.path.exists(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config.update(json.load(f))
+
+        return config
+
+    def _create_client(self):
+        """
+        Create the OpenAI API client.
+
+        Returns:
+            OpenAI client
+        """
+        if self.api_base:
+            return OpenAI(api_key=self.api_key, base_url=self.api_base)
+        return OpenAI(api_key=self.api_key)
+
+    def _create_answer_cache(self) -> Optional[LLMAnswerCache]:
+        """
+        Create the persistent answer cache from the configuration.
+
+        The cache is opt-in: it is only created once LLM_CACHE_PATH or
+        cache_path names its database file.
+
+        Returns:
+            Answer cache, or None if no path is set or disabled by cache_enabled
+        """
+        path = os.getenv('LLM_CACHE_PATH') or self.config.get('cache_path')
+        if not path or not self.config.get('cache_enabled', True):
+            return None
+
+        return LLMAnswerCache(
+            path,
+            ttl=self.config.get('cache_ttl', 7 * 24 * 3600),
+            max_entries=self.config.get('cache_max_entries', 10000),
+            similarity_threshold=self.config.get('cache_similarity', 0.0)
+        )
+
+    def _cache_answer(self, question: str, context: Optional[List[Dict]], answer: str):
+        """
+        Store a generated answer in the answer cache.
+
+        Args:
+            question: User question as a string
+            context: Dialogue history passed to the LLM
+            answer: Post-processed answer
+        """
+        if self.answer_cache is not None and answer and not self._contains_inappropriate_content(answer):
+            self.answer_cache.put(question, self.config, answer, context)
+
     def generate_answer(self, question: str, context: Optional[List[Dict]] = None, stream: bool = False):
         """
         Generate an answer using OpenAI API.
@@ -81,155 +148,134 @@ class LLMBackend:
         """
         start_time = time.time()
 
-        try:
-            # Build prompt
-            prompt = self._build_prompt(question, context)
+        # Serve repeated questions from the answer cache, replayed as chunks when streaming
+        if self.answer_cache is not None:
+            cached = self.answer_cache.get(question, self.config, context)
+            if cached is not None:
+                return replay(cached) if stream else cached
 
-            # Build conversation messages with full context
-            conversation_messages = self._build_conversation_messages(context)
+        if stream:
+            # Identical concurrent questions share one upstream stream
+            key = (normalize_question(question), LLMAnswerCache.make_group_key(self.config, context))
+            return self.stream_coalescer.stream(key, lambda: self._generate_stream(question, context, start_time))
 
-            # Add current question to context
-            if context:
-                # Create a copy of context and add current question
-                full_context = context + [{'role': 'user', 'content': question}]
-                conversation_messages = self._build_conversation_messages(full_context)
-            else:
-                conversation_messages = []
+        try:
+            # Build conversation messages with full context
+            messages = self._build_messages(question, context)
 
             # Call OpenAI API
             response = self.client.chat.completions.create(
                 model=self.config['model'],
-                messages=[
-                    {
-                        'role': 'system',
-                        'content': '你是一个中国年俗知识专家，负责回答用户关于中国传统节日和习俗的问题。请使用口语化的语言，确保回答准确、有趣。请直接回答问题，不要输出思考过程或分析内容。'
-                    }
-                ] + conversation_messages if conversation_messages else [
-                    {
-                        'role': 'system',
-                        'content': '你是一个中国年俗知识专家，负责回答用户关于中国传统节日和习俗的问题。请使用口语化的语言，确保回答准确、有趣。请直接回答问题，不要输出思考过程或分析内容。'
-                    },
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ],
+                messages=messages,
                 temperature=self.config['temperature'],
                 max_tokens=self.config['max_tokens'],
                 top_p=self.config['top_p'],
                 frequency_penalty=self.config['frequency_penalty'],
                 presence_penalty=self.config['presence_penalty'],
-                stream=stream
+                stream=False
             )
 
-            if stream:
-                # Return streaming response with thinking block filtering
-                def generate_stream():
-                    buffer = ""
-                    in_thinking_block = False
-
-                    # All possible start tags (full-width and half-width)
-                    start_tags = ['＜thought>', '<thought>', '＜think>', '<think>', '＜THINK>', '＜Think>']
-                    # All possible end tags
-                    end_tags = ['＜/thought>', '</thought>', '＜/think>', '</think>', '＜/THINK>', '＜/Think>']
-
-                    for chunk in response:
-                        if chunk.choices and chunk.choices[0].delta.content:
-                            content = chunk.choices[0].delta.content
-                            if content:
-                                # Update monitoring
-                                self.monitoring['total_calls'] += 1
-
-                                buffer += content
-
-                                # Keep processing until buffer has no complete thinking blocks
-                                while True:
-                                    if in_thinking_block:
-                                        # Looking for end tag
-                                        end_pos = -1
-                                        found_end_tag = None
-                                        for tag in end_tags:
-                                            pos = buffer.find(tag)
-                                            if pos != -1 and (end_pos == -1 or pos < end_pos):
-                                                end_pos = pos
-                                                found_end_tag = tag
-
-                                        if end_pos != -1:
-                                            # Found end tag, remove everything up to and including it
-                                            buffer = buffer[end_pos + len(found_end_tag):]
-                                            in_thinking_block = False
-                                        else:
-                                            # Still inside thinking block, no complete end tag yet
-                                            break
-                                    else:
-                                        # Looking for start tag
-                                        start_pos = -1
-                                        found_start_tag = None
-                                        for tag in start_tags:
-                                            pos = buffer.find(tag)
-                                            if pos != -1 and (start_pos == -1 or pos < start_pos):
-                                                start_pos = pos
-                                                found_start_tag = tag
-
-                                        if start_pos != -1:
-                                            # Found start tag, check if there's a matching end tag
-                                            remaining_after_start = buffer[start_pos + len(found_start_tag):]
-
-                                            end_pos = -1
-                                            found_end_tag = None
-                                            for tag in end_tags:
-                                                pos = remaining_after_start.find(tag)
-                                                if pos != -1 and (end_pos == -1 or pos < end_pos):
-                                                    end_pos = pos
-                                                    found_end_tag = tag
-
-                                            if end_pos != -1:
-                                                # Found complete thinking block, remove it
-                                                buffer = buffer[:start_pos] + remaining_after_start[end_pos + len(found_end_tag):]
-                                                # Continue loop to check for more thinking blocks
-                                            else:
-                                                # Start tag found but no end tag yet, enter thinking block mode
-                                                buffer = buffer[:start_pos]
-                                                in_thinking_block = True
-                                                break
-                                        else:
-                                            # No start tag, yield all content and clear buffer
-                                            if buffer:
-                                                yield buffer
-                                                buffer = ""
-                                            break
-
-                    # Handle any remaining content after stream ends
-                    if buffer and not in_thinking_block:
-                        yield buffer
-
-                    # Finalize monitoring
-                    self.monitoring['avg_response_time'] = (
-                        (self.monitoring['avg_response_time'] * (self.monitoring['total_calls'] - 1) + (time.time() - start_time)) /
-                        self.monitoring['total_calls']
-                    )
-
-                return generate_stream()
-            else:
-                # Extract answer
-                answer = response.choices[0].message.content.strip()
+            # Extract answer
+            answer = response.choices[0].message.content.strip()
 
-                # Update monitoring
-                self._update_monitoring(response, time.time() - start_time)
+            # Update monitoring
+            self._update_monitoring(response, time.time() - start_time)
 
-                # Quality control
-                if self._contains_inappropriate_content(answer):
-                    return "抱歉，我无法回答这个问题。"
+            # Quality control
+            if self._contains_inappropriate_content(answer):
+                return "抱歉，我无法回答这个问题。"
 
-                # Post-process answer
-                processed_answer = self._post_process_answer(answer)
+            # Post-process answer
+            processed_answer = self._post_process_answer(answer)
+            self._cache_answer(question, context, processed_answer)
 
-                return processed_answer
+            return processed_answer
 
         except Exception as e:
             print(f"LLM API call failed: {e}")
             return "抱歉，我暂时无法回答这个问题。"
 
+    def _generate_stream(self, question: str, context: Optional[List[Dict]], start_time: float):
+        """
+        Start a streaming completion.
+
+        Args:
+            question: User question as a string
+            context: Dialogue history for context-aware generation
+            start_time: Time the request was received
+
+        Returns:
+            Generator of answer chunks with thinking blocks filtered out
+        """
+        try:
+            # Call OpenAI API
+            response = self.client.chat.completions.create(
+                model=self.config['model'],
+                messages=self._build_messages(question, context),
+                temperature=self.config['temperature'],
+                max_tokens=self.config['max_tokens'],
+                top_p=self.config['top_p'],
+                frequency_penalty=self.config['frequency_penalty'],
+                presence_penalty=self.config['presence_penalty'],
+                stream=True
+            )
+        except Exception as e:
+            print(f"LLM API call failed: {e}")
+            return iter(["抱歉，我暂时无法回答这个问题。"])
+
+        # Return streaming response with thinking blocks and reasoning lines filtered out
+        def generate_stream():
+            stream_filter = StreamFilter(clean=True)
+            outputs = []
+
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        output = stream_filter.feed(content)
+                        if output:
+                            outputs.append(output)
+                            yield output
+
+            # Handle any remaining content after stream ends
+            output = stream_filter.flush()
+            if output:
+                outputs.append(output)
+                yield output
+
+            # Cache the completed answer
+            self._cache_answer(question, context, ''.join(outputs))
+
+            # Update monitoring once per call, not per chunk
+            self.monitoring['total_calls'] += 1
+            self.monitoring['avg_response_time'] = (
+                (self.monitoring['avg_response_time'] * (self.monitoring['total_calls'] - 1) + (time.time() - start_time)) /
+                self.monitoring['total_calls']
+            )
+
+        return generate_stream()
+
+    def _build_messages(self, question: str, context: Optional[List[Dict]] = None) -> List[Dict]:
+        """
+        Build the chat completion messages for a question.
+
+        Args:
+            question: User question as a string
+            context: Dialogue history for context-aware generation
+
+        Returns:
+            List of messages in OpenAI format
+        """
+        system_message = {'role': 'system', 'content': SYSTEM_PROMPT}
+
+        # Add current question to context
+        if context:
+            # Create a copy of context and add current question
+            full_context = context + [{'role': 'user', 'content': question}]
+            return [system_message] + self._build_conversation_messages(full_context)
+
+        return [system_message, {'role': 'user', 'content': self._build_prompt(question, context)}]
+
     def post_process_response(self, response: str) -> str:
         """
         Post-process a complete response to remove thinking blocks and clean up.
@@ -300,39 +346,17 @@ class LLMBackend:
         Returns:
             Post-processed answer
         """
-        # Remove think/思考/分析部分
-        import re
-        
-        # Remove content between <think> tags
-        answer = re.sub(r'<think>.*?</think>', '', answer, flags=re.DOTALL)
-        
-        # Remove content between 思考 tags
-        answer = re.sub(r'思考[:：].*?(\n|$)', '', answer)
-        answer = re.sub(r'分析[:：].*?(\n|$)', '', answer)
-        answer = re.sub(r'推理[:：].*?(\n|$)', '', answer)
-        
-        # Remove content after "让我思考" or similar phrases
-        answer = re.sub(r'让我[思考分析想一想推理].*?(\n|$)', '', answer)
-        
-        # Remove "思考过程：" or similar prefixes
-        answer = re.sub(r'思考过程[:：].*?(\n|$)', '', answer)
-        answer = re.sub(r'分析过程[:：].*?(\n|$)', '', answer)
-        
-        # Clean up extra whitespace and newlines
-        answer = re.sub(r'\n+', '\n', answer)
-        answer = re.sub(r' +', ' ', answer)
-        
-        # Strip leading/trailing whitespace
-        answer = answer.strip()
-        
+        # Remove think blocks and reasoning lines, then collapse newlines and spaces
+        answer = REASONING_PATTERN.sub('', answer)
+        answer = WHITESPACE_REWRITER.rewrite(answer).strip()
+
         # Remove unnecessary prefixes
-        prefixes = ["回答：", "答：", "我来回答："]
-        for prefix in prefixes:
+        for prefix in ANSWER_PREFIXES:
             if answer.startswith(prefix):
                 answer = answer[len(prefix):].strip()
 
         # Add colloquial particles if needed
-        if not any(particle in answer for particle in ['啊', '呀', '呢', '吧', '嘛']):
+        if not any(particle in answer for particle in COLLOQUIAL_PARTICLES):
             if answer.endswith('。'):
                 answer = answer[:-1] + '呢。'
 
@@ -405,6 +429,15 @@ class LLMBackend:
             self.monitoring['total_calls']
         )
 
+    def get_cache_stats(self) -> Optional[Dict]:
+        """
+        Get answer cache statistics.
+
+        Returns:
+            Answer cache statistics, or None if the cache is disabled
+        """
+        return self.answer_cache.get_stats() if self.answer_cache is not None else None
+
     def get_monitoring_stats(self) -> Dict:
         """
         Get monitoring statistics.
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+LLM Answer Cache Module
+Persistent SQLite cache of LLM answers with exact and near-duplicate question matching.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# Configuration keys that do not change the generated answer
+NON_MODEL_CONFIG_KEYS = {'api_key', 'cache_enabled', 'cache_path', 'cache_ttl', 'cache_max_entries', 'cache_similarity'}
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question for cache lookups.
+
+    Full-width characters are folded to half-width, case is folded and
+    whitespace and punctuation are removed.
+
+    Args:
+        question: User question as a string
+
+    Returns:
+        Normalized question
+    """
+    question = unicodedata.normalize('NFKC', question).lower()
+    return re.sub(r'[\W_]+', '', question)
+
+
+def shingles(text: str, size: int = 2) -> Set[str]:
+    """
+    Get the character shingles of a text.
+
+    Args:
+        text: Normalized text
+        size: Shingle length in characters
+
+    Returns:
+        Set of shingles
+    """
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def replay(answer: str, chunk_size: int = 8) -> Iterator[str]:
+    """
+    Replay a cached answer as a stream of chunks.
+
+    Args:
+        answer: Cached answer
+        chunk_size: Characters per chunk
+
+    Returns:
+        Generator of answer chunks
+    """
+    for start in range(0, len(answer), chunk_size):
+        yield answer[start:start + chunk_size]
+
+
+class LLMAnswerCache:
+    """
+    SQLite-backed cache of LLM answers.
+
+    Entries are keyed on the normalized question, the model configuration and
+    the dialogue context, expire after a TTL and are evicted least recently
+    used first once the cache holds max_entries answers. Hits only update the
+    last use in memory; it is written in batches and before evictions. With a similarity
+    threshold above 0, a miss falls back to the cached question with the
+    highest character-shingle Jaccard similarity under the same model
+    configuration and context.
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, max_entries: int = 10000,
+                 similarity_threshold: float = 0.0, shingle_size: int = 2,
+                 touch_flush_size: int = 256, touch_flush_interval: float = 30.0):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite database path (':memory:' for a non-persistent cache)
+            ttl: Seconds before a cached answer expires (0 for no expiry)
+            max_entries: Maximum number of cached answers
+            similarity_threshold: Minimum shingle similarity for near-duplicate hits (0 disables them)
+            shingle_size: Shingle length in characters
+            touch_flush_size: Number of hits whose last use is buffered before it is written
+            touch_flush_interval: Seconds after which buffered last uses are written anyway
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.shingle_size = shingle_size
+        self.touch_flush_size = touch_flush_size
+        self.touch_flush_interval = touch_flush_interval
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+        # Last use of hit answers, written in batches instead of one commit per hit
+        self._touches: Dict[str, float] = {}
+        self._last_flush = time.monotonic()
+
+        # Number of stored answers, kept up to date by every insert and delete of this cache
+        self._size = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS answers ('
+            'key TEXT PRIMARY KEY, group_key TEXT NOT NULL, question TEXT NOT NULL, '
+            'answer TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)')
+        self._conn.commit()
+
+        # Near-duplicate index: group -> shingle -> keys, and key -> (group, shingles)
+        self._shingle_postings: Dict[str, Dict[str, Set[str]]] = {}
+        self._key_shingles: Dict[str, Tuple[str, Set[str]]] = {}
+
+        with self._lock:
+            self._size = self._conn.execute('SELECT COUNT(*) FROM answers').fetchone()[0]
+            self._purge_expired()
+            if self.similarity_threshold > 0:
+                for key, group_key, question in self._conn.execute('SELECT key, group_key, question FROM answers'):
+                    self._index_question(key, group_key, question)
+
+    @staticmethod
+    def make_group_key(config: Dict, context: Optional[List[Dict]] = None) -> str:
+        """
+        Build the key of the model configuration and dialogue context.
+
+        Args:
+            config: LLM configuration dictionary
+            context: Dialogue history passed to the LLM
+
+        Returns:
+            Hex digest identifying the configuration and context
+        """
+        model_config = {k: v for k, v in config.items() if k not in NON_MODEL_CONFIG_KEYS}
+        turns = [(turn['role'], turn['content']) for turn in context or []]
+        payload = json.dumps([model_config, turns], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _make_key(group_key: str, question: str) -> str:
+        """
+        Build the key of a normalized question within a group.
+
+        Args:
+            group_key: Configuration and context key
+            question: Normalized question
+
+        Returns:
+            Hex digest cache key
+        """
+        return hashlib.sha1(f"{group_key}\0{question}".encode('utf-8')).hexdigest()
+
+    def get(self, question: str, config: Dict, context: Optional[List[Dict]] = None) -> Optional[str]:
+        """
+        Look up the cached answer of a question.
+
+        Args:
+            question: User question as a string
+            config: LLM configuration dictionary
+            context: Dialogue history passed to the LLM
+
+        Returns:
+            Cached answer, or None on a miss
+        """
+        normalized = normalize_question(question)
+        group_key = self.make_group_key(config, context)
+        key = self._make_key(group_key, normalized)
+
+        with self._lock:
+            answer = self._fetch(key)
+            if answer is not None:
+                self.hits += 1
+                return answer
+
+            if self.similarity_threshold > 0:
+                similar_key = self._find_similar(group_key, normalized)
+                if similar_key is not None:
+                    answer = self._fetch(similar_key)
+                    if answer is not None:
+                        self.near_hits += 1
+                        return answer
+
+            self.misses += 1
+            return None
+
+    def put(self, question: str, config: Dict, answer: str, context: Optional[List[Dict]] = None):
+        """
+        Store the answer of a question.
+
+        Args:
+            question: User question as a string
+            config: LLM configuration dictionary
+            answer: Answer to cache
+            context: Dialogue history passed to the LLM
+        """
+        normalized = normalize_question(question)
+        if not normalized or not answer:
+            return
+        group_key = self.make_group_key(config, context)
+        key = self._make_key(group_key, normalized)
+        now = time.time()
+
+        with self._lock:
+            # Replace the answer of a cached question, or count the new one
+            replaced = self._conn.execute(
+                'UPDATE answers SET answer = ?, created_at = ?, last_used = ? WHERE key = ?',
+                (answer, now, now, key)
+            ).rowcount
+            if not replaced:
+                self._conn.execute(
+                    'INSERT INTO answers (key, group_key, question, answer, created_at, last_used) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, group_key, normalized, answer, now, now)
+                )
+                self._size += 1
+            if self.similarity_threshold > 0:
+                self._index_question(key, group_key, normalized)
+            self._touches.pop(key, None)
+            self._evict()
+            self._conn.commit()
+
+    def clear(self):
+        """
+        Drop all cached answers.
+        """
+        with self._lock:
+            self._conn.execute('DELETE FROM answers')
+            self._conn.commit()
+            self._size = 0
+            self._touches.clear()
+            self._shingle_postings.clear()
+            self._key_shingles.clear()
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._flush_touches()
+            self._conn.commit()
+            self._conn.close()
+
+    def get_stats(self) -> Dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            Cache statistics as a dictionary
+        """
+        return {
+            'size': self._size,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'near_hits': self.near_hits,
+            'misses': self.misses
+        }
+
+    def _fetch(self, key: str) -> Optional[str]:
+        """
+        Fetch an unexpired answer and mark it as recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached answer, or None if missing or expired
+        """
+        row = self._conn.execute('SELECT answer, created_at FROM answers WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+
+        answer, created_at = row
+        now = time.time()
+        if self.ttl and created_at + self.ttl < now:
+            self._delete([key])
+            self._conn.commit()
+            return None
+
+        self._touches[key] = now
+        if (len(self._touches) >= self.touch_flush_size
+                or time.monotonic() - self._last_flush >= self.touch_flush_interval):
+            self._flush_touches()
+            self._conn.commit()
+        return answer
+
+    def _flush_touches(self):
+        """
+        Write the buffered last uses; the caller commits.
+        """
+        if self._touches:
+            self._conn.executemany('UPDATE answers SET last_used = ? WHERE key = ?',
+                                   [(last_used, key) for key, last_used in self._touches.items()])
+            self._touches.clear()
+        self._last_flush = time.monotonic()
+
+    def _find_similar(self, group_key: str, question: str) -> Optional[str]:
+        """
+        Find the most similar cached question of a group.
+
+        Args:
+            group_key: Configuration and context key
+            question: Normalized question
+
+        Returns:
+            Key of the best match above the similarity threshold, or None
+        """
+        postings = self._shingle_postings.get(group_key)
+        query_shingles = shingles(question, self.shingle_size)
+        if not postings or not query_shingles:
+            return None
+
+        # Count shared shingles per candidate
+        overlaps: Dict[str, int] = {}
+        for shingle in query_shingles:
+            for key in postings.get(shingle, ()):
+                overlaps[key] = overlaps.get(key, 0) + 1
+
+        best_key = None
+        best_similarity = self.similarity_threshold
+        for key, overlap in overlaps.items():
+            candidate_shingles = self._key_shingles[key][1]
+            similarity = overlap / (len(query_shingles) + len(candidate_shingles) - overlap)
+            if similarity >= best_similarity:
+                best_key = key
+                best_similarity = similarity
+        return best_key
+
+    def _index_question(self, key: str, group_key: str, question: str):
+        """
+        Add a cached question to the near-duplicate index.
+
+        Args:
+            key: Cache key
+            group_key: Configuration and context key
+            question: Normalized question
+        """
+        if key in self._key_shingles:
+            return
+        question_shingles = shingles(question, self.shingle_size)
+        self._key_shingles[key] = (group_key, question_shingles)
+        postings = self._shingle_postings.setdefault(group_key, {})
+        for shingle in question_shingles:
+            postings.setdefault(shingle, set()).add(key)
+
+    def _delete(self, keys: List[str]):
+        """
+        Delete answers from the database and the near-duplicate index.
+
+        Args:
+            keys: Cache keys to delete
+        """
+        self._size -= self._conn.executemany('DELETE FROM answers WHERE key = ?', [(key,) for key in keys]).rowcount
+        for key in keys:
+            self._touches.pop(key, None)
+            entry = self._key_shingles.pop(key, None)
+            if entry is None:
+                continue
+            group_key, question_shingles = entry
+            postings = self._shingle_postings[group_key]
+            for shingle in question_shingles:
+                postings[shingle].discard(key)
+                if not postings[shingle]:
+                    del postings[shingle]
+            if not postings:
+                del self._shingle_postings[group_key]
+
+    def _purge_expired(self):
+        """
+        Delete expired answers.
+        """
+        if not self.ttl:
+            return
+        cutoff = time.time() - self.ttl
+        expired = [row[0] for row in self._conn.execute('SELECT key FROM answers WHERE created_at < ?', (cutoff,))]
+        if expired:
+            self._delete(expired)
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Delete the least recently used answers beyond max_entries.
+        """
+        if self._size <= self.max_entries:
+            return
+        self._purge_expired()
+        overflow = self._size - self.max_entries
+        if overflow > 0:
+            # Least recently used order needs the buffered last uses
+            self._flush_touches()
+            keys = [row[0] for row in self._conn.execute(
+                'SELECT key FROM answers ORDER BY last_used LIMIT ?', (overflow,))]
+            self._delete(keys)
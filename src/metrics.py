@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Metrics Module
+Fixed-bucket latency histograms and counters with Prometheus text exposition.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds, from sub-millisecond retrieval to slow upstream calls
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """
+    Histogram with fixed bucket bounds.
+
+    Observations only increment a bucket counter, so recording is O(log buckets)
+    and memory is constant. Quantiles are estimated by linear interpolation
+    inside the bucket holding the requested rank, as Prometheus'
+    histogram_quantile does.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialize the histogram.
+
+        Args:
+            buckets: Sorted upper bounds of the buckets; an overflow bucket is added
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """
+        Record one observation.
+
+        Args:
+            value: Observed value
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile.
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            Estimated value, or None if nothing was observed
+        """
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return None
+
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                if index == len(self.buckets):
+                    # Overflow bucket has no upper bound
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def snapshot(self) -> Tuple[List[int], int, float]:
+        """
+        Get a consistent copy of the counters.
+
+        Returns:
+            Tuple of (bucket counts, count, sum)
+        """
+        with self._lock:
+            return list(self.counts), self.count, self.sum
+
+
+class _Timer:
+    """Context manager observing its elapsed time into a histogram."""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    """Shared context manager used while metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    Registry of labelled histograms and counters.
+
+    When disabled, time() returns a shared no-op context manager and
+    observe()/increment() return immediately, so instrumented code paths do
+    not read the clock or take locks.
+    """
+
+    def __init__(self, enabled: bool = True, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialize the registry.
+
+        Args:
+            enabled: Whether to record anything
+            buckets: Bucket bounds of new histograms
+        """
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], int] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str):
+        """
+        Set the HELP text of a metric.
+
+        Args:
+            name: Metric name
+            help_text: Description
+        """
+        self._help[name] = help_text
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        """
+        Get or create a histogram.
+
+        Args:
+            name: Metric name
+            **labels: Label values
+
+        Returns:
+            Histogram for the name and labels
+        """
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+        return histogram
+
+    def time(self, name: str, **labels):
+        """
+        Time a block into a histogram.
+
+        Args:
+            name: Metric name
+            **labels: Label values
+
+        Returns:
+            Context manager
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(name, **labels))
+
+    def observe(self, name: str, value: float, **labels):
+        """
+        Record a value into a histogram.
+
+        Args:
+            name: Metric name
+            value: Observed value
+            **labels: Label values
+        """
+        if self.enabled:
+            self.histogram(name, **labels).observe(value)
+
+    def increment(self, name: str, amount: int = 1, **labels):
+        """
+        Increment a counter.
+
+        Args:
+            name: Metric name
+            amount: Increment
+            **labels: Label values
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        """
+        Drop all recorded values.
+        """
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def get_stats(self) -> Dict:
+        """
+        Summarize the histograms and counters.
+
+        Returns:
+            Dictionary mapping metric names (with labels) to count, mean and
+            p50/p95/p99 in seconds, or to the counter value
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        stats = {}
+        for (name, labels), histogram in histograms:
+            _, count, total = histogram.snapshot()
+            summary = {'count': count, 'mean': total / count if count else None}
+            for q in QUANTILES:
+                summary[f"p{int(q * 100)}"] = histogram.quantile(q)
+            stats[_series_name(name, labels)] = summary
+        for (name, labels), value in counters:
+            stats[_series_name(name, labels)] = value
+        return stats
+
+    def render_prometheus(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Histograms are followed by a <name>_quantile gauge with the estimated
+        p50/p95/p99.
+
+        Returns:
+            Exposition text
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        lines = []
+        seen = set()
+        for (name, labels), histogram in histograms:
+            if name not in seen:
+                seen.add(name)
+                self._header(lines, name, 'histogram')
+            counts, count, total = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        seen = set()
+        for (name, labels), histogram in histograms:
+            quantile_name = name + '_quantile'
+            if quantile_name not in seen:
+                seen.add(quantile_name)
+                lines.append(f"# TYPE {quantile_name} gauge")
+            for q in QUANTILES:
+                value = histogram.quantile(q)
+                if value is not None:
+                    lines.append(f"{quantile_name}{_format_labels(labels + (('quantile', str(q)),))} {value!r}")
+
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                self._header(lines, name, 'counter')
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+    def _header(self, lines: List[str], name: str, kind: str):
+        """
+        Append the HELP and TYPE lines of a metric.
+
+        Args:
+            lines: Output lines
+            name: Metric name
+            kind: Prometheus metric type
+        """
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+
+def _format_labels(labels: Tuple) -> str:
+    """
+    Format label pairs for the exposition format.
+
+    Args:
+        labels: Tuple of (name, value) pairs
+
+    Returns:
+        Label set in braces, or an empty string
+    """
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _series_name(name: str, labels: Tuple) -> str:
+    """
+    Name a series for get_stats.
+
+    Args:
+        name: Metric name
+        labels: Tuple of (name, value) pairs
+
+    Returns:
+        Name with the label values appended
+    """
+    return name + ''.join(f"[{value}]" for _, value in labels)
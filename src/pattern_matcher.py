@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pattern Matcher Module
+Aho-Corasick automaton and a longest-match matcher for matching many phrases against a text in a single pass.
+"""
+
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+
+class AhoCorasick:
+    """Multi-pattern string matcher compiled once and reused for every text."""
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Compile the automaton for a set of patterns.
+
+        Args:
+            patterns: Phrases to match; empty and duplicate phrases are ignored
+        """
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        self._depth: List[int] = [0]
+
+        seen = set()
+        for pattern in patterns:
+            if pattern and pattern not in seen:
+                seen.add(pattern)
+                self._add_pattern(pattern)
+
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern: str):
+        """
+        Add a pattern to the trie.
+
+        Args:
+            pattern: Phrase to add
+        """
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._depth.append(self._depth[state] + 1)
+            state = next_state
+
+        self._out[state] = self._out[state] + (len(self.patterns),)
+        self.patterns.append(pattern)
+
+    def _build_failure_links(self):
+        """
+        Compute failure links breadth-first and merge the outputs along them.
+        """
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def step(self, state: int, char: str) -> int:
+        """
+        Advance the automaton by one character.
+
+        Args:
+            state: Current state (0 is the initial state)
+            char: Next character of the text
+
+        Returns:
+            The next state
+        """
+        goto = self._goto
+        while True:
+            next_state = goto[state].get(char)
+            if next_state is not None:
+                return next_state
+            if state == 0:
+                return 0
+            state = self._fail[state]
+
+    def outputs(self, state: int) -> Tuple[int, ...]:
+        """
+        Get the indexes of the patterns ending at a state.
+
+        Args:
+            state: Automaton state
+
+        Returns:
+            Tuple of pattern indexes, longest pattern first
+        """
+        return self._out[state]
+
+    def depth(self, state: int) -> int:
+        """
+        Get the length of the pattern prefix a state stands for.
+
+        This is the number of trailing characters of the text that may still
+        turn out to be part of a match.
+
+        Args:
+            state: Automaton state
+
+        Returns:
+            Prefix length in characters
+        """
+        return self._depth[state]
+
+    def first_chars(self) -> Set[str]:
+        """
+        Get the characters that can start a match.
+
+        Returns:
+            Set of first characters of the patterns
+        """
+        return set(self._goto[0])
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Iterate over every pattern occurrence in the text, overlaps included.
+
+        Args:
+            text: Text to scan
+
+        Yields:
+            Tuples of (start position, pattern index)
+        """
+        state = 0
+        patterns = self.patterns
+        for position, char in enumerate(text):
+            state = self.step(state, char)
+            for pattern_index in self._out[state]:
+                yield position + 1 - len(patterns[pattern_index]), pattern_index
+
+    def find_all(self, text: str) -> Set[str]:
+        """
+        Get the distinct patterns that occur in the text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Set of matched patterns
+        """
+        return {self.patterns[pattern_index] for _, pattern_index in self.iter_matches(text)}
+
+
+class LongestMatcher:
+    """
+    Multi-pattern matcher that resolves overlapping matches to the longest pattern.
+
+    The patterns are compiled into one regular expression whose lookahead
+    finds the longest pattern starting at every position, so the scan runs
+    inside the regex engine rather than stepping an automaton in Python.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Compile the matcher for a set of patterns.
+
+        Args:
+            patterns: Phrases to match; empty and duplicate phrases are ignored
+        """
+        self.patterns: List[str] = list(dict.fromkeys(pattern for pattern in patterns if pattern))
+        self._indexes: Dict[str, int] = {pattern: index for index, pattern in enumerate(self.patterns)}
+        # Alternatives are tried in order, so longer patterns go first
+        alternatives = sorted(self.patterns, key=len, reverse=True)
+        self._regex = re.compile('(?=(' + '|'.join(map(re.escape, alternatives)) + '))') if alternatives else None
+
+    def longest_matches(self, text: str) -> List[Tuple[int, int, int]]:
+        """
+        Get non-overlapping matches, giving overlapping matches to the longest pattern.
+
+        Longer patterns are taken first and ties go to the leftmost one, so a
+        phrase like 什么时候 wins over both 是什么 and 什么 inside 是什么时候.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            List of (start position, end position, pattern index) in text order
+        """
+        if self._regex is None:
+            return []
+        indexes = self._indexes
+        matches = [(match.start(), match.group(1)) for match in self._regex.finditer(text)]
+        if len(matches) < 2:
+            return [(start, start + len(pattern), indexes[pattern]) for start, pattern in matches]
+
+        selected = []
+        taken = bytearray(len(text))
+        for start, pattern in sorted(matches, key=lambda match: (-len(match[1]), match[0])):
+            end = start + len(pattern)
+            if not any(taken[start:end]):
+                taken[start:end] = b'\x01' * (end - start)
+                selected.append((start, end, indexes[pattern]))
+        selected.sort()
+        return selected
@@ -6,22 +6,99 @@ Question Processing Module
 Processes user questions to extract key information and identify intent.
 """
 
-import re
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pattern_matcher import LongestMatcher
+from segmenter import Segmenter, knowledge_terms
+
+# Keywords borrowed from the previous turn to resolve a reference; the topic comes first in a turn
+MAX_CONTEXT_KEYWORDS = 5
+
+# Punctuation replaced by spaces, after full-width forms are folded to half-width
+PUNCTUATION = '，。！？；：、“”‘’（）《》【】…!?,;:"\'()[]<>'
+
+STOP_WORDS = frozenset({
+    '的', '了', '是', '在', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上', '也', '很', '到', '说', '要',
+    '去', '你', '会', '着', '没有', '看', '好', '自己', '这', '那', '那么', '然后', '接着', '还有', '另外', '再问',
+    '再', '又', '还', '更'
+})
+
+# Festival names added as keywords wherever they occur in the question
+YEAR_RELATED_WORDS = ('新年', '春节', '除夕', '元宵', '清明', '端午', '七夕', '中秋', '重阳')
+
+
+def _build_normalize_table() -> Dict[int, str]:
+    """
+    Build the str.translate table that folds widths and blanks out punctuation.
+
+    Returns:
+        Translation table mapping code points to replacement strings
+    """
+    table = {code: chr(code - 0xFEE0) for code in range(0xFF01, 0xFF5F)}
+    table[0x3000] = ' '
+    for char in PUNCTUATION:
+        table[ord(char)] = ' '
+    for code, replacement in table.items():
+        if replacement in PUNCTUATION:
+            table[code] = ' '
+    return table
+
+
+NORMALIZE_TABLE = _build_normalize_table()
+
 
 class QuestionProcessor:
     """Processes user questions to extract key information."""
 
-    def __init__(self):
-        """Initialize the question processor."""
-        # Common question patterns
+    def __init__(self, segmenter: Optional[Segmenter] = None):
+        """
+        Initialize the question processor.
+
+        Args:
+            segmenter: Word segmenter, one over the base lexicon if omitted
+        """
+        self.segmenter = segmenter or Segmenter.from_terms([])
+        # Common question patterns, earlier intents win when a question has cues of several
         self.question_patterns = {
             'why': [r'为什么', r'为啥', r'何故', r'何以'],
             'what': [r'什么', r'啥', r'何谓', r'是什么'],
-            'when': [r'什么时候', r'何时', r'几时', r'什么时候'],
+            'when': [r'什么时候', r'何时', r'几时'],
             'how': [r'怎么', r'如何', r'怎样', r'如何做'],
             'where': [r'哪里', r'哪儿', r'在什么地方', r'位置']
         }
+        self._compile_patterns()
+
+    def _compile_patterns(self):
+        """
+        Compile the question patterns and year-related words into one matcher.
+        """
+        pattern_intents = {}
+        for intent, patterns in self.question_patterns.items():
+            for pattern in patterns:
+                pattern_intents.setdefault(pattern, intent)
+        self._intent_rank = {intent: rank for rank, intent in enumerate(self.question_patterns)}
+        self._matcher = LongestMatcher(list(pattern_intents) + list(YEAR_RELATED_WORDS))
+        # Intent of each matcher pattern, None for year-related words
+        self._pattern_intents = [pattern_intents.get(pattern) for pattern in self._matcher.patterns]
+
+    def set_vocabulary(self, entries: List[Dict]):
+        """
+        Rebuild the segmenter dictionary from knowledge entries.
+
+        Args:
+            entries: Knowledge entries whose keywords and titles become dictionary words
+        """
+        self.set_terms(knowledge_terms(entries))
+
+    def set_terms(self, terms: Iterable[str]):
+        """
+        Rebuild the segmenter dictionary from knowledge base terms.
+
+        Args:
+            terms: Keywords and titles of the knowledge entries
+        """
+        # Swapped in whole, so questions being processed keep the old segmenter
+        self.segmenter = Segmenter.from_terms(terms)
 
     def process_question(self, question: str, context: List[Dict] = None) -> Dict:
         """
@@ -37,11 +114,9 @@ class QuestionProcessor:
         # Clean the question
         cleaned_question = self._clean_question(question)
 
-        # Extract intent
-        intent = self._extract_intent(cleaned_question)
-
-        # Extract keywords
-        keywords = self._extract_keywords(cleaned_question)
+        # Extract intent and keywords in one scan
+        intent, pieces, year_words = self._scan(cleaned_question)
+        keywords = self._keywords_from_pieces(pieces, year_words)
 
         # Process with context if available
         if context:
@@ -59,7 +134,7 @@ class QuestionProcessor:
 
     def _clean_question(self, question: str) -> str:
         """
-        Clean the question by removing punctuation and unnecessary whitespace.
+        Clean the question by folding full-width characters, removing punctuation and unnecessary whitespace.
 
         Args:
             question: User question as a string
@@ -67,11 +142,43 @@ class QuestionProcessor:
         Returns:
             Cleaned question string
         """
-        # Remove punctuation
-        cleaned = re.sub(r'[，。！？；："\'（）]', ' ', question)
-        # Remove extra whitespace
-        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-        return cleaned
+        return ' '.join(question.translate(NORMALIZE_TABLE).split())
+
+    def _scan(self, question: str) -> Tuple[str, List[str], List[str]]:
+        """
+        Find the question words and year-related words of a question in a single pass.
+
+        Overlapping matches go to the longest pattern, so 什么时候 counts as a
+        when cue rather than a what cue.
+
+        Args:
+            question: Cleaned question string
+
+        Returns:
+            Tuple of (intent, text pieces between the question words, year-related words found)
+        """
+        intent = 'what'  # Default intent
+        best_rank = len(self._intent_rank)
+        pieces = []
+        year_words = []
+        position = 0
+
+        for start, end, pattern_index in self._matcher.longest_matches(question):
+            pattern_intent = self._pattern_intents[pattern_index]
+            if pattern_intent is None:
+                year_words.append(self._matcher.patterns[pattern_index])
+                continue
+            rank = self._intent_rank[pattern_intent]
+            if rank < best_rank:
+                intent, best_rank = pattern_intent, rank
+            # Question words split the text instead of being part of a keyword
+            if start > position:
+                pieces.append(question[position:start])
+            position = end
+        if position < len(question):
+            pieces.append(question[position:])
+
+        return intent, pieces, year_words
 
     def _extract_intent(self, question: str) -> str:
         """
@@ -83,41 +190,102 @@ class QuestionProcessor:
         Returns:
             Intent type as a string
         """
-        for intent, patterns in self.question_patterns.items():
-            for pattern in patterns:
-                if pattern in question:
-                    return intent
-        return 'what'  # Default intent
+        return self._scan(question)[0]
 
-    def _extract_keywords(self, question: str) -> List[str]:
+    def _extract_keywords(self, question: str, limit: Optional[int] = None) -> List[str]:
         """
         Extract keywords from the question.
 
         Args:
             question: Cleaned question string
+            limit: Stop after this many keywords
 
         Returns:
             List of extracted keywords
         """
-        # Remove question words
-        keyword_question = question
-        for patterns in self.question_patterns.values():
-            for pattern in patterns:
-                keyword_question = keyword_question.replace(pattern, '')
+        _, pieces, year_words = self._scan(question)
+        return self._keywords_from_pieces(pieces, year_words, limit)
 
-        # Split into words and filter out stop words
-        words = keyword_question.split()
-        stop_words = {'的', '了', '是', '在', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上', '也', '很', '到', '说', '要', '去', '你', '会', '着', '没有', '看', '好', '自己', '这', '那', '那么', '然后', '接着', '还有', '另外', '再问', '再', '又', '还', '也', '更'}
-        keywords = [word for word in words if word not in stop_words and len(word) > 1]
+    def _keywords_from_pieces(self, pieces: List[str], year_words: List[str],
+                              limit: Optional[int] = None) -> List[str]:
+        """
+        Segment the text pieces of a question into keywords.
+
+        Args:
+            pieces: Text pieces between the question words
+            year_words: Year-related words found in the question
+            limit: Stop after this many keywords, the rest of the text is not segmented
+
+        Returns:
+            List of extracted keywords
+        """
+        cut = self.segmenter.cut
+        keywords = []
+        seen = set()
+        for piece in pieces:
+            # Segment each whitespace-separated part and filter out stop words
+            for part in piece.split():
+                for word in cut(part):
+                    if len(word) > 1 and word not in STOP_WORDS and word not in seen:
+                        seen.add(word)
+                        keywords.append(word)
+                        if len(keywords) == limit:
+                            return keywords
 
         # Add common year-related keywords
-        year_related_words = {'新年', '春节', '除夕', '元宵', '清明', '端午', '七夕', '中秋', '重阳'}
-        for word in year_related_words:
-            if word in question and word not in keywords:
+        for word in year_words:
+            if word not in seen:
+                seen.add(word)
                 keywords.append(word)
+                if len(keywords) == limit:
+                    break
 
         return keywords
 
+    def analyze_turn(self, content: str, query: Optional[Dict] = None,
+                     entry_ids: Optional[List[str]] = None) -> Dict:
+        """
+        Build the compact analysis stored with a dialogue turn.
+
+        Later follow-ups read the keywords from it instead of segmenting the
+        turn again, so resolving a reference costs the same for any turn length.
+
+        Args:
+            content: Content of the turn
+            query: Processed query of a user turn, reused when it has no borrowed context
+            entry_ids: Ids of the knowledge entries a system turn was answered from
+
+        Returns:
+            Dict with the turn's first keywords, and its intent and entry_ids when known
+        """
+        if query is not None and not query.get('context_aware'):
+            keywords = query['keywords'][:MAX_CONTEXT_KEYWORDS]
+        else:
+            keywords = self._extract_keywords(self._clean_question(content), MAX_CONTEXT_KEYWORDS)
+
+        analysis = {'keywords': keywords}
+        if query is not None:
+            analysis['intent'] = query.get('intent')
+        if entry_ids is not None:
+            analysis['entry_ids'] = list(entry_ids)
+        return analysis
+
+    def _turn_keywords(self, turn: Dict) -> List[str]:
+        """
+        Get the keywords a follow-up borrows from a dialogue turn.
+
+        Args:
+            turn: Dialogue turn
+
+        Returns:
+            The turn's first keywords, from its stored analysis when present
+        """
+        analysis = turn.get('analysis')
+        if analysis is not None and 'keywords' in analysis:
+            return analysis['keywords']
+        # Turns added without analysis, e.g. restored from older sessions
+        return self.analyze_turn(turn['content'])['keywords']
+
     def _process_with_context(self, question: str, context: List[Dict], intent: str, keywords: List[str]) -> Dict:
         """
         Process the question with dialogue context.
@@ -131,19 +299,18 @@ class QuestionProcessor:
         Returns:
             Context-aware processed query
         """
-        # Get the most recent system response
-        recent_system_response = None
+        # Get the most recent system response and user question in one pass
+        recent_system_turn = None
+        recent_user_turn = None
         for turn in reversed(context):
             if turn['role'] == 'system':
-                recent_system_response = turn['content']
-                break
-
-        # Get the most recent user question
-        recent_user_question = None
-        for turn in reversed(context):
-            if turn['role'] == 'user':
-                recent_user_question = turn['content']
+                recent_system_turn = recent_system_turn or turn
+            elif turn['role'] == 'user':
+                recent_user_turn = recent_user_turn or turn
+            if recent_system_turn and recent_user_turn:
                 break
+        recent_system_response = recent_system_turn['content'] if recent_system_turn else None
+        recent_user_question = recent_user_turn['content'] if recent_user_turn else None
 
         # Process context to enhance keywords
         enhanced_keywords = keywords.copy()
@@ -151,16 +318,14 @@ class QuestionProcessor:
         # If the question contains pronouns or references, resolve them using context
         if any(pronoun in question for pronoun in ['这', '那', '它', '他', '她', '他们', '她们', '它们']):
             if recent_system_response:
-                # Extract keywords from recent system response
-                system_keywords = self._extract_keywords(recent_system_response)
-                enhanced_keywords.extend(system_keywords)
+                # Borrow keywords from recent system response
+                enhanced_keywords.extend(self._turn_keywords(recent_system_turn))
             elif recent_user_question:
-                # Extract keywords from recent user question
-                user_keywords = self._extract_keywords(recent_user_question)
-                enhanced_keywords.extend(user_keywords)
+                # Borrow keywords from recent user question
+                enhanced_keywords.extend(self._turn_keywords(recent_user_turn))
 
-        # Remove duplicates
-        enhanced_keywords = list(set(enhanced_keywords))
+        # Remove duplicates, keeping the question's own keywords first
+        enhanced_keywords = list(dict.fromkeys(enhanced_keywords))
 
         return {
             'original_question': question,
@@ -170,6 +335,7 @@ class QuestionProcessor:
             'context_aware': True,
             'recent_context': {
                 'system_response': recent_system_response,
-                'user_question': recent_user_question
+                'user_question': recent_user_question,
+                'entry_ids': recent_system_turn.get('analysis', {}).get('entry_ids', []) if recent_system_turn else []
             }
         }
@@ -6,28 +6,56 @@ RAG Controller Module
 Orchestrates the RAG workflow using the various modules.
 """
 
-from typing import Dict, List
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from question_processor import QuestionProcessor
 from knowledge_retriever import KnowledgeRetriever
+from sharded_retriever import ShardedRetriever
 from answer_generator import AnswerGenerator
 from dialogue_manager import DialogueManager
 from llm_backend import LLMBackend
+from query_cache import QueryCache
+from metrics import Metrics
 
 class RAGController:
     """Orchestrates the RAG workflow for Chinese New Year customs QA."""
 
-    def __init__(self, knowledge_base_path: str):
+    def __init__(self, knowledge_base_path: str, cache_size: int = 1024, cache_ttl: float = 300.0,
+                 metrics_enabled: bool = False, num_shards: int = 0):
         """
         Initialize the RAG controller.
 
         Args:
             knowledge_base_path: Path to the knowledge base JSON file
+            cache_size: Maximum number of cached answers (0 disables the cache)
+            cache_ttl: Seconds before a cached answer expires
+            metrics_enabled: Whether to record per-stage latency histograms
+            num_shards: Number of retrieval worker processes (0 retrieves in this process)
         """
+        # Latency instrumentation, a no-op unless enabled
+        self.metrics = Metrics(enabled=metrics_enabled)
+        self.metrics.describe('rag_stage_duration_seconds', 'Time spent in each pipeline stage')
+        self.metrics.describe('rag_query_duration_seconds', 'Time to answer a query with process_query')
+        self.metrics.describe('rag_stream_first_chunk_seconds', 'Time from a streamed query to its first chunk')
+        self.metrics.describe('rag_stream_duration_seconds', 'Time from a streamed query to its last chunk')
+        self.metrics.describe('rag_queries_total', 'Answered queries by answer source')
+
         # Initialize modules
         self.question_processor = QuestionProcessor()
-        self.knowledge_retriever = KnowledgeRetriever(knowledge_base_path)
+        if num_shards > 0:
+            self.knowledge_retriever = ShardedRetriever(knowledge_base_path, num_shards)
+        else:
+            self.knowledge_retriever = KnowledgeRetriever(knowledge_base_path)
         self.answer_generator = AnswerGenerator()
         self.dialogue_manager = DialogueManager()
+
+        # Segment questions with the knowledge base vocabulary
+        self.question_processor.set_terms(self.knowledge_retriever.index.terms())
+
+        # Cache of answers keyed on the processed query, dropped whenever the knowledge base reloads
+        self.query_cache = QueryCache(cache_size, cache_ttl)
+        self.knowledge_retriever.add_reload_listener(self._on_knowledge_base_reload)
         
         # Initialize LLM backend
         try:
@@ -39,51 +67,255 @@ class RAGController:
             self.llm_backend = None
             self.llm_enabled = False
 
-    def process_query(self, question: str) -> str:
+    def process_query(self, question: str, dialogue: Optional[DialogueManager] = None) -> str:
         """
         Process a user query through the RAG workflow.
 
         Args:
             question: User question as a string
+            dialogue: Dialogue state of the asking session (defaults to the controller's own)
 
         Returns:
             Colloquial answer as a string
         """
-        # Check if it's a follow-up question
-        is_follow_up = self.dialogue_manager.is_follow_up_question(question)
+        start_time = time.perf_counter() if self.metrics.enabled else 0.0
+        dialogue = dialogue if dialogue is not None else self.dialogue_manager
+        query, context, cache_key = self._prepare_query(question, dialogue)
+
+        result = self._answer_without_llm(query, context, cache_key)
+        if result is not None:
+            answer, source, entry_ids = result
+        else:
+            # Fallback to LLM if knowledge base returns no results
+            print("Knowledge base returned no results. Using LLM fallback.")
+            with self.metrics.time('rag_stage_duration_seconds', stage='llm'):
+                answer = self.llm_backend.generate_answer(question, context)
+            source, entry_ids = 'llm', ()
+
+        if self.metrics.enabled:
+            self.metrics.observe('rag_query_duration_seconds', time.perf_counter() - start_time, source=source)
+            self.metrics.increment('rag_queries_total', source=source)
+
+        # Add to dialogue history
+        self._add_turns(dialogue, question, query, answer, entry_ids)
+
+        return answer, source
+
+    def process_query_stream(self, question: str, dialogue: Optional[DialogueManager] = None) -> Iterator[Dict]:
+        """
+        Process a user query through the RAG workflow, streaming the answer.
+
+        The first event is {'type': 'source', 'source': ...}, followed by
+        {'type': 'chunk', 'chunk': ...} events. Knowledge base and fallback
+        answers arrive as a single chunk; LLM answers are streamed from one
+        upstream call.
+
+        Args:
+            question: User question as a string
+            dialogue: Dialogue state of the asking session (defaults to the controller's own)
+
+        Returns:
+            Generator of source and chunk events
+        """
+        start_time = time.perf_counter() if self.metrics.enabled else 0.0
+        dialogue = dialogue if dialogue is not None else self.dialogue_manager
+        query, context, cache_key = self._prepare_query(question, dialogue)
 
-        # Get recent context if it's a follow-up
-        if is_follow_up:
-            context = self.dialogue_manager.get_recent_context()
+        result = self._answer_without_llm(query, context, cache_key)
+        if result is not None:
+            answer, source, entry_ids = result
+            yield {'type': 'source', 'source': source}
+            if self.metrics.enabled:
+                self.metrics.observe('rag_stream_first_chunk_seconds', time.perf_counter() - start_time, source=source)
+            yield {'type': 'chunk', 'chunk': answer}
         else:
-            context = None
+            print("Knowledge base returned no results. Using LLM fallback.")
+            source, entry_ids = 'llm', ()
+            yield {'type': 'source', 'source': source}
+
+            stream = self.llm_backend.generate_answer(question, context, stream=True)
+            if isinstance(stream, str):
+                # The backend returns its apology string when the call fails
+                stream = [stream]
+
+            chunks = []
+            for chunk in stream:
+                if not chunks and self.metrics.enabled:
+                    self.metrics.observe('rag_stream_first_chunk_seconds', time.perf_counter() - start_time,
+                                         source=source)
+                chunks.append(chunk)
+                yield {'type': 'chunk', 'chunk': chunk}
+            answer = ''.join(chunks)
+
+        if self.metrics.enabled:
+            self.metrics.observe('rag_stream_duration_seconds', time.perf_counter() - start_time, source=source)
+            self.metrics.increment('rag_queries_total', source=source)
+
+        # Add to dialogue history once the answer is complete
+        self._add_turns(dialogue, question, query, answer, entry_ids)
+
+    def _add_turns(self, dialogue: DialogueManager, question: str, query: Dict, answer: str, entry_ids: Tuple):
+        """
+        Add a question and its answer to the dialogue history with their analysis.
+
+        Args:
+            dialogue: Dialogue state of the asking session
+            question: User question as a string
+            query: Processed query of the question
+            answer: Answer given
+            entry_ids: Ids of the knowledge entries the answer came from
+        """
+        dialogue.add_turn('user', question, self.question_processor.analyze_turn(question, query=query))
+        dialogue.add_turn('system', answer, self.question_processor.analyze_turn(answer, entry_ids=entry_ids))
+
+    def process_batch(self, questions: List[str], max_workers: int = 8) -> Iterator[Dict]:
+        """
+        Answer a batch of independent questions without touching dialogue history.
+
+        Each distinct question is processed once, knowledge base retrieval runs
+        as one batch, and LLM fallbacks are spread over a bounded thread pool.
+        Results are yielded in question order as soon as each is ready.
+
+        Args:
+            questions: User questions
+            max_workers: Maximum number of concurrent LLM calls
+
+        Returns:
+            Generator of {'index', 'question', 'answer', 'source'} dictionaries
+        """
+        # Process each distinct question once
+        slots: Dict[str, int] = {}
+        unique_questions = []
+        for question in questions:
+            if question not in slots:
+                slots[question] = len(unique_questions)
+                unique_questions.append(question)
+        queries = [self.question_processor.process_question(question) for question in unique_questions]
+
+        # Serve cached answers, then retrieve the rest in one batch
+        generation = self.query_cache.generation
+        render_generation = self.answer_generator.generation
+        results: List[Optional[object]] = [None] * len(queries)
+        cache_keys = [QueryCache.make_key(query) for query in queries]
+        pending = []
+        for slot, cache_key in enumerate(cache_keys):
+            results[slot] = self.query_cache.get(cache_key)
+            if results[slot] is None:
+                pending.append(slot)
+
+        retrieved = self.knowledge_retriever.retrieve_batch([queries[slot] for slot in pending])
+        llm_slots = []
+        for slot, entries in zip(pending, retrieved):
+            if entries:
+                answer = self.answer_generator.generate_answer(entries, queries[slot], generation=render_generation)
+                results[slot] = (answer, 'knowledge_base', tuple(entry['id'] for entry in entries))
+            elif self.llm_enabled:
+                llm_slots.append(slot)
+                continue
+            else:
+                results[slot] = ("抱歉，我暂时没有关于这个问题的信息。", 'fallback', ())
+            self.query_cache.put(cache_keys[slot], results[slot], generation)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(llm_slots)))) if llm_slots else None
+        try:
+            for slot in llm_slots:
+                results[slot] = executor.submit(self.llm_backend.generate_answer, unique_questions[slot])
+
+            for position, question in enumerate(questions):
+                result = results[slots[question]]
+                if isinstance(result, Future):
+                    result = (result.result(), 'llm', ())
+                answer, source, _ = result
+                yield {'index': position, 'question': question, 'answer': answer, 'source': source}
+        finally:
+            if executor is not None:
+                # Drop queued LLM calls if the consumer stops early
+                for slot in llm_slots:
+                    if isinstance(results[slot], Future):
+                        results[slot].cancel()
+                executor.shutdown(wait=False)
+
+    def _prepare_query(self, question: str,
+                       dialogue: DialogueManager) -> Tuple[Dict, Optional[List[Dict]], Optional[Tuple]]:
+        """
+        Resolve dialogue context and process the question.
+
+        Args:
+            question: User question as a string
+            dialogue: Dialogue state of the asking session
+
+        Returns:
+            Tuple of (processed query, context, cache key or None if not cacheable)
+        """
+        with self.metrics.time('rag_stage_duration_seconds', stage='dialogue_manager'):
+            # Check if it's a follow-up question
+            is_follow_up = dialogue.is_follow_up_question(question)
+
+            # Get recent context if it's a follow-up
+            if is_follow_up:
+                context = dialogue.get_recent_context()
+            else:
+                context = None
 
         # Process the question
-        query = self.question_processor.process_question(question, context)
+        with self.metrics.time('rag_stage_duration_seconds', stage='question_processor'):
+            query = self.question_processor.process_question(question, context)
+
+        # Only context-free queries are cached
+        cache_key = None if query.get('context_aware') else QueryCache.make_key(query)
+
+        return query, context, cache_key
+
+    def _answer_without_llm(self, query: Dict, context: Optional[List[Dict]],
+                            cache_key: Optional[Tuple]) -> Optional[Tuple[str, str, Tuple[str, ...]]]:
+        """
+        Answer from the query cache or the knowledge base.
+
+        Args:
+            query: Processed query dictionary
+            context: Dialogue context
+            cache_key: Query cache key, or None if the query is not cacheable
+
+        Returns:
+            Tuple of (answer, source, tuple of the ids of the entries answered from), or None if
+            the LLM has to answer
+        """
+        # A reload clearing the cache after this point makes the answer stale, it is then not cached
+        generation = self.query_cache.generation
+        render_generation = self.answer_generator.generation
+
+        # Reuse the answer of an identical context-free query
+        if cache_key is not None:
+            with self.metrics.time('rag_stage_duration_seconds', stage='query_cache'):
+                cached = self.query_cache.get(cache_key)
+            if cached is not None:
+                return cached
 
         # Retrieve relevant knowledge
-        retrieved_entries = self.knowledge_retriever.retrieve(query)
+        with self.metrics.time('rag_stage_duration_seconds', stage='knowledge_retriever'):
+            retrieved_entries = self.knowledge_retriever.retrieve(query)
 
         # Generate answer
         if retrieved_entries:
             # Use knowledge base answer
-            answer = self.answer_generator.generate_answer(retrieved_entries, query, context)
+            with self.metrics.time('rag_stage_duration_seconds', stage='answer_generator'):
+                answer = self.answer_generator.generate_answer(retrieved_entries, query, context,
+                                                               render_generation)
             source = 'knowledge_base'
+            entry_ids = tuple(entry['id'] for entry in retrieved_entries)
         elif self.llm_enabled:
-            # Fallback to LLM if knowledge base returns no results
-            print("Knowledge base returned no results. Using LLM fallback.")
-            answer = self.llm_backend.generate_answer(question, context)
-            source = 'llm'
+            return None
         else:
             # No results and LLM disabled
             answer = "抱歉，我暂时没有关于这个问题的信息。"
             source = 'fallback'
+            entry_ids = ()
 
-        # Add to dialogue history
-        self.dialogue_manager.add_turn('user', question)
-        self.dialogue_manager.add_turn('system', answer)
+        # Only knowledge base and fallback answers are cached, LLM answers vary per call
+        if cache_key is not None:
+            self.query_cache.put(cache_key, (answer, source, entry_ids), generation)
 
-        return answer, source
+        return answer, source, entry_ids
 
     def get_dialogue_history(self) -> List[Dict]:
         """
@@ -104,8 +336,29 @@ class RAGController:
         """
         Reload the knowledge base from the JSON file.
         """
+        # The reload listener refreshes the vocabulary and clears the answer caches
         self.knowledge_retriever.reload_knowledge_base()
 
+    def _on_knowledge_base_reload(self, changes: Dict):
+        """
+        Refresh state derived from the knowledge base after a reload.
+
+        Args:
+            changes: Change counts of the reload
+        """
+        self.question_processor.set_terms(self.knowledge_retriever.index.terms())
+        self.answer_generator.clear_rendered_answers()
+        self.query_cache.clear()
+
+    def get_cache_stats(self) -> Dict:
+        """
+        Get the query cache statistics.
+
+        Returns:
+            Hit/miss counters and size of the query cache
+        """
+        return self.query_cache.get_stats()
+
     def set_max_history_length(self, max_length: int):
         """
         Set the maximum dialogue history length.
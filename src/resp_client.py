@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+RESP Client Module
+Minimal client for servers speaking the Redis serialization protocol (RESP2).
+"""
+
+import socket
+import threading
+from typing import Any, List, Optional, Sequence
+from urllib.parse import urlparse
+
+
+class RespError(Exception):
+    """Error reply sent by the server."""
+
+
+class RespClient:
+    """
+    Blocking RESP2 client over a single socket.
+
+    Commands are serialized by a lock, so one client can be shared between
+    threads. Pipelines send several commands in one write and read all replies.
+    The connection is reopened on the next command after a socket error.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, timeout: float = 5.0):
+        """
+        Initialize the client; the connection is opened lazily.
+
+        Args:
+            host: Server host
+            port: Server port
+            db: Database index to select
+            password: Password for AUTH, if any
+            timeout: Socket timeout in seconds
+        """
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = 5.0) -> 'RespClient':
+        """
+        Create a client from a redis://[:password@]host[:port][/db] URL.
+
+        Args:
+            url: Server URL
+            timeout: Socket timeout in seconds
+
+        Returns:
+            RESP client
+        """
+        parsed = urlparse(url)
+        if parsed.scheme != 'redis':
+            raise ValueError(f"Unsupported URL scheme: {parsed.scheme}")
+        db = int(parsed.path.lstrip('/') or 0)
+        return cls(parsed.hostname or '127.0.0.1', parsed.port or 6379, db, parsed.password, timeout)
+
+    def execute(self, *args) -> Any:
+        """
+        Send one command and read its reply.
+
+        Args:
+            *args: Command name and arguments
+
+        Returns:
+            Decoded reply
+        """
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands: Sequence[Sequence]) -> List[Any]:
+        """
+        Send several commands at once and read all replies.
+
+        Args:
+            commands: Sequence of commands, each a sequence of name and arguments
+
+        Returns:
+            List of decoded replies; RespError is raised if any command failed
+        """
+        payload = b''.join(self._encode(command) for command in commands)
+        with self._lock:
+            try:
+                self._connect()
+                self._sock.sendall(payload)
+                replies = [self._read_reply() for _ in commands]
+            except (OSError, ConnectionError):
+                self._close()
+                raise
+
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def close(self):
+        """
+        Close the connection.
+        """
+        with self._lock:
+            self._close()
+
+    def _connect(self):
+        """
+        Open the connection and authenticate if not connected.
+        """
+        if self._sock is not None:
+            return
+
+        self._sock = socket.create_connection((self.host, self.port), self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile('rb')
+
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        if setup:
+            self._sock.sendall(b''.join(self._encode(command) for command in setup))
+            for _ in setup:
+                reply = self._read_reply()
+                if isinstance(reply, RespError):
+                    self._close()
+                    raise reply
+
+    def _close(self):
+        """
+        Drop the connection.
+        """
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    @staticmethod
+    def _encode(command: Sequence) -> bytes:
+        """
+        Encode a command as a RESP array of bulk strings.
+
+        Args:
+            command: Command name and arguments
+
+        Returns:
+            Encoded command
+        """
+        parts = [b'*%d\r\n' % len(command)]
+        for arg in command:
+            if isinstance(arg, bytes):
+                data = arg
+            elif isinstance(arg, str):
+                data = arg.encode('utf-8')
+            else:
+                data = str(arg).encode('ascii')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        return b''.join(parts)
+
+    def _read_reply(self) -> Any:
+        """
+        Read and decode one reply.
+
+        Returns:
+            str for simple and bulk strings, int, list, None, or RespError
+        """
+        line = self._reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError("Connection closed by server")
+
+        prefix, data = line[:1], line[1:-2]
+        if prefix == b'+':
+            return data.decode('utf-8')
+        if prefix == b'-':
+            return RespError(data.decode('utf-8'))
+        if prefix == b':':
+            return int(data)
+        if prefix == b'$':
+            length = int(data)
+            if length < 0:
+                return None
+            value = self._reader.read(length + 2)
+            return value[:-2].decode('utf-8')
+        if prefix == b'*':
+            count = int(data)
+            if count < 0:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise ConnectionError(f"Invalid reply: {line!r}")
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Relevance Scorers Module
+Pluggable relevance scorers used by KnowledgeRetriever to rank knowledge entries.
+"""
+
+import copy
+import heapq
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from knowledge_index import (
+    KnowledgeIndex, INTENT_BONUS, COMMON_QUESTION_BONUS,
+    TITLE_WEIGHT, DESCRIPTION_WEIGHT, KEYWORD_WEIGHT, SCENARIO_WEIGHT,
+    FIELD_TITLE, FIELD_DESCRIPTION, FIELD_SCENARIOS
+)
+
+
+class RelevanceScorer:
+    """Base class of the relevance scorers; subclasses precompute their state in build()."""
+
+    # Name used to select the scorer in KnowledgeRetriever
+    name = ''
+
+    def build(self, index: KnowledgeIndex, previous: Optional['RelevanceScorer'] = None):
+        """
+        Precompute the scorer state for a freshly loaded knowledge base.
+
+        Args:
+            index: Knowledge index of the loaded knowledge base
+            previous: Scorer built for the previous version, whose per-entry state may be reused
+        """
+        self.index = index
+
+    def clone(self) -> 'RelevanceScorer':
+        """
+        Copy the scorer settings so that a new knowledge base version can be built
+        without touching the state used by in-flight queries.
+
+        Returns:
+            Unbuilt copy of the scorer
+        """
+        return copy.copy(self)
+
+    def score(self, query: Dict) -> Dict[int, float]:
+        """
+        Score the candidate entries for a processed query.
+
+        Args:
+            query: Processed query dictionary
+
+        Returns:
+            Dict mapping entry index to relevance score
+        """
+        raise NotImplementedError
+
+    def rank(self, query: Dict, top_n: int = 3) -> List[int]:
+        """
+        Get the positions of the top N entries with a positive score.
+
+        Args:
+            query: Processed query dictionary
+            top_n: Number of top relevant entries to return
+
+        Returns:
+            Entry positions by descending score, knowledge base order on ties
+        """
+        return top_positions(self.score(query), top_n)
+
+    def rank_batch(self, queries: List[Dict], top_n: int = 3) -> List[List[int]]:
+        """
+        Rank the entries for several queries.
+
+        Subclasses may share work between the queries; the result is the same
+        as calling rank() on each query.
+
+        Args:
+            queries: Processed query dictionaries
+            top_n: Number of top relevant entries to return per query
+
+        Returns:
+            Entry positions per query, as returned by rank()
+        """
+        return [self.rank(query, top_n) for query in queries]
+
+
+class WeightedScorer(RelevanceScorer):
+    """Hand-weighted keyword scorer (title 3.0, description 2.0, keywords 2.5, scenarios 1.5)."""
+
+    name = 'weighted'
+
+    def score(self, query: Dict, keyword_memo: Optional[Dict] = None) -> Dict[int, float]:
+        """
+        Calculate the relevance scores of the candidate entries for the query.
+
+        Args:
+            query: Processed query dictionary
+            keyword_memo: Optional per-keyword matches shared between the queries of a batch
+
+        Returns:
+            Dict mapping entry index to relevance score
+        """
+        # Match keywords in title, description, keywords and scenarios
+        scores = self.index.score_keywords(query.get('keywords', []), keyword_memo)
+
+        # Adjust score based on intent
+        intent = query.get('intent', '')
+        for index in self.index.intent_postings.get(intent, []):
+            scores[index] = scores.get(index, 0.0) + INTENT_BONUS
+
+        # Handle common questions
+        for index in common_question_hits(self.index, query):
+            scores[index] = scores.get(index, 0.0) + COMMON_QUESTION_BONUS
+
+        return scores
+
+    def rank_batch(self, queries: List[Dict], top_n: int = 3) -> List[List[int]]:
+        """
+        Rank the entries for several queries, matching each distinct keyword once.
+
+        Args:
+            queries: Processed query dictionaries
+            top_n: Number of top relevant entries to return per query
+
+        Returns:
+            Entry positions per query, as returned by rank()
+        """
+        keyword_memo = {}
+        return [top_positions(self.score(query, keyword_memo), top_n) for query in queries]
+
+
+class BM25Scorer(RelevanceScorer):
+    """BM25 scorer over query keywords with field-boosted term frequencies."""
+
+    name = 'bm25'
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, common_question_bonus: float = COMMON_QUESTION_BONUS,
+                 max_cached_terms: int = 10000):
+        """
+        Initialize the BM25 scorer.
+
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalisation
+            common_question_bonus: Score added for each matched common question phrase
+            max_cached_terms: Maximum number of query terms whose postings are cached
+        """
+        self.k1 = k1
+        self.b = b
+        self.common_question_bonus = common_question_bonus
+        self.max_cached_terms = max_cached_terms
+
+    def build(self, index: KnowledgeIndex, previous: Optional[RelevanceScorer] = None):
+        """
+        Precompute document lengths and the postings of the knowledge base vocabulary.
+
+        Args:
+            index: Knowledge index of the loaded knowledge base
+            previous: Ignored, corpus statistics change with every entry
+        """
+        super().build(index)
+        features = index.features
+        self.num_entries = len(features)
+
+        lengths = [
+            len(entry.title) + len(entry.description)
+            + sum(len(scenario) for scenario in entry.scenarios)
+            + sum(len(keyword) for keyword in entry.keywords)
+            for entry in features
+        ]
+        avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        # Length part of the BM25 denominator, per entry
+        self.length_norms = [
+            self.k1 * (1 - self.b + self.b * (length / avg_length if avg_length else 0.0))
+            for length in lengths
+        ]
+
+        # term -> (idf, [(entry index, boosted term frequency)])
+        self.term_postings: Dict[str, Tuple[float, List[Tuple[int, float]]]] = {}
+        vocabulary = set()
+        for entry in features:
+            vocabulary.update(entry.keywords)
+            vocabulary.add(entry.title)
+        vocabulary.discard('')
+        for term in vocabulary:
+            self.term_postings[term] = self._compute_postings(term)
+
+        # Postings of query terms outside the vocabulary, computed on first use
+        self.extra_postings: Dict[str, Tuple[float, List[Tuple[int, float]]]] = {}
+
+    def _compute_postings(self, term: str) -> Tuple[float, List[Tuple[int, float]]]:
+        """
+        Compute the IDF and the boosted term frequencies of a term.
+
+        Args:
+            term: Query term
+
+        Returns:
+            Tuple of (idf, [(entry index, term frequency)])
+        """
+        features = self.index.features
+        frequencies: Dict[int, float] = {}
+
+        for index, fields in self.index.candidates(term).items():
+            entry = features[index]
+            tf = 0.0
+            if fields & FIELD_TITLE:
+                tf += TITLE_WEIGHT * entry.title.count(term)
+            if fields & FIELD_DESCRIPTION:
+                tf += DESCRIPTION_WEIGHT * entry.description.count(term)
+            if fields & FIELD_SCENARIOS:
+                tf += SCENARIO_WEIGHT * sum(scenario.count(term) for scenario in entry.scenarios)
+            if tf:
+                frequencies[index] = tf
+
+        for index in self.index.keyword_postings.get(term, []):
+            frequencies[index] = frequencies.get(index, 0.0) + KEYWORD_WEIGHT
+
+        df = len(frequencies)
+        idf = math.log(1 + (self.num_entries - df + 0.5) / (df + 0.5))
+        return idf, sorted(frequencies.items())
+
+    def _postings(self, term: str) -> Tuple[float, List[Tuple[int, float]]]:
+        """
+        Get the postings of a term, computing and caching them for unseen terms.
+
+        Args:
+            term: Query term
+
+        Returns:
+            Tuple of (idf, [(entry index, term frequency)])
+        """
+        postings = self.term_postings.get(term) or self.extra_postings.get(term)
+        if postings is None:
+            postings = self._compute_postings(term)
+            if len(self.extra_postings) >= self.max_cached_terms:
+                self.extra_postings.clear()
+            self.extra_postings[term] = postings
+        return postings
+
+    def score(self, query: Dict) -> Dict[int, float]:
+        """
+        Calculate the BM25 scores of the entries matching the query keywords.
+
+        Args:
+            query: Processed query dictionary
+
+        Returns:
+            Dict mapping entry index to BM25 score
+        """
+        scores: Dict[int, float] = {}
+        k1_plus_one = self.k1 + 1
+        length_norms = self.length_norms
+
+        for term, query_tf in Counter(query.get('keywords', [])).items():
+            idf, postings = self._postings(term)
+            weight = idf * query_tf * k1_plus_one
+            for index, tf in postings:
+                scores[index] = scores.get(index, 0.0) + weight * tf / (tf + length_norms[index])
+
+        if self.common_question_bonus:
+            for index in common_question_hits(self.index, query):
+                scores[index] = scores.get(index, 0.0) + self.common_question_bonus
+
+        return scores
+
+
+def common_question_hits(index: KnowledgeIndex, query: Dict) -> List[int]:
+    """
+    Get the entries boosted by the common question phrases of a query.
+
+    Args:
+        index: Knowledge index
+        query: Processed query dictionary
+
+    Returns:
+        Entry indexes, repeated once per matched phrase
+    """
+    return index.common_question_hits(
+        query.get('original_question', ''), query.get('cleaned_question', '')
+    )
+
+
+def top_positions(scores: Dict[int, float], top_n: int) -> List[int]:
+    """
+    Get the positions of the top N entries with a positive score.
+
+    Args:
+        scores: Dict mapping entry index to relevance score
+        top_n: Number of positions to return
+
+    Returns:
+        Entry positions by descending score, knowledge base order on ties
+    """
+    ranked = heapq.nsmallest(
+        top_n,
+        ((-score, index) for index, score in scores.items() if score > 0)
+    )
+    return [index for _, index in ranked]
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Segmenter Module
+Dictionary-based Chinese word segmentation over a double-array trie with a maximum-probability DAG.
+"""
+
+import math
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Frequency given to knowledge base keywords and titles, high enough to win over general words
+KB_TERM_FREQUENCY = 5000
+
+# General words likely to occur in questions about festivals, with rough relative frequencies
+BASE_LEXICON = {
+    # Function words
+    '的': 50000, '了': 20000, '是': 20000, '在': 15000, '有': 12000, '和': 10000, '就': 8000,
+    '不': 10000, '都': 8000, '一': 10000, '也': 8000, '很': 6000, '到': 8000, '说': 5000,
+    '要': 8000, '去': 6000, '会': 8000, '着': 6000, '看': 5000, '好': 6000, '吗': 8000,
+    '呢': 6000, '吧': 4000, '啊': 3000, '呀': 2000, '还': 6000, '又': 4000, '再': 4000, '更': 3000,
+    '这': 8000, '那': 8000, '它': 3000, '他': 5000, '她': 3000, '我': 10000, '你': 8000,
+    '一个': 6000, '没有': 5000, '自己': 4000, '这个': 5000, '那个': 4000, '这些': 3000,
+    '那些': 2500, '他们': 4000, '我们': 5000, '你们': 3000, '大家': 3000, '人们': 3000,
+    '那么': 3000, '然后': 3000, '接着': 1500, '还有': 3000, '另外': 2000, '再问': 500,
+    '可以': 5000, '需要': 3000, '应该': 3000, '一般': 2500, '通常': 2000, '为了': 2500,
+    '因为': 3000, '所以': 3000, '如果': 3000, '的话': 2000, '一些': 2500, '有些': 2000,
+    # Question words
+    '为什么': 3000, '为啥': 1500, '什么': 6000, '什么时候': 2000, '什么样': 1000, '怎么': 4000,
+    '怎么样': 1500, '怎样': 2000, '如何': 3000, '哪里': 2500, '哪儿': 1000, '哪些': 2000,
+    '何时': 800, '几时': 500, '多少': 2000, '啥': 2000, '干啥': 800, '干嘛': 800, '为何': 800,
+    '何故': 200, '何以': 200, '何谓': 200, '哪个': 1500, '位置': 1200, '是不是': 1500, '有没有': 1500,
+    '意思': 2500,
+    # Festivals and customs
+    '春节': 3000, '新年': 2500, '过年': 2500, '除夕': 2000, '元宵': 1500, '元宵节': 1500,
+    '清明': 1000, '端午': 1000, '七夕': 800, '中秋': 1200, '重阳': 600, '腊八': 800,
+    '小年': 800, '大年初一': 800, '正月': 1200, '腊月': 1200, '初一': 1500, '十五': 1500,
+    '习俗': 2500, '风俗': 1500, '传统': 2500, '文化': 2000, '寓意': 1500, '含义': 1200,
+    '由来': 1200, '起源': 1200, '讲究': 1000, '禁忌': 1000, '传说': 1200, '象征': 1000,
+    '年夜饭': 1200, '饺子': 1500, '汤圆': 1200, '年糕': 1000, '春联': 1200, '对联': 1000,
+    '福字': 1000, '鞭炮': 1200, '烟花': 1000, '红包': 1500, '压岁钱': 1000, '拜年': 1200,
+    '守岁': 1000, '团圆': 1200, '灯笼': 1000, '舞狮': 800, '舞龙': 800, '庙会': 800,
+    '祭祖': 800, '扫尘': 600, '窗花': 600, '年画': 600, '门神': 600, '贴': 2000, '放': 2500,
+    '挂': 1500, '吃': 4000, '穿': 2000, '新衣': 600, '家人': 2000, '亲戚': 1200, '长辈': 1000,
+    '晚辈': 600, '孩子': 2500, '老人': 1500, '地方': 2500, '地区': 2000, '北方': 1200,
+    '南方': 1200, '时间': 3000, '时候': 3000, '晚上': 2000, '早上': 1500, '门上': 500,
+}
+
+
+def knowledge_terms(entries: Iterable[Dict]) -> List[str]:
+    """
+    Collect the keywords and titles of knowledge entries, the words the segmenter must keep whole.
+
+    Args:
+        entries: Knowledge entries
+
+    Returns:
+        Distinct terms in knowledge base order
+    """
+    terms = {}
+    for entry in entries:
+        for term in list(entry.get('keywords', [])) + [entry.get('title', '')]:
+            if term and not term.isspace():
+                terms[term] = None
+    return list(terms)
+
+
+class DoubleArrayTrie:
+    """
+    Static trie stored in two parallel integer arrays.
+
+    A transition from state s on character code c leads to t = base[s] + c and
+    is valid if check[t] == s. Code 0 marks the end of a word; the base of that
+    slot holds -(word id + 1). Lookups cost one dict access for the character
+    code and two list accesses per character.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        """
+        Build the trie.
+
+        Args:
+            words: Dictionary words; empty and duplicate words are ignored
+        """
+        self.words: List[str] = sorted({word for word in words if word})
+        # Codes follow code point order, so sorted words give sorted child codes
+        alphabet = sorted({char for word in self.words for char in word})
+        self._codes: Dict[str, int] = {char: code for code, char in enumerate(alphabet, 1)}
+
+        # Every state takes one slot, so the character count bounds the array up to the packing slack
+        size = sum(len(word) for word in self.words) + len(self.words) + len(alphabet) + 1
+        self._base = [0] * size
+        self._check = [-1] * size
+        self._used_bases = set()
+        self._next_check_pos = 1
+        self._check[0] = 0
+
+        if self.words:
+            self._insert(0, self._children(0, len(self.words), 0), 0)
+        # Trim the unused tail
+        last = len(self._check) - 1
+        while last > 0 and self._check[last] == -1:
+            last -= 1
+        del self._base[last + 1:]
+        del self._check[last + 1:]
+        del self._used_bases
+
+    def _children(self, left: int, right: int, depth: int) -> List[List[int]]:
+        """
+        Group the words of a node by their character at depth.
+
+        Args:
+            left: First word of the node
+            right: End of the node's word range
+            depth: Prefix length of the node
+
+        Returns:
+            List of [code, left, right] for each child, code 0 for a word ending here
+        """
+        words, codes = self.words, self._codes
+        children = []
+        for position in range(left, right):
+            word = words[position]
+            code = codes[word[depth]] if len(word) > depth else 0
+            if children and children[-1][0] == code:
+                children[-1][2] = position + 1
+            else:
+                children.append([code, position, position + 1])
+        return children
+
+    def _ensure(self, size: int):
+        """
+        Grow the arrays to hold at least size slots.
+
+        Args:
+            size: Required number of slots
+        """
+        if size > len(self._check):
+            grow = max(size, len(self._check) * 2) - len(self._check)
+            self._base.extend([0] * grow)
+            self._check.extend([-1] * grow)
+
+    def _insert(self, state: int, children: List[List[int]], depth: int):
+        """
+        Place the children of a state and recurse into them.
+
+        Args:
+            state: Parent state
+            children: Children as returned by _children
+            depth: Prefix length of the state
+        """
+        first_code = children[0][0]
+        last_code = children[-1][0]
+        child_codes = [child[0] for child in children[1:]]
+        position = max(first_code + 1, self._next_check_pos) - 1
+        occupied = 0
+        first_free = True
+
+        # First-fit search for a base where every child slot is free
+        self._ensure(position + last_code - first_code + 2)
+        check = self._check
+        while True:
+            position += 1
+            if position + last_code - first_code >= len(check):
+                self._ensure(position + last_code - first_code + 1)
+                check = self._check
+            if check[position] != -1:
+                occupied += 1
+                continue
+            if first_free:
+                self._next_check_pos = position
+                first_free = False
+            base = position - first_code
+            if base in self._used_bases:
+                continue
+            if all(check[base + code] == -1 for code in child_codes):
+                break
+
+        # Skip densely packed regions in later searches
+        if occupied / (position - self._next_check_pos + 1) >= 0.95:
+            self._next_check_pos = position
+
+        self._used_bases.add(base)
+        self._base[state] = base
+        for child in children:
+            check[base + child[0]] = state
+
+        for code, left, right in children:
+            slot = base + code
+            if code == 0:
+                self._base[slot] = -(left + 1)
+            else:
+                self._insert(slot, self._children(left, right, depth + 1), depth + 1)
+
+    def prefixes(self, text: str, start: int = 0) -> Iterator[Tuple[int, int]]:
+        """
+        Find the dictionary words starting at a position.
+
+        Args:
+            text: Text to scan
+            start: Start position
+
+        Returns:
+            Iterator of (end position, word id), shortest words first
+        """
+        base, check, codes = self._base, self._check, self._codes
+        size = len(check)
+        state = 0
+        for position in range(start, len(text)):
+            code = codes.get(text[position])
+            if code is None:
+                return
+            target = base[state] + code
+            if target >= size or check[target] != state:
+                return
+            state = target
+            end = base[state]
+            if end < size and check[end] == state:
+                yield position + 1, -base[end] - 1
+
+    def __contains__(self, word: str) -> bool:
+        """
+        Check whether a word is in the dictionary.
+
+        Args:
+            word: Word to look up
+
+        Returns:
+            True if the word is in the dictionary
+        """
+        return any(end == len(word) for end, _ in self.prefixes(word)) if word else False
+
+    def __len__(self) -> int:
+        """Number of dictionary words."""
+        return len(self.words)
+
+
+class Segmenter:
+    """
+    Maximum-probability word segmenter.
+
+    Every dictionary word starting at each position forms a DAG over the
+    sentence; dynamic programming picks the path with the highest product of
+    word probabilities. Runs of characters outside the dictionary, such as names
+    the dictionary does not know, are kept together as one token. Results are
+    kept in an LRU cache because the same questions recur.
+    """
+
+    def __init__(self, frequencies: Dict[str, int], cache_size: int = 4096):
+        """
+        Build the segmenter.
+
+        Args:
+            frequencies: Dictionary words with their frequencies
+            cache_size: Number of segmentations kept in the LRU cache
+        """
+        self.trie = DoubleArrayTrie(frequencies)
+        log_total = math.log(sum(frequencies.values()) or 1)
+        self._log_probs = [math.log(max(1, frequencies[word])) - log_total for word in self.trie.words]
+        self._unknown_log_prob = -log_total
+        self._cut_cached = lru_cache(maxsize=cache_size)(self._cut)
+
+    @classmethod
+    def from_entries(cls, entries: List[Dict], base_lexicon: Optional[Dict[str, int]] = None,
+                     cache_size: int = 4096) -> 'Segmenter':
+        """
+        Build a segmenter whose dictionary holds the keywords and titles of knowledge entries.
+
+        Args:
+            entries: Knowledge entries
+            base_lexicon: General words with frequencies, BASE_LEXICON if omitted
+            cache_size: Number of segmentations kept in the LRU cache
+
+        Returns:
+            Segmenter
+        """
+        return cls.from_terms(knowledge_terms(entries), base_lexicon, cache_size)
+
+    @classmethod
+    def from_terms(cls, terms: Iterable[str], base_lexicon: Optional[Dict[str, int]] = None,
+                   cache_size: int = 4096) -> 'Segmenter':
+        """
+        Build a segmenter whose dictionary holds knowledge base terms on top of the general words.
+
+        Args:
+            terms: Knowledge base keywords and titles
+            base_lexicon: General words with frequencies, BASE_LEXICON if omitted
+            cache_size: Number of segmentations kept in the LRU cache
+
+        Returns:
+            Segmenter
+        """
+        frequencies = dict(BASE_LEXICON if base_lexicon is None else base_lexicon)
+        for term in terms:
+            if term and not term.isspace():
+                frequencies[term] = max(frequencies.get(term, 0), KB_TERM_FREQUENCY)
+        return cls(frequencies, cache_size)
+
+    def cut(self, text: str) -> List[str]:
+        """
+        Segment a text without whitespace into words.
+
+        Args:
+            text: Text to segment
+
+        Returns:
+            List of words
+        """
+        return list(self._cut_cached(text))
+
+    def cache_info(self):
+        """
+        Get the LRU cache statistics.
+
+        Returns:
+            functools cache info with hits, misses, maxsize and currsize
+        """
+        return self._cut_cached.cache_info()
+
+    def _cut(self, text: str) -> Tuple[str, ...]:
+        """
+        Segment a text along the maximum-probability path of its word DAG.
+
+        Args:
+            text: Text to segment
+
+        Returns:
+            Tuple of words
+        """
+        length = len(text)
+        log_probs = self._log_probs
+        unknown = self._unknown_log_prob
+        prefixes = self.trie.prefixes
+
+        # best[i] is the log probability of the best path from i to the end, ends[i] its first word end;
+        # known[i] is False where that word is a character outside the dictionary
+        best = [0.0] * (length + 1)
+        ends = [length] * (length + 1)
+        known = [False] * length
+        for start in range(length - 1, -1, -1):
+            best_prob = unknown + best[start + 1]
+            best_end = start + 1
+            best_known = False
+            for end, word_id in prefixes(text, start):
+                prob = log_probs[word_id] + best[end]
+                if end == start + 1 or prob > best_prob or (prob == best_prob and end > best_end):
+                    best_prob, best_end, best_known = prob, end, True
+            best[start] = best_prob
+            ends[start] = best_end
+            known[start] = best_known
+
+        words = []
+        start = 0
+        previous_known = True
+        while start < length:
+            end = ends[start]
+            if known[start]:
+                words.append(text[start:end])
+            elif previous_known:
+                words.append(text[start])
+            else:
+                # Extend the current run of unknown characters
+                words[-1] += text[start]
+            previous_known = known[start]
+            start = end
+        return tuple(words)
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Session Store Module
+Per-session dialogue state with bounded memory and LRU/idle-TTL eviction.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from dialogue_manager import DialogueManager
+from resp_client import RespClient
+
+
+class SessionStore:
+    """
+    Interface of session stores.
+
+    get() returns the DialogueManager of a session, creating an empty one for
+    unknown sessions. Callers hand it back with save() after adding turns.
+    """
+
+    def __init__(self, max_history_length: int = 20):
+        """
+        Initialize the store.
+
+        Args:
+            max_history_length: Dialogue turns kept per session
+        """
+        self.max_history_length = max_history_length
+
+    def new_session(self) -> DialogueManager:
+        """
+        Create the dialogue state of a new session.
+
+        Returns:
+            Empty dialogue manager
+        """
+        return DialogueManager(max_history_length=self.max_history_length)
+
+    def get(self, session_id: str, create: bool = True) -> Optional[DialogueManager]:
+        """
+        Get the dialogue state of a session.
+
+        Args:
+            session_id: Session identifier
+            create: Whether to start a new session if the session is unknown
+
+        Returns:
+            Dialogue manager of the session, or None if unknown and create is False
+        """
+        raise NotImplementedError
+
+    def save(self, session_id: str, dialogue: DialogueManager):
+        """
+        Store the dialogue state of a session after it changed.
+
+        Args:
+            session_id: Session identifier
+            dialogue: Dialogue manager of the session
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> bool:
+        """
+        Delete a session.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            True if the session existed, False otherwise
+        """
+        raise NotImplementedError
+
+    def session_ids(self) -> List[str]:
+        """
+        List the live sessions.
+
+        Returns:
+            Session identifiers, least recently used first
+        """
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict:
+        """
+        Get store statistics.
+
+        Returns:
+            Store statistics as a dictionary
+        """
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Session store inside the server process.
+
+    Sessions are kept in least recently used order. Sessions idle for longer
+    than idle_ttl are dropped, and the least recently used sessions are
+    evicted while more than max_sessions are stored or their estimated memory
+    exceeds max_memory_bytes.
+    """
+
+    def __init__(self, max_sessions: int = 10000, max_memory_bytes: int = 64 * 1024 * 1024,
+                 idle_ttl: float = 3600.0, max_history_length: int = 20):
+        """
+        Initialize the store.
+
+        Args:
+            max_sessions: Maximum number of sessions
+            max_memory_bytes: Maximum estimated memory of all sessions
+            idle_ttl: Seconds of inactivity before a session expires (0 for no expiry)
+            max_history_length: Dialogue turns kept per session
+        """
+        super().__init__(max_history_length)
+        self.max_sessions = max_sessions
+        self.max_memory_bytes = max_memory_bytes
+        self.idle_ttl = idle_ttl
+
+        # session_id -> [dialogue, last access time, memory size], in LRU order
+        self._sessions: 'OrderedDict[str, list]' = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, session_id: str, create: bool = True) -> Optional[DialogueManager]:
+        """Get the dialogue state of a session, optionally creating it if unknown."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                if not create:
+                    return None
+                entry = [self.new_session(), now, 0]
+                self._sessions[session_id] = entry
+                self._evict()
+            else:
+                entry[1] = now
+                self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def save(self, session_id: str, dialogue: DialogueManager):
+        """Store the dialogue state of a session and enforce the caps."""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = [dialogue, now, 0]
+                self._sessions[session_id] = entry
+            else:
+                entry[0] = dialogue
+                entry[1] = now
+                self._sessions.move_to_end(session_id)
+
+            size = dialogue.memory_size()
+            self._memory_bytes += size - entry[2]
+            entry[2] = size
+            self._evict()
+
+    def delete(self, session_id: str) -> bool:
+        """Delete a session."""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is None:
+                return False
+            self._memory_bytes -= entry[2]
+            return True
+
+    def session_ids(self) -> List[str]:
+        """List the live sessions, least recently used first."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return list(self._sessions)
+
+    def get_stats(self) -> Dict:
+        """Get store statistics."""
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'memory_bytes': self._memory_bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    def _expire(self, now: float):
+        """
+        Drop sessions idle for longer than idle_ttl.
+
+        Args:
+            now: Current monotonic time
+        """
+        if not self.idle_ttl:
+            return
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry[1] <= self.idle_ttl:
+                break
+            del self._sessions[session_id]
+            self._memory_bytes -= entry[2]
+            self.expirations += 1
+
+    def _evict(self):
+        """
+        Evict least recently used sessions beyond the session and memory caps.
+        """
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or
+                                           self._memory_bytes > self.max_memory_bytes):
+            _, entry = self._sessions.popitem(last=False)
+            self._memory_bytes -= entry[2]
+            self.evictions += 1
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Session store on a server speaking the Redis protocol.
+
+    Each session is a JSON string that expires after idle_ttl without access.
+    A sorted set of last access times keeps the session count under
+    max_sessions by deleting the least recently used sessions. The memory
+    bound per session is the history length; the server's maxmemory policy
+    bounds the total.
+    """
+
+    def __init__(self, client: RespClient, max_sessions: int = 10000, idle_ttl: float = 3600.0,
+                 max_history_length: int = 20, prefix: str = 'cny-qa:session:'):
+        """
+        Initialize the store.
+
+        Args:
+            client: RESP client connected to the server
+            max_sessions: Maximum number of sessions
+            idle_ttl: Seconds of inactivity before a session expires (0 for no expiry)
+            max_history_length: Dialogue turns kept per session
+            prefix: Key prefix of the session keys
+        """
+        super().__init__(max_history_length)
+        self.client = client
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.prefix = prefix
+        self.index_key = prefix + 'index'
+        self.evictions = 0
+
+    def _key(self, session_id: str) -> str:
+        """
+        Get the key of a session.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            Session key
+        """
+        return self.prefix + 'data:' + session_id
+
+    def get(self, session_id: str, create: bool = True) -> Optional[DialogueManager]:
+        """Get the dialogue state of a session, optionally creating it if unknown."""
+        key = self._key(session_id)
+        # XX only refreshes sessions that were saved before
+        commands = [('GET', key), ('ZADD', self.index_key, 'XX', time.time(), session_id)]
+        if self.idle_ttl:
+            commands.append(('EXPIRE', key, int(self.idle_ttl)))
+        data = self.client.pipeline(commands)[0]
+
+        if data is None:
+            # The session expired or was never saved; drop any stale index entry
+            self.client.execute('ZREM', self.index_key, session_id)
+            return self.new_session() if create else None
+        return DialogueManager.from_dict(json.loads(data))
+
+    def save(self, session_id: str, dialogue: DialogueManager):
+        """Store the dialogue state of a session and enforce the caps."""
+        now = time.time()
+        value = json.dumps(dialogue.to_dict(), ensure_ascii=False)
+
+        set_command = ('SET', self._key(session_id), value)
+        if self.idle_ttl:
+            set_command += ('EX', int(self.idle_ttl))
+        commands = [set_command, ('ZADD', self.index_key, now, session_id)]
+        if self.idle_ttl:
+            # Expired sessions are gone from the keyspace, drop them from the index too
+            commands.append(('ZREMRANGEBYSCORE', self.index_key, '-inf', now - self.idle_ttl))
+        commands.append(('ZCARD', self.index_key))
+        size = self.client.pipeline(commands)[-1]
+
+        if size > self.max_sessions:
+            self._evict(size - self.max_sessions)
+
+    def delete(self, session_id: str) -> bool:
+        """Delete a session."""
+        deleted, _ = self.client.pipeline([
+            ('DEL', self._key(session_id)),
+            ('ZREM', self.index_key, session_id)
+        ])
+        return deleted > 0
+
+    def session_ids(self) -> List[str]:
+        """List the live sessions, least recently used first."""
+        if self.idle_ttl:
+            return self.client.pipeline([
+                ('ZREMRANGEBYSCORE', self.index_key, '-inf', time.time() - self.idle_ttl),
+                ('ZRANGE', self.index_key, 0, -1)
+            ])[1]
+        return self.client.execute('ZRANGE', self.index_key, 0, -1)
+
+    def get_stats(self) -> Dict:
+        """Get store statistics."""
+        return {
+            'backend': 'redis',
+            'sessions': self.client.execute('ZCARD', self.index_key),
+            'max_sessions': self.max_sessions,
+            'evictions': self.evictions
+        }
+
+    def _evict(self, count: int):
+        """
+        Delete the least recently used sessions.
+
+        Args:
+            count: Number of sessions to delete
+        """
+        session_ids = self.client.execute('ZRANGE', self.index_key, 0, count - 1)
+        if not session_ids:
+            return
+        self.client.pipeline([
+            ('DEL',) + tuple(self._key(session_id) for session_id in session_ids),
+            ('ZREM', self.index_key) + tuple(session_ids)
+        ])
+        self.evictions += len(session_ids)
+
+
+def create_session_store(backend: str = 'memory', redis_url: Optional[str] = None, **kwargs) -> SessionStore:
+    """
+    Create a session store by backend name.
+
+    Args:
+        backend: 'memory' or 'redis'
+        redis_url: redis:// URL of the server for the redis backend
+        **kwargs: Options passed to the store
+
+    Returns:
+        Session store
+    """
+    if backend == 'memory':
+        return InMemorySessionStore(**kwargs)
+    if backend == 'redis':
+        if not redis_url:
+            raise ValueError("redis_url is required for the redis session store")
+        kwargs.pop('max_memory_bytes', None)
+        return RedisSessionStore(RespClient.from_url(redis_url), **kwargs)
+    raise ValueError(f"Unknown session store backend: {backend}")
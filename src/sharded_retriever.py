@@ -0,0 +1,603 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Sharded Retrieval Module
+Partitions the knowledge base across worker processes and merges their rankings.
+"""
+
+import heapq
+import multiprocessing
+import os
+import queue
+import threading
+from itertools import chain
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional, Tuple, Union
+
+from kb_compiler import is_compiled_knowledge_base
+from knowledge_index import KnowledgeIndex, diff_entries
+from knowledge_retriever import KnowledgeRetriever, KnowledgeSnapshot
+from scorers import RelevanceScorer, WeightedScorer
+from segmenter import knowledge_terms
+
+
+# Pipe errors raised when a worker process has died
+WORKER_ERRORS = (EOFError, OSError)
+
+
+class ShardPoolClosed(RuntimeError):
+    """Raised when a query reaches a shard pool retired by a reload."""
+
+
+def _shard_worker(connections):
+    """
+    Serve ranking requests for one shard until told to stop.
+
+    Requests arrive on several channels, one per concurrent caller in the
+    parent, and each reply goes back on the channel of its request.
+
+    Args:
+        connections: Pipe connections to the parent process, one per channel
+    """
+    scorer = None
+    offset = 0
+    listening = list(connections)
+    running = True
+    while running and listening:
+        for conn in wait(listening):
+            try:
+                message = conn.recv()
+            except EOFError:
+                listening.remove(conn)
+                continue
+            command = message[0]
+            try:
+                if command == 'load':
+                    offset, entries = message[1], message[2]
+                    scorer = WeightedScorer()
+                    scorer.build(KnowledgeIndex(entries))
+                    conn.send(('ok', len(entries)))
+                elif command == 'rank':
+                    queries, top_n = message[1], message[2]
+                    keyword_memo = {}
+                    results = []
+                    for query in queries:
+                        scores = scorer.score(query, keyword_memo)
+                        top = heapq.nsmallest(
+                            top_n,
+                            ((-score, index) for index, score in scores.items() if score > 0)
+                        )
+                        results.append([(negated, index + offset) for negated, index in top])
+                    conn.send(('ok', results))
+                elif command == 'stop':
+                    conn.send(('ok', None))
+                    running = False
+                    break
+                else:
+                    conn.send(('error', f"Unknown shard command: {command}"))
+            except Exception as e:
+                conn.send(('error', f"{type(e).__name__}: {e}"))
+    for conn in connections:
+        conn.close()
+
+
+def entry_cost(entry: Dict) -> int:
+    """
+    Estimate the indexing and scoring cost of an entry by its text length.
+
+    Args:
+        entry: Knowledge entry
+
+    Returns:
+        Number of characters in the scored fields
+    """
+    return (len(entry.get('title', '')) + len(entry.get('description', ''))
+            + sum(len(scenario) for scenario in entry.get('scenarios', []))
+            + sum(len(keyword) for keyword in entry.get('keywords', [])))
+
+
+def partition(entries: List[Dict], num_shards: int) -> List[Tuple[int, int]]:
+    """
+    Split entries into contiguous ranges of roughly equal cost.
+
+    Contiguous ranges keep global positions as shard offset plus local
+    position, so merged rankings break ties in knowledge base order.
+
+    Args:
+        entries: Knowledge entries
+        num_shards: Number of ranges
+
+    Returns:
+        List of (start, end) ranges, empty ranges omitted
+    """
+    total = sum(entry_cost(entry) for entry in entries) or 1
+    ranges = []
+    start = 0
+    cumulative = 0
+    for position, entry in enumerate(entries):
+        cumulative += entry_cost(entry)
+        if cumulative * num_shards >= total * (len(ranges) + 1) and len(ranges) < num_shards - 1:
+            ranges.append((start, position + 1))
+            start = position + 1
+    if start < len(entries) or not ranges:
+        ranges.append((start, len(entries)))
+    return ranges
+
+
+class ShardWorker:
+    """
+    Parent-side handle of one shard worker process and its channels.
+    """
+
+    def __init__(self, context, channels: int):
+        """
+        Start the worker process.
+
+        Args:
+            context: multiprocessing context
+            channels: Number of pipes to the worker
+        """
+        self.connections = []
+        child_connections = []
+        for _ in range(channels):
+            parent_conn, child_conn = context.Pipe()
+            self.connections.append(parent_conn)
+            child_connections.append(child_conn)
+        self.process = context.Process(target=_shard_worker, args=(child_connections,), daemon=True)
+        self.process.start()
+        for child_conn in child_connections:
+            child_conn.close()
+
+    def stop(self):
+        """
+        Ask the worker to exit and wait for it, terminating it if it does not.
+        """
+        try:
+            self.connections[0].send(('stop',))
+            self.connections[0].recv()
+        except WORKER_ERRORS:
+            pass
+        self.kill()
+
+    def kill(self):
+        """
+        Close the channels and make sure the process is gone.
+        """
+        for connection in self.connections:
+            connection.close()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=5)
+
+
+class ShardPool:
+    """
+    Worker processes holding one shard index each.
+
+    Queries are scattered to every shard and the per-shard top N lists are
+    merged by score, then by global position. The weighted score of an entry
+    only depends on the entry itself, so the merged ranking equals the
+    single-process one.
+
+    Every worker listens on the same number of channels. A request checks
+    out one channel and uses that pipe of each worker, so up to `channels`
+    requests are in flight at once and overlap across the shards. A worker
+    that dies is restarted with its shard and asked again.
+    """
+
+    def __init__(self, entries: List[Dict], num_shards: int, start_method: str = 'spawn', channels: int = 4):
+        """
+        Start the workers and build their shard indexes.
+
+        Args:
+            entries: Knowledge entries
+            num_shards: Number of worker processes
+            start_method: multiprocessing start method
+            channels: Number of requests that can be in flight at once
+        """
+        self._context = multiprocessing.get_context(start_method)
+        self._entries = entries
+        self.ranges = partition(entries, max(1, num_shards))
+        self.channels = max(1, channels)
+        self.restarts = 0
+        self._free_channels = queue.Queue()
+        for channel in range(self.channels):
+            self._free_channels.put(channel)
+        self._restart_lock = threading.Lock()
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self._workers: List[ShardWorker] = []
+
+        # Build all shards in parallel
+        try:
+            for _ in self.ranges:
+                self._workers.append(ShardWorker(self._context, self.channels))
+            for shard, worker in enumerate(self._workers):
+                self._send_load(worker, shard)
+            for worker in self._workers:
+                self._payload(worker.connections[0].recv())
+        except Exception:
+            self.close()
+            raise
+
+    def warm(self, queries: List[Dict]):
+        """
+        Run sample queries so that every worker has exercised the ranking path.
+
+        Args:
+            queries: Sample processed queries
+        """
+        if queries:
+            self.rank_batch(queries)
+
+    def rank(self, query: Dict, top_n: int = 3) -> List[int]:
+        """
+        Get the positions of the top N entries across all shards.
+
+        Args:
+            query: Processed query dictionary
+            top_n: Number of top relevant entries to return
+
+        Returns:
+            Entry positions by descending score, knowledge base order on ties
+        """
+        return self.rank_batch([query], top_n)[0]
+
+    def rank_batch(self, queries: List[Dict], top_n: int = 3) -> List[List[int]]:
+        """
+        Rank the entries for several queries with one round trip per shard.
+
+        Args:
+            queries: Processed query dictionaries
+            top_n: Number of top relevant entries to return per query
+
+        Returns:
+            Entry positions per query
+        """
+        if self._closed:
+            raise ShardPoolClosed("Shard pool was retired")
+        channel = self._free_channels.get()
+        try:
+            if self._closed:
+                raise ShardPoolClosed("Shard pool was retired")
+            workers = list(self._workers)
+            message = ('rank', queries, top_n)
+            replies = [None] * len(workers)
+            failed = []
+
+            # Scatter, then gather while the shards rank in parallel
+            for shard, worker in enumerate(workers):
+                try:
+                    worker.connections[channel].send(message)
+                except WORKER_ERRORS:
+                    failed.append(shard)
+            for shard, worker in enumerate(workers):
+                if shard in failed:
+                    continue
+                try:
+                    replies[shard] = worker.connections[channel].recv()
+                except WORKER_ERRORS:
+                    failed.append(shard)
+
+            # Ask the replacements of workers that died
+            for shard in failed:
+                worker = self._restart(shard, workers[shard])
+                try:
+                    worker.connections[channel].send(message)
+                    replies[shard] = worker.connections[channel].recv()
+                except WORKER_ERRORS:
+                    raise RuntimeError(f"Shard worker {shard} stopped again while ranking") from None
+        finally:
+            self._free_channels.put(channel)
+
+        shard_results = [self._payload(reply) for reply in replies]
+        merged = []
+        for position in range(len(queries)):
+            top = heapq.nsmallest(top_n, chain.from_iterable(results[position] for results in shard_results))
+            merged.append([index for _, index in top])
+        return merged
+
+    def close(self):
+        """
+        Stop the workers once the requests in flight have finished.
+        """
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            # Holding every channel means no request is in flight
+            for _ in range(self.channels):
+                self._free_channels.get()
+            for worker in self._workers:
+                worker.stop()
+            # Wake requests waiting for a channel, they find the pool closed
+            for channel in range(self.channels):
+                self._free_channels.put(channel)
+
+    def _restart(self, shard: int, dead: ShardWorker) -> ShardWorker:
+        """
+        Replace a worker that died, unless another request already did.
+
+        Args:
+            shard: Shard number
+            dead: Worker whose pipe failed
+
+        Returns:
+            Worker now serving the shard
+        """
+        with self._restart_lock:
+            if self._closed:
+                raise ShardPoolClosed("Shard pool was retired")
+            worker = self._workers[shard]
+            if worker is dead:
+                print(f"Shard worker {shard} stopped (exit code {dead.process.exitcode}), restarting it")
+                dead.kill()
+                worker = ShardWorker(self._context, self.channels)
+                try:
+                    self._send_load(worker, shard)
+                    self._payload(worker.connections[0].recv())
+                except WORKER_ERRORS:
+                    worker.kill()
+                    raise RuntimeError(f"Shard worker {shard} could not be restarted") from None
+                self._workers[shard] = worker
+                self.restarts += 1
+            return worker
+
+    def _send_load(self, worker: ShardWorker, shard: int):
+        """
+        Send a worker the entries of its shard.
+
+        Args:
+            worker: Shard worker
+            shard: Shard number
+        """
+        start, end = self.ranges[shard]
+        worker.connections[0].send(('load', start, self._entries[start:end]))
+
+    @staticmethod
+    def _payload(reply):
+        """
+        Unpack a worker reply.
+
+        Args:
+            reply: (status, payload) tuple received from a worker
+
+        Returns:
+            Reply payload
+        """
+        status, payload = reply
+        if status != 'ok':
+            raise RuntimeError(f"Shard worker failed: {payload}")
+        return payload
+
+
+class EntryDirectory:
+    """
+    Id and related-entry lookups for the parent process, which keeps no shard index.
+
+    Provides the parts of KnowledgeIndex used by get_entry and get_related_entries.
+    """
+
+    def __init__(self, entries: List[Dict]):
+        """
+        Build the id postings of the entries.
+
+        Args:
+            entries: Knowledge entries
+        """
+        self.entries = entries
+        self.id_postings: Dict[str, List[int]] = {}
+        for position, entry in enumerate(entries):
+            self.id_postings.setdefault(entry.get('id'), []).append(position)
+        self.related_graph: Dict[int, List[int]] = {}
+
+    def related_indexes(self, index: int) -> List[int]:
+        """
+        Get the entries listed in the related field of an entry, in knowledge base order.
+
+        Args:
+            index: Position of the entry
+
+        Returns:
+            Positions of the related entries
+        """
+        related = self.related_graph.get(index)
+        if related is None:
+            positions = set()
+            for related_id in self.entries[index].get('related', []):
+                positions.update(self.id_postings.get(related_id, []))
+            related = sorted(positions)
+            self.related_graph[index] = related
+        return related
+
+    def terms(self) -> List[str]:
+        """
+        Get the keywords and titles of the entries, the vocabulary of the question segmenter.
+
+        Returns:
+            Distinct terms in knowledge base order
+        """
+        return knowledge_terms(self.entries)
+
+
+class ShardedRetriever(KnowledgeRetriever):
+    """
+    Knowledge retriever ranking over shard indexes in worker processes.
+
+    The parent only keeps the entries and an id directory, so ranking CPU time
+    and index memory move out of the serving process. Reloads and rebalances
+    start a new pool with freshly partitioned shards, warm it, swap it in and
+    retire the old pool after its requests in flight.
+    """
+
+    def __init__(self, knowledge_base_path: str, num_shards: Optional[int] = None,
+                 scorer: Union[str, RelevanceScorer] = 'weighted', start_method: str = 'spawn',
+                 channels: int = 4):
+        """
+        Initialize the sharded retriever.
+
+        Args:
+            knowledge_base_path: Path to the knowledge base JSON file
+            num_shards: Number of worker processes (CPU count if omitted)
+            scorer: 'weighted'; other scorers depend on corpus-wide statistics
+            start_method: multiprocessing start method
+            channels: Number of queries the shard pool serves at once
+        """
+        if is_compiled_knowledge_base(knowledge_base_path):
+            raise ValueError("Sharded retrieval requires a JSON knowledge base")
+        # Only the weighted scorer scores each entry independently of the others
+        if not (scorer == WeightedScorer.name or type(scorer) is WeightedScorer):
+            raise ValueError("Sharded retrieval only supports the weighted scorer")
+
+        # The base initializer would build a full index in this process, so it is not called
+        self.knowledge_base_path = knowledge_base_path
+        self.num_shards = num_shards or os.cpu_count() or 1
+        self.start_method = start_method
+        self.channels = channels
+        self._reload_lock = threading.Lock()
+        self._reload_listeners = []
+        self._watcher = None
+
+        knowledge_base = self._load_knowledge_base()
+        self._snapshot = self._build_snapshot(knowledge_base)
+
+    @property
+    def scorer(self) -> ShardPool:
+        """Shard pool ranking the current snapshot."""
+        return self._snapshot.scorer
+
+    def _build_snapshot(self, knowledge_base: Dict) -> KnowledgeSnapshot:
+        """
+        Start and warm a shard pool for a knowledge base version.
+
+        Args:
+            knowledge_base: Knowledge base dictionary
+
+        Returns:
+            Snapshot whose scorer is the shard pool
+        """
+        entries = knowledge_base['data']
+        pool = ShardPool(entries, self.num_shards, self.start_method, self.channels)
+        # One sample query per shard, asking for the title of its first entry
+        pool.warm([
+            {'original_question': entries[start]['title'], 'cleaned_question': entries[start]['title'],
+             'intent': 'what', 'keywords': [entries[start]['title']]}
+            for start, end in pool.ranges if end > start and entries[start].get('title')
+        ])
+        return KnowledgeSnapshot(knowledge_base, EntryDirectory(entries), pool)
+
+    def set_scorer(self, scorer: Union[str, RelevanceScorer]):
+        """
+        Switch the relevance scorer; only the weighted scorer is supported.
+
+        Args:
+            scorer: Relevance scorer or its name
+        """
+        if not (scorer == WeightedScorer.name or type(scorer) is WeightedScorer):
+            raise ValueError("Sharded retrieval only supports the weighted scorer")
+
+    def retrieve(self, query: Dict, top_n: int = 3) -> List[Dict]:
+        """
+        Retrieve relevant knowledge entries based on the processed query.
+
+        Args:
+            query: Processed query dictionary
+            top_n: Number of top relevant entries to return
+
+        Returns:
+            List of top N relevant knowledge entries
+        """
+        return self._on_current_pool(super().retrieve, query, top_n)
+
+    def retrieve_batch(self, queries: List[Dict], top_n: int = 3) -> List[List[Dict]]:
+        """
+        Retrieve the relevant entries for several processed queries at once.
+
+        Args:
+            queries: Processed query dictionaries
+            top_n: Number of top relevant entries to return per query
+
+        Returns:
+            List of top N relevant entries per query, in query order
+        """
+        return self._on_current_pool(super().retrieve_batch, queries, top_n)
+
+    def _on_current_pool(self, function, *args):
+        """
+        Run a ranking call, retrying it if a reload retired the pool it reached.
+
+        Args:
+            function: Retrieval method reading the current snapshot
+            *args: Its arguments
+
+        Returns:
+            Result of the call
+        """
+        while True:
+            snapshot = self._snapshot
+            try:
+                return function(*args)
+            except ShardPoolClosed:
+                # Retry on the new pool only if a reload or rebalance swapped the snapshot;
+                # a closed pool that is still current means the retriever was closed
+                if self._snapshot is snapshot:
+                    raise ShardPoolClosed("Sharded retriever is closed") from None
+
+    def reload_knowledge_base(self) -> Dict[str, int]:
+        """
+        Reload the knowledge base from the JSON file into a rebalanced shard pool.
+
+        Returns:
+            Counts of added, updated, removed and unchanged entries
+        """
+        with self._reload_lock:
+            previous = self._snapshot
+            knowledge_base = self._load_knowledge_base()
+            changes = self._count_changes(previous.knowledge_base['data'], knowledge_base['data'])
+            self._snapshot = self._build_snapshot(knowledge_base)
+            previous.scorer.close()
+
+        for listener in list(self._reload_listeners):
+            listener(changes)
+        return changes
+
+    def rebalance(self, num_shards: Optional[int] = None):
+        """
+        Repartition the current knowledge base, optionally over a new number of shards.
+
+        Args:
+            num_shards: New number of worker processes, unchanged if omitted
+        """
+        with self._reload_lock:
+            if num_shards:
+                self.num_shards = num_shards
+            previous = self._snapshot
+            self._snapshot = self._build_snapshot(previous.knowledge_base)
+            previous.scorer.close()
+
+    def close(self):
+        """
+        Stop watching and shut the shard workers down.
+        """
+        self.stop_watching()
+        self._snapshot.scorer.close()
+
+    @staticmethod
+    def _count_changes(old_entries: List[Dict], new_entries: List[Dict]) -> Dict[str, int]:
+        """
+        Count the entry changes between two versions by id.
+
+        Args:
+            old_entries: Entries of the previous version
+            new_entries: Newly loaded entries
+
+        Returns:
+            Counts of added, updated, removed and unchanged entries
+        """
+        _, changes = diff_entries(
+            [entry.get('id') for entry in old_entries], [entry.get('id') for entry in new_entries],
+            lambda old, new: old_entries[old] == new_entries[new]
+        )
+        return changes
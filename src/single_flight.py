@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Single-Flight Module
+Coalesces identical in-flight streams so that concurrent callers share one upstream stream.
+"""
+
+import threading
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional
+
+
+class _Flight:
+    """Shared state of one upstream stream and its subscribers."""
+
+    __slots__ = ('factory', 'upstream', 'chunks', 'done', 'error', 'pulling', 'subscribers')
+
+    def __init__(self, factory: Callable[[], Iterable[str]]):
+        self.factory = factory
+        self.upstream: Optional[Iterator[str]] = None
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.pulling = False
+        self.subscribers = 0
+
+
+class StreamCoalescer:
+    """
+    Single-flight layer for chunk streams.
+
+    The first caller for a key starts the upstream stream. Callers arriving
+    while it is in flight subscribe to the same stream and first receive the
+    chunks already buffered. Whichever subscriber runs out of buffered chunks
+    pulls the next one from upstream, so the stream keeps going if the first
+    caller goes away. Once the upstream is exhausted the key is released and
+    the next caller starts a new stream.
+    """
+
+    def __init__(self):
+        """
+        Initialize the coalescer.
+        """
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self.started = 0
+        self.joined = 0
+
+    def stream(self, key: Hashable, factory: Callable[[], Iterable[str]]) -> Iterator[str]:
+        """
+        Subscribe to the stream of a key, starting it if none is in flight.
+
+        Args:
+            key: Identity of the request
+            factory: Callable that starts the upstream stream
+
+        Returns:
+            Generator of chunks
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight(factory)
+                self._flights[key] = flight
+                self.started += 1
+            else:
+                self.joined += 1
+            flight.subscribers += 1
+
+        return self._subscribe(key, flight)
+
+    def _subscribe(self, key: Hashable, flight: _Flight) -> Iterator[str]:
+        """
+        Yield the chunks of a flight, pulling from upstream when needed.
+
+        Args:
+            key: Identity of the request
+            flight: Shared flight state
+
+        Returns:
+            Generator of chunks
+        """
+        position = 0
+        try:
+            while True:
+                with self._condition:
+                    while position >= len(flight.chunks) and not flight.done and flight.pulling:
+                        self._condition.wait()
+
+                    if position < len(flight.chunks):
+                        chunk = flight.chunks[position]
+                        position += 1
+                    elif flight.done:
+                        if flight.error is not None:
+                            raise flight.error
+                        return
+                    else:
+                        # Nobody is pulling, so this subscriber fetches the next chunk
+                        flight.pulling = True
+                        chunk = None
+
+                if chunk is not None:
+                    yield chunk
+                    continue
+
+                self._pull(key, flight)
+        finally:
+            self._unsubscribe(key, flight)
+
+    def _pull(self, key: Hashable, flight: _Flight):
+        """
+        Fetch the next upstream chunk into the shared buffer.
+
+        Args:
+            key: Identity of the request
+            flight: Shared flight state
+        """
+        chunk = None
+        error = None
+        finished = False
+        try:
+            if flight.upstream is None:
+                flight.upstream = iter(flight.factory())
+            chunk = next(flight.upstream)
+        except StopIteration:
+            finished = True
+        except Exception as e:
+            error = e
+            finished = True
+
+        with self._condition:
+            if finished:
+                flight.done = True
+                flight.error = error
+                # Release the key so that later callers start a fresh stream
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            else:
+                flight.chunks.append(chunk)
+            flight.pulling = False
+            self._condition.notify_all()
+
+    def _unsubscribe(self, key: Hashable, flight: _Flight):
+        """
+        Drop a subscriber, closing the upstream if nobody is left to read it.
+
+        Args:
+            key: Identity of the request
+            flight: Shared flight state
+        """
+        with self._condition:
+            flight.subscribers -= 1
+            if flight.subscribers > 0 or flight.done:
+                return
+            flight.done = True
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            upstream = flight.upstream
+
+        close = getattr(upstream, 'close', None)
+        if close is not None:
+            close()
+
+    def in_flight(self) -> int:
+        """
+        Get the number of streams currently in flight.
+
+        Returns:
+            Number of in-flight streams
+        """
+        with self._lock:
+            return len(self._flights)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Stream Filter Module
+Incremental filter that removes thinking blocks and reasoning lines from streamed LLM output.
+"""
+
+import re
+from typing import List, Optional
+
+from pattern_matcher import AhoCorasick
+from text_rewriter import TextRewriter
+
+# All possible start tags (full-width and half-width)
+THINK_START_TAGS = ['＜thought>', '<thought>', '＜think>', '<think>', '＜THINK>', '＜Think>']
+# All possible end tags
+THINK_END_TAGS = ['＜/thought>', '</thought>', '＜/think>', '</think>', '＜/THINK>', '＜/Think>']
+
+# Markers of reasoning lines, removed up to the end of the line
+REASONING_LINE_MARKERS = (
+    [word + colon for word in ['思考', '分析', '推理', '思考过程', '分析过程'] for colon in ':：'] +
+    ['让我' + char for char in '思考分析想一推理']
+)
+
+# Prefixes removed from the start of an answer
+ANSWER_PREFIXES = ["回答：", "答：", "我来回答："]
+
+# Particles that make an answer colloquial
+COLLOQUIAL_PARTICLES = ['啊', '呀', '呢', '吧', '嘛']
+
+START_TAG, END_TAG, LINE_MARKER = range(3)
+
+# Collapses runs of newlines and of spaces in one pass
+WHITESPACE_REWRITER = TextRewriter({}, collapse='\n ')
+TRAILING_HOLD = re.compile(r'。?\s*$')
+PREFIX_HOLD_LENGTH = max(len(prefix) for prefix in ANSWER_PREFIXES)
+
+
+class StreamFilter:
+    """
+    Streaming filter over LLM output chunks.
+
+    Tags and markers are found by one Aho-Corasick automaton that sees every
+    character exactly once; plain text between possible tag starts is passed
+    through in bulk. Only the characters that may still be the beginning of a
+    tag are held back, so a tag split across chunks never leaks.
+
+    With clean=True the output also follows the rules of
+    LLMBackend._post_process_answer: reasoning lines are dropped, runs of
+    newlines and spaces are collapsed, the answer is stripped, answer prefixes
+    are removed and a final '。' becomes '呢。' when the answer has no
+    colloquial particle. For that the first few characters and any trailing
+    '。' or whitespace are held until more text or the end of the stream.
+    """
+
+    _matchers = {}
+
+    def __init__(self, clean: bool = False):
+        """
+        Initialize the filter.
+
+        Args:
+            clean: Whether to apply the post-processing rules as well
+        """
+        self.clean = clean
+        self.matcher, self._kinds, self._first_chars = self._compile(clean)
+
+        self._state = 0
+        self._pending = ''
+        self._in_think = False
+        self._skip_line = False
+        self._output: List[str] = []
+
+        # Post-processing state
+        self._head = ''
+        self._prefix_done = False
+        self._started = False
+        self._tail = ''
+        self._seen_particle = False
+
+    @classmethod
+    def _compile(cls, clean: bool):
+        """
+        Compile (once per mode) the automaton over all tags and markers.
+
+        Args:
+            clean: Whether reasoning line markers are matched too
+
+        Returns:
+            Tuple of (automaton, pattern kinds, regex finding possible match starts)
+        """
+        compiled = cls._matchers.get(clean)
+        if compiled is None:
+            kinds = {}
+            for kind, patterns in ((START_TAG, THINK_START_TAGS), (END_TAG, THINK_END_TAGS),
+                                   (LINE_MARKER, REASONING_LINE_MARKERS if clean else [])):
+                for pattern in patterns:
+                    kinds[pattern] = kind
+            matcher = AhoCorasick(kinds)
+            first_chars = re.compile('[' + ''.join(re.escape(char) for char in sorted(matcher.first_chars())) + ']')
+            compiled = (matcher, [kinds[pattern] for pattern in matcher.patterns], first_chars)
+            cls._matchers[clean] = compiled
+        return compiled
+
+    def feed(self, text: str) -> str:
+        """
+        Filter the next chunk of the stream.
+
+        Args:
+            text: Raw chunk
+
+        Returns:
+            Filtered text that is safe to emit (possibly empty)
+        """
+        matcher = self.matcher
+        patterns = matcher.patterns
+        kinds = self._kinds
+        position = 0
+        length = len(text)
+
+        while position < length:
+            if self._state == 0:
+                # Pass plain text through up to the next character that may start a tag
+                found = self._first_chars.search(text, position)
+                end = found.start() if found else length
+                if end > position:
+                    self._release(text[position:end])
+                    position = end
+                    continue
+
+            char = text[position]
+            position += 1
+            self._state = matcher.step(self._state, char)
+            self._pending += char
+
+            match = self._match(matcher.outputs(self._state))
+            if match is not None:
+                self._release(self._pending[:-len(patterns[match])])
+                self._pending = ''
+                self._state = 0
+                kind = kinds[match]
+                if kind == START_TAG:
+                    self._in_think = True
+                elif kind == END_TAG:
+                    self._in_think = False
+                else:
+                    self._skip_line = True
+                continue
+
+            # Release whatever can no longer be part of a tag
+            depth = matcher.depth(self._state)
+            if len(self._pending) > depth:
+                cut = len(self._pending) - depth
+                self._release(self._pending[:cut])
+                self._pending = self._pending[cut:]
+
+        return self._take_output()
+
+    def flush(self) -> str:
+        """
+        End the stream and emit everything still held back.
+
+        Returns:
+            Remaining filtered text
+        """
+        if self._pending:
+            self._release(self._pending)
+            self._pending = ''
+        self._state = 0
+
+        if self.clean:
+            if not self._prefix_done:
+                self._emit_head(self._head, final=True)
+            tail = self._tail.rstrip()
+            self._tail = ''
+            if tail:
+                if tail.endswith('。') and not self._seen_particle:
+                    tail = tail[:-1] + '呢。'
+                self._output.append(tail)
+
+        return self._take_output()
+
+    def filter(self, text: str) -> str:
+        """
+        Filter a complete text.
+
+        Args:
+            text: Complete raw text
+
+        Returns:
+            Filtered text
+        """
+        return self.feed(text) + self.flush()
+
+    def _match(self, outputs) -> Optional[int]:
+        """
+        Pick the pattern that acts in the current mode.
+
+        Args:
+            outputs: Patterns ending at the current state, longest first
+
+        Returns:
+            Pattern index, or None if no pattern acts
+        """
+        for pattern_index in outputs:
+            kind = self._kinds[pattern_index]
+            if self._in_think:
+                if kind == END_TAG:
+                    return pattern_index
+            elif kind == START_TAG or (kind == LINE_MARKER and not self._skip_line):
+                return pattern_index
+        return None
+
+    def _release(self, text: str):
+        """
+        Handle text that is known not to be part of a tag.
+
+        Args:
+            text: Released raw text
+        """
+        if not text or self._in_think:
+            return
+
+        if self._skip_line:
+            newline = text.find('\n')
+            if newline < 0:
+                return
+            self._skip_line = False
+            text = text[newline + 1:]
+            if not text:
+                return
+
+        if self.clean:
+            self._emit_clean(text)
+        else:
+            self._output.append(text)
+
+    def _emit_clean(self, text: str):
+        """
+        Apply the whitespace, prefix and particle rules to released text.
+
+        Args:
+            text: Text with thinking blocks and reasoning lines removed
+        """
+        if not self._prefix_done:
+            self._emit_head(self._head + text, final=False)
+            return
+
+        text = WHITESPACE_REWRITER.rewrite(self._tail + text)
+        self._tail = ''
+
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return
+
+        # Hold a trailing '。' and whitespace until it is known whether the answer ends there
+        hold = TRAILING_HOLD.search(text)
+        self._tail = text[hold.start():]
+        text = text[:hold.start()]
+        if text:
+            self._started = True
+            if not self._seen_particle:
+                self._seen_particle = any(particle in text for particle in COLLOQUIAL_PARTICLES)
+            self._output.append(text)
+
+    def _emit_head(self, head: str, final: bool):
+        """
+        Remove answer prefixes once enough of the answer start is known.
+
+        Args:
+            head: Start of the answer
+            final: Whether the stream has ended
+        """
+        head = head.lstrip()
+        if len(head) < PREFIX_HOLD_LENGTH and not final:
+            self._head = head
+            return
+
+        self._head = ''
+        self._prefix_done = True
+        for prefix in ANSWER_PREFIXES:
+            if head.startswith(prefix):
+                head = head[len(prefix):].lstrip()
+
+        if head:
+            self._emit_clean(head)
+
+    def _take_output(self) -> str:
+        """
+        Collect the text emitted since the last call.
+
+        Returns:
+            Emitted text
+        """
+        output = ''.join(self._output)
+        self._output = []
+        return output
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Text Rewriter Module
+Single-pass text rewriting with a replacement table compiled into one regex, for whole texts and streams.
+"""
+
+import re
+from typing import Dict, Tuple
+
+# Formal expressions and their colloquial replacements
+COLLOQUIAL_REPLACEMENTS = {
+    '是因为': '因为',
+    '因此': '所以',
+    '例如': '比如',
+    '也就是说': '就是说',
+    '此外': '另外',
+    '综上所述': '总之',
+    '需要注意的是': '要注意的是',
+    '可以': '可以啊',
+    '应该': '应该吧',
+    '必须': '一定要'
+}
+
+
+class TextRewriter:
+    """
+    Rewrites text in one pass.
+
+    All replacement keys and the runs of collapsed characters form one
+    alternation regex, longest keys first, so the longest key wins at each
+    position and a replacement is never rewritten again. A callback looks up
+    the replacement of each match.
+    """
+
+    def __init__(self, replacements: Dict[str, str], collapse: str = ''):
+        """
+        Compile the rewriter.
+
+        Args:
+            replacements: Literal keys and their replacements
+            collapse: Characters whose runs are collapsed into a single character
+        """
+        self.replacements = {key: value for key, value in replacements.items() if key}
+        self.collapse = collapse
+
+        # Every alternative starts with a literal, which lets the regex engine skip ahead
+        # to the possible first characters
+        alternatives = [re.escape(key) for key in sorted(self.replacements, key=len, reverse=True)]
+        alternatives += [re.escape(char) * 2 + '+' for char in collapse]
+        self.regex = re.compile('|'.join(alternatives)) if alternatives else None
+
+        # Proper prefixes of the keys: text ending in one of them may still become a longer match
+        self._prefixes = {key[:end] for key in self.replacements for end in range(1, len(key))}
+        self._max_prefix = max((len(prefix) for prefix in self._prefixes), default=0)
+
+    def _replace(self, match) -> str:
+        """
+        Look up the replacement of a match.
+
+        Args:
+            match: Regex match of a key or a run of collapsed characters
+
+        Returns:
+            Replacement text
+        """
+        text = match.group()
+        return self.replacements.get(text, text[0])
+
+    def rewrite(self, text: str) -> str:
+        """
+        Rewrite a complete text.
+
+        Args:
+            text: Text to rewrite
+
+        Returns:
+            Rewritten text
+        """
+        if self.regex is None or not text:
+            return text
+        return self.regex.sub(self._replace, text)
+
+    def stream(self) -> 'RewriteStream':
+        """
+        Start rewriting a stream.
+
+        Returns:
+            Incremental rewriter fed chunk by chunk
+        """
+        return RewriteStream(self)
+
+    def _hold_length(self, text: str) -> int:
+        """
+        Find how much of the end of a text may still change with more text.
+
+        Args:
+            text: Buffered text
+
+        Returns:
+            Length of the longest suffix that is a key prefix or a run of collapsed characters
+        """
+        hold = 0
+        for length in range(min(self._max_prefix, len(text)), 0, -1):
+            if text[-length:] in self._prefixes:
+                hold = length
+                break
+        if text and text[-1] in self.collapse:
+            run = len(text) - len(text.rstrip(text[-1]))
+            hold = max(hold, run)
+        return hold
+
+    def _rewrite_prefix(self, text: str) -> Tuple[str, int]:
+        """
+        Rewrite the part of a buffered text that no later text can change.
+
+        A match starting before the held suffix is final: were a longer key
+        possible there, the rest of the text would be a key prefix and held.
+
+        Args:
+            text: Buffered text
+
+        Returns:
+            Tuple of (rewritten text, length of the consumed input)
+        """
+        safe = len(text) - self._hold_length(text)
+        if self.regex is None:
+            return text[:safe], safe
+
+        pieces = []
+        position = 0
+        for match in self.regex.finditer(text):
+            start, end = match.span()
+            if start >= safe:
+                break
+            pieces.append(text[position:start])
+            pieces.append(self._replace(match))
+            position = end
+        consumed = max(position, safe)
+        pieces.append(text[position:consumed])
+        return ''.join(pieces), consumed
+
+
+class RewriteStream:
+    """
+    Incremental rewriting over stream chunks.
+
+    Only the end of the buffer that may still be part of a match is held
+    back, so the joined output equals rewriting the whole text at once.
+    """
+
+    def __init__(self, rewriter: TextRewriter):
+        """
+        Initialize the stream.
+
+        Args:
+            rewriter: Compiled rewriter
+        """
+        self.rewriter = rewriter
+        self._pending = ''
+
+    def feed(self, chunk: str) -> str:
+        """
+        Rewrite the next chunk of the stream.
+
+        Args:
+            chunk: Raw chunk
+
+        Returns:
+            Rewritten text that is safe to emit (possibly empty)
+        """
+        text = self._pending + chunk
+        output, consumed = self.rewriter._rewrite_prefix(text)
+        self._pending = text[consumed:]
+        return output
+
+    def flush(self) -> str:
+        """
+        End the stream and emit everything still held back.
+
+        Returns:
+            Remaining rewritten text
+        """
+        text = self._pending
+        self._pending = ''
+        return self.rewriter.rewrite(text)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Vector Scorer Module
+Scores every knowledge entry at once with sparse term-by-entry weight matrices (requires NumPy).
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only this backend needs it
+    np = None
+
+from knowledge_index import (
+    KnowledgeIndex, COMMON_QUESTIONS, INTENT_FLAGS,
+    TITLE_WEIGHT, TITLE_EXACT_BONUS, DESCRIPTION_WEIGHT, KEYWORD_WEIGHT,
+    SCENARIO_WEIGHT, INTENT_BONUS, COMMON_QUESTION_BONUS,
+    FIELD_TITLE, FIELD_DESCRIPTION, FIELD_SCENARIOS
+)
+from scorers import RelevanceScorer, common_question_hits
+
+# Field blocks of the weight matrix and the weight applied to their match counts
+FIELD_BLOCK_WEIGHTS = {
+    'title': TITLE_WEIGHT,
+    'title_exact': TITLE_EXACT_BONUS,
+    'description': DESCRIPTION_WEIGHT,
+    'keywords': KEYWORD_WEIGHT,
+    'scenarios': SCENARIO_WEIGHT
+}
+
+
+class SparseBlock:
+    """Compressed sparse rows of match counts for one field, one row per term."""
+
+    def __init__(self, rows: List[Dict[int, float]]):
+        """
+        Build the compressed rows.
+
+        Args:
+            rows: Per-term mapping of entry index to match count
+        """
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for row in rows:
+            for index in sorted(row):
+                indices.append(index)
+                data.append(row[index])
+            indptr.append(len(indices))
+
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=np.float64)
+
+    def row(self, term_id: int) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Get the entry indexes and match counts of a term.
+
+        Args:
+            term_id: Row of the term
+
+        Returns:
+            Tuple of (entry indexes, match counts)
+        """
+        start, end = self.indptr[term_id], self.indptr[term_id + 1]
+        return self.indices[start:end], self.data[start:end]
+
+
+class VectorScorer(RelevanceScorer):
+    """Scores all entries with one sparse matrix-vector product per query."""
+
+    name = 'numpy'
+
+    def __init__(self, max_extra_terms: int = 10000):
+        """
+        Initialize the vectorized scorer.
+
+        Args:
+            max_extra_terms: Maximum number of out-of-vocabulary terms to keep
+        """
+        if np is None:
+            raise ImportError("NumPy is required for the vectorized retrieval backend")
+
+        self.max_extra_terms = max_extra_terms
+
+    def build(self, index: KnowledgeIndex, previous: Optional[RelevanceScorer] = None):
+        """
+        Build the term-by-entry weight matrix from the knowledge index.
+
+        The vocabulary holds every entry keyword and title plus the common question
+        phrases. Query terms outside it are matched through the index on first use
+        and kept in a bounded side table.
+
+        Args:
+            index: Knowledge index providing the precomputed entry features
+            previous: Ignored, rows span every entry
+        """
+        super().build(index)
+        self.num_entries = len(index.features)
+
+        vocabulary = set(COMMON_QUESTIONS)
+        for features in index.features:
+            vocabulary.update(features.keywords)
+            vocabulary.add(features.title)
+        vocabulary.discard('')
+
+        self.vocabulary: Dict[str, int] = {}
+        block_rows: Dict[str, List[Dict[int, float]]] = {name: [] for name in FIELD_BLOCK_WEIGHTS}
+        for term in sorted(vocabulary):
+            self.vocabulary[term] = len(self.vocabulary)
+            for name, row in self._match_term(term).items():
+                block_rows[name].append(row)
+        self.blocks = {name: SparseBlock(rows) for name, rows in block_rows.items()}
+
+        # Out-of-vocabulary term -> (entry indexes, weighted scores)
+        self.extra_terms: Dict[str, Tuple['np.ndarray', 'np.ndarray']] = {}
+
+        # Dense intent columns
+        self.intent_columns = {
+            intent: np.fromiter(
+                (features.has_intent_cue(intent) for features in index.features),
+                dtype=np.float64, count=self.num_entries
+            ) * INTENT_BONUS
+            for intent in INTENT_FLAGS
+        }
+
+    def _match_term(self, term: str) -> Dict[str, Dict[int, float]]:
+        """
+        Count the matches of a term in every field block.
+
+        Args:
+            term: Query term
+
+        Returns:
+            Dict mapping block name to {entry index: match count}
+        """
+        rows: Dict[str, Dict[int, float]] = {name: {} for name in FIELD_BLOCK_WEIGHTS}
+        features = self.index.features
+
+        for index, fields in self.index.candidates(term).items():
+            entry_features = features[index]
+            if fields & FIELD_TITLE and term in entry_features.title:
+                rows['title'][index] = 1.0
+                if term == entry_features.title:
+                    rows['title_exact'][index] = 1.0
+            if fields & FIELD_DESCRIPTION and term in entry_features.description:
+                rows['description'][index] = 1.0
+            if fields & FIELD_SCENARIOS:
+                count = sum(1 for scenario in entry_features.scenarios if term in scenario)
+                if count:
+                    rows['scenarios'][index] = float(count)
+
+        for index in self.index.keyword_postings.get(term, []):
+            rows['keywords'][index] = 1.0
+
+        return rows
+
+    def _extra_term_row(self, term: str) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Get the weighted row of an out-of-vocabulary term, computing it on first use.
+
+        Args:
+            term: Query term
+
+        Returns:
+            Tuple of (entry indexes, weighted scores)
+        """
+        row = self.extra_terms.get(term)
+        if row is None:
+            scores: Dict[int, float] = {}
+            for name, matches in self._match_term(term).items():
+                weight = FIELD_BLOCK_WEIGHTS[name]
+                for index, count in matches.items():
+                    scores[index] = scores.get(index, 0.0) + count * weight
+            row = (
+                np.fromiter(scores.keys(), dtype=np.int64, count=len(scores)),
+                np.fromiter(scores.values(), dtype=np.float64, count=len(scores))
+            )
+            if len(self.extra_terms) >= self.max_extra_terms:
+                self.extra_terms.clear()
+            self.extra_terms[term] = row
+        return row
+
+    def score(self, query: Dict) -> 'np.ndarray':
+        """
+        Score every entry for a processed query.
+
+        Args:
+            query: Processed query dictionary
+
+        Returns:
+            Array of relevance scores indexed by entry position
+        """
+        index_parts = []
+        weight_parts = []
+
+        # Sparse query vector: term -> occurrences among the query keywords
+        for term, count in Counter(query.get('keywords', [])).items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                indices, weights = self._extra_term_row(term)
+                if len(indices):
+                    index_parts.append(indices)
+                    weight_parts.append(weights * count)
+                continue
+
+            for name, block in self.blocks.items():
+                indices, counts = block.row(term_id)
+                if len(indices):
+                    index_parts.append(indices)
+                    weight_parts.append(counts * (FIELD_BLOCK_WEIGHTS[name] * count))
+
+        # Common question boosts
+        hits = common_question_hits(self.index, query)
+        if hits:
+            index_parts.append(np.asarray(hits, dtype=np.int64))
+            weight_parts.append(np.full(len(hits), COMMON_QUESTION_BONUS))
+
+        if index_parts:
+            scores = np.bincount(
+                np.concatenate(index_parts),
+                weights=np.concatenate(weight_parts),
+                minlength=self.num_entries
+            )
+        else:
+            scores = np.zeros(self.num_entries, dtype=np.float64)
+
+        # Intent bonus
+        intent_column = self.intent_columns.get(query.get('intent', ''))
+        if intent_column is not None:
+            scores += intent_column
+
+        return scores
+
+    def rank(self, query: Dict, top_n: int = 3) -> List[int]:
+        """
+        Get the positions of the top N entries with a positive score.
+
+        Ties are broken by knowledge base order, like the index backend.
+
+        Args:
+            query: Processed query dictionary
+            top_n: Number of top relevant entries to return
+
+        Returns:
+            Entry positions ordered by descending score
+        """
+        scores = self.score(query)
+        if top_n <= 0 or not self.num_entries:
+            return []
+
+        if top_n < self.num_entries:
+            partition = np.argpartition(-scores, top_n - 1)[:top_n]
+            threshold = max(scores[partition].min(), 0.0)
+        else:
+            threshold = 0.0
+
+        candidates = np.flatnonzero(scores >= threshold) if threshold > 0 else np.flatnonzero(scores > 0)
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order[:top_n]].tolist()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Stub LLM Server
+Local HTTP server speaking the OpenAI chat-completions wire format, for tests and benchmarks.
+"""
+
+import json
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+
+def default_reply(messages: List[Dict]) -> str:
+    """
+    Build a deterministic reply from the last user message.
+
+    Args:
+        messages: Chat completion messages
+
+    Returns:
+        Reply text
+    """
+    question = next((m['content'] for m in reversed(messages) if m['role'] == 'user'), '')
+    return f"关于“{question[:20]}”，这是一个测试回答。"
+
+
+class StubLLMServer:
+    """
+    Threaded stub of the /v1/chat/completions endpoint.
+
+    Replies are produced by a callback and streamed as server-sent events in
+    chunks of chunk_size characters. The server records the peak number of
+    in-flight requests and the client ports it saw, so tests can check
+    concurrency limits and connection reuse.
+    """
+
+    def __init__(self, reply: Callable[[List[Dict]], str] = default_reply, delay: float = 0.0,
+                 chunk_size: int = 4, chunk_delay: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        """
+        Initialize the stub server.
+
+        Args:
+            reply: Callback mapping request messages to the reply text
+            delay: Seconds to wait before answering
+            chunk_size: Characters per streamed chunk
+            chunk_delay: Seconds to wait between streamed chunks
+            host: Host to bind
+            port: Port to bind (0 picks a free port)
+        """
+        self.reply = reply
+        self.delay = delay
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+
+        self.request_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.client_ports = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to configure as OPENAI_API_BASE."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _make_handler(self):
+        """
+        Create the request handler class bound to this server.
+
+        Returns:
+            BaseHTTPRequestHandler subclass
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                # Headers and body are written separately; avoid Nagle/delayed-ACK stalls
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client went away, e.g. a closed stream
+                    pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if not self.path.endswith('/chat/completions'):
+                    self.send_error(404)
+                    return
+
+                request = json.loads(body or b'{}')
+                with server._lock:
+                    server.request_count += 1
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    server.client_ports.add(self.client_address[1])
+
+                try:
+                    if server.delay:
+                        time.sleep(server.delay)
+                    text = server.reply(request.get('messages', []))
+                    if request.get('stream'):
+                        self._send_stream(request, text)
+                    else:
+                        self._send_completion(request, text)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _send_completion(self, request, text):
+                payload = json.dumps({
+                    'id': 'chatcmpl-stub',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': request.get('model', 'stub'),
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': text},
+                        'finish_reason': 'stop'
+                    }],
+                    'usage': {'prompt_tokens': 0, 'completion_tokens': len(text), 'total_tokens': len(text)}
+                }, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_stream(self, request, text):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+                for start in range(0, len(text), server.chunk_size):
+                    self._write_event({
+                        'id': 'chatcmpl-stub',
+                        'object': 'chat.completion.chunk',
+                        'created': int(time.time()),
+                        'model': request.get('model', 'stub'),
+                        'choices': [{
+                            'index': 0,
+                            'delta': {'content': text[start:start + server.chunk_size]},
+                            'finish_reason': None
+                        }]
+                    })
+                    if server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+                self._write_chunk(b'data: [DONE]\n\n')
+                self._write_chunk(b'')
+
+            def _write_event(self, event):
+                data = json.dumps(event, ensure_ascii=False)
+                self._write_chunk(f"data: {data}\n\n".encode('utf-8'))
+
+            def _write_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self):
+        """
+        Serve requests in a daemon thread.
+        """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='stub-llm', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Shut the server down.
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    stub = StubLLMServer(port=port)
+    print(f"Stub LLM server running at {stub.base_url}")
+    stub.httpd.serve_forever()
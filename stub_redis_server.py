@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Stub Redis Server
+Local server speaking the Redis protocol with the commands used by the session store, for tests.
+"""
+
+import socketserver
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class StubRedisServer:
+    """
+    Threaded in-memory stand-in for a Redis server.
+
+    Supports strings with expiry, sorted sets and the connection commands
+    RedisSessionStore and RespClient send. Expired keys are dropped lazily
+    when they are accessed, as Redis does.
+    """
+
+    def __init__(self, password: Optional[str] = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        Initialize the stub server.
+
+        Args:
+            password: Password required by AUTH, if any
+            host: Host to bind
+            port: Port to bind (0 picks a free port)
+        """
+        self.password = password
+        self.command_count = 0
+        self._databases: Dict[int, Dict[str, list]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        self.server = socketserver.ThreadingTCPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        """redis:// URL of the server."""
+        host, port = self.server.server_address[:2]
+        auth = f":{self.password}@" if self.password else ''
+        return f"redis://{auth}{host}:{port}/0"
+
+    def _make_handler(self):
+        """
+        Create the request handler class bound to this server.
+
+        Returns:
+            StreamRequestHandler subclass
+        """
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+
+            def handle(self):
+                state = {'db': 0, 'authenticated': server.password is None}
+                try:
+                    while True:
+                        command = self._read_command()
+                        if command is None:
+                            return
+                        self.wfile.write(server._execute(state, command))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _read_command(self):
+                line = self.rfile.readline()
+                if not line:
+                    return None
+                count = int(line[1:-2])
+                args = []
+                for _ in range(count):
+                    length = int(self.rfile.readline()[1:-2])
+                    args.append(self.rfile.read(length + 2)[:-2].decode('utf-8'))
+                return args
+
+        return Handler
+
+    def _execute(self, state: Dict, command: List[str]) -> bytes:
+        """
+        Execute one command.
+
+        Args:
+            state: Connection state (selected database, authentication)
+            command: Command name and arguments
+
+        Returns:
+            Encoded reply
+        """
+        name, args = command[0].upper(), command[1:]
+        with self._lock:
+            self.command_count += 1
+            if name == 'AUTH':
+                if args[-1] != self.password:
+                    return b'-WRONGPASS invalid password\r\n'
+                state['authenticated'] = True
+                return b'+OK\r\n'
+            if not state['authenticated']:
+                return b'-NOAUTH Authentication required.\r\n'
+            if name == 'SELECT':
+                state['db'] = int(args[0])
+                return b'+OK\r\n'
+
+            handler = getattr(self, '_cmd_' + name.lower(), None)
+            if handler is None:
+                return _encode_error(f"ERR unknown command '{name}'")
+            db = self._databases.setdefault(state['db'], {})
+            try:
+                return _encode(handler(db, args))
+            except (IndexError, ValueError) as e:
+                return _encode_error(f"ERR {e or 'wrong number of arguments'}")
+
+    @staticmethod
+    def _lookup(db: Dict[str, list], key: str, kind: str) -> Optional[list]:
+        """
+        Get a live entry, dropping it if expired.
+
+        Args:
+            db: Database
+            key: Key
+            kind: Expected entry kind ('string' or 'zset')
+
+        Returns:
+            Entry [kind, value, expires_at] or None
+        """
+        entry = db.get(key)
+        if entry is None:
+            return None
+        if entry[2] is not None and entry[2] <= time.monotonic():
+            del db[key]
+            return None
+        if entry[0] != kind:
+            raise ValueError('WRONGTYPE Operation against a key holding the wrong kind of value')
+        return entry
+
+    def _cmd_ping(self, db, args):
+        return _Status('PONG')
+
+    def _cmd_flushdb(self, db, args):
+        db.clear()
+        return _Status('OK')
+
+    def _cmd_get(self, db, args):
+        entry = self._lookup(db, args[0], 'string')
+        return entry[1] if entry else None
+
+    def _cmd_set(self, db, args):
+        expires_at = None
+        if len(args) > 2 and args[2].upper() == 'EX':
+            expires_at = time.monotonic() + int(args[3])
+        db[args[0]] = ['string', args[1], expires_at]
+        return _Status('OK')
+
+    def _cmd_del(self, db, args):
+        deleted = 0
+        for key in args:
+            if key in db and self._lookup(db, key, db[key][0]) is not None:
+                del db[key]
+                deleted += 1
+        return deleted
+
+    def _cmd_exists(self, db, args):
+        return sum(1 for key in args if key in db and self._lookup(db, key, db[key][0]) is not None)
+
+    def _cmd_expire(self, db, args):
+        key = args[0]
+        if key not in db or self._lookup(db, key, db[key][0]) is None:
+            return 0
+        db[key][2] = time.monotonic() + int(args[1])
+        return 1
+
+    def _cmd_zadd(self, db, args):
+        key, args = args[0], list(args[1:])
+        only_existing = bool(args) and args[0].upper() == 'XX'
+        if only_existing:
+            args = args[1:]
+        entry = self._lookup(db, key, 'zset')
+        if entry is None:
+            if only_existing:
+                return 0
+            entry = db[key] = ['zset', {}, None]
+        added = 0
+        for i in range(0, len(args), 2):
+            score, member = float(args[i]), args[i + 1]
+            if member not in entry[1]:
+                if only_existing:
+                    continue
+                added += 1
+            entry[1][member] = score
+        return added
+
+    def _cmd_zrem(self, db, args):
+        entry = self._lookup(db, args[0], 'zset')
+        if entry is None:
+            return 0
+        removed = sum(1 for member in args[1:] if entry[1].pop(member, None) is not None)
+        if not entry[1]:
+            del db[args[0]]
+        return removed
+
+    def _cmd_zcard(self, db, args):
+        entry = self._lookup(db, args[0], 'zset')
+        return len(entry[1]) if entry else 0
+
+    def _cmd_zrange(self, db, args):
+        entry = self._lookup(db, args[0], 'zset')
+        if entry is None:
+            return []
+        members = [member for member, _ in sorted(entry[1].items(), key=lambda item: (item[1], item[0]))]
+        start, stop = int(args[1]), int(args[2])
+        stop = len(members) + stop if stop < 0 else stop
+        return members[start:stop + 1]
+
+    def _cmd_zremrangebyscore(self, db, args):
+        entry = self._lookup(db, args[0], 'zset')
+        if entry is None:
+            return 0
+        low, high = float(args[1]), float(args[2])
+        removed = [member for member, score in entry[1].items() if low <= score <= high]
+        for member in removed:
+            del entry[1][member]
+        if not entry[1]:
+            del db[args[0]]
+        return len(removed)
+
+    def start(self):
+        """
+        Serve connections in a daemon thread.
+        """
+        self._thread = threading.Thread(target=self.server.serve_forever, name='stub-redis', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Shut the server down.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+class _Status(str):
+    """Simple string reply."""
+
+
+def _encode(value) -> bytes:
+    """
+    Encode a reply value.
+
+    Args:
+        value: None, int, str, _Status or list
+
+    Returns:
+        Encoded reply
+    """
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, _Status):
+        return b'+%s\r\n' % value.encode('utf-8')
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, str):
+        data = value.encode('utf-8')
+        return b'$%d\r\n%s\r\n' % (len(data), data)
+    return b'*%d\r\n' % len(value) + b''.join(_encode(item) for item in value)
+
+
+def _encode_error(message: str) -> bytes:
+    """
+    Encode an error reply.
+
+    Args:
+        message: Error message
+
+    Returns:
+        Encoded reply
+    """
+    return b'-%s\r\n' % message.encode('utf-8')
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 6380
+    stub = StubRedisServer(port=port)
+    print(f"Stub Redis server running at {stub.url}")
+    stub.server.serve_forever()
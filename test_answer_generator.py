@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for rendered answers in the answer generator
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from answer_generator import AnswerGenerator
+
+INTENTS = ['why', 'what', 'when', 'how', 'where', 'unknown']
+
+
+class TestAnswerGenerator:
+    """
+    Test class for the answer generator
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        self.knowledge_base_path = os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
+        with open(self.knowledge_base_path, 'r', encoding='utf-8') as f:
+            self.knowledge_base = json.load(f)
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    @staticmethod
+    def render_directly(generator: AnswerGenerator, entry, intent: str) -> str:
+        query = {'intent': intent}
+        if intent in generator.intent_templates:
+            answer = generator._generate_intent_based_answer(entry, intent, query)
+        else:
+            answer = generator._generate_generic_answer(entry, query)
+        return generator._make_colloquial(answer)
+
+    def test_rendering(self):
+        generator = AnswerGenerator()
+        entries = self.knowledge_base['data']
+        mismatches = [
+            (entry['id'], intent) for entry in entries for intent in INTENTS
+            if generator.generate_answer([entry], {'intent': intent}) != self.render_directly(generator, entry, intent)
+        ]
+        self.check("Rendered answers match direct rendering", not mismatches, str(mismatches[:3]))
+
+        rendered = len(generator._rendered_answers)
+        for entry in entries:
+            generator.generate_answer([entry], {'intent': 'why'})
+        self.check("Each (entry, intent) is rendered once", len(generator._rendered_answers) == rendered)
+        generator.generate_answer([entries[0]], {'intent': 'other'})
+        self.check("Intents without a template share one rendering",
+                   len(generator._rendered_answers) == rendered == len(entries) * 6)
+
+    def test_bounded(self):
+        generator = AnswerGenerator(max_rendered=10)
+        entries = self.knowledge_base['data']
+        for entry in entries:
+            generator.generate_answer([entry], {'intent': 'what'})
+        self.check("Rendered answers are bounded", len(generator._rendered_answers) == 10,
+                   str(len(generator._rendered_answers)))
+        self.check("Least recently used answers are dropped",
+                   list(generator._rendered_answers) == [(entry['id'], 'what') for entry in entries[-10:]])
+
+    def test_edited_entry(self):
+        generator = AnswerGenerator()
+        entry = dict(self.knowledge_base['data'][0])
+        before = generator.generate_answer([entry], {'intent': 'what'})
+        generation = generator.generation
+        generator.clear_rendered_answers()
+        entry['description'] = '这是改过的描述。'
+        after = generator.generate_answer([entry], {'intent': 'what'})
+        self.check("Edited entries are rendered again after a clear", before != after and '改过的描述' in after, after)
+
+        generator.clear_rendered_answers()
+        generator.generate_answer([self.knowledge_base['data'][0]], {'intent': 'what'}, generation=generation)
+        self.check("Answers rendered before a clear are not stored", not generator._rendered_answers)
+
+    def test_context_prefix(self):
+        generator = AnswerGenerator()
+        entry = self.knowledge_base['data'][0]
+        context = [{'role': 'user', 'content': '那福字呢'}, {'role': 'system', 'content': '...'}]
+        plain = generator.generate_answer([entry], {'intent': 'what'})
+        with_context = generator.generate_answer([entry], {'intent': 'what', 'context_aware': True}, context)
+        self.check("Context prefix is added per request",
+                   with_context == f"你问的关于福字呢的问题，{plain}" and
+                   generator.generate_answer([entry], {'intent': 'what'}) == plain, with_context)
+
+    def test_reload(self):
+        from rag_controller import RAGController
+        os.environ.pop('OPENAI_API_KEY', None)
+
+        workdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(workdir, 'kb.json')
+            shutil.copy(self.knowledge_base_path, path)
+            controller = RAGController(path)
+            before, _ = controller.process_query("守岁是干啥的？")
+
+            knowledge_base = json.loads(json.dumps(self.knowledge_base))
+            for entry in knowledge_base['data']:
+                if entry['id'] == 'shou-sui':
+                    entry['description'] = '守岁是除夕夜一家人熬夜等新年的习俗。'
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(knowledge_base, f, ensure_ascii=False)
+            controller.reload_knowledge_base()
+
+            after, _ = controller.process_query("守岁是干啥的？")
+            self.check("Reloads serve the edited answer", after != before and '一家人熬夜' in after, after)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run_tests(self):
+        """
+        Run answer generator tests
+        """
+        print("===========================================")
+        print("Answer Generator Test")
+        print("===========================================")
+
+        self.test_rendering()
+        self.test_bounded()
+        self.test_edited_entry()
+        self.test_context_prefix()
+        self.test_reload()
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestAnswerGenerator()
+    sys.exit(0 if test.run_tests() else 1)
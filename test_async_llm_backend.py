@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the async LLM backend against a local stub server
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from stub_llm_server import StubLLMServer
+
+
+def stub_reply(messages):
+    """Reply with thinking blocks the backend has to strip."""
+    question = messages[-1]['content']
+    if '慢' in question:
+        time.sleep(2.0)
+    return "<think>想一想</think>贴福字是春节的传统习俗。"
+
+
+class TestAsyncLLMBackend:
+    """
+    Test class for the async LLM backend
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        self.stub = StubLLMServer(reply=stub_reply, chunk_size=3, chunk_delay=0.01)
+        self.stub.start()
+
+        # Point the backend at the stub server, with a throwaway answer cache
+        os.environ['OPENAI_API_KEY'] = 'test-key'
+        os.environ['OPENAI_API_BASE'] = self.stub.base_url
+        os.environ['LLM_CACHE_PATH'] = ':memory:'
+
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    async def test_answer_and_stream(self):
+        from async_llm_backend import AsyncLLMBackend
+
+        backend = AsyncLLMBackend(max_concurrency=4, timeout=5.0)
+        backend.answer_cache = None
+        ports_before = len(self.stub.client_ports)
+
+        answer = await backend.generate_answer("为什么要贴福字？")
+        self.check("Non-streaming answer", answer == "贴福字是春节的传统习俗呢。", repr(answer))
+
+        for _ in range(3):
+            await backend.generate_answer("守岁是干啥的？")
+        new_ports = len(self.stub.client_ports) - ports_before
+        self.check("Keep-alive connection reuse", new_ports == 1, f"{new_ports} connection(s) for 4 sequential calls")
+
+        # Tags are split across the 3-character chunks of the stub
+        chunks = [chunk async for chunk in backend.generate_stream("为什么要贴福字？")]
+        streamed = ''.join(chunks)
+        self.check("Streaming answer", streamed == "贴福字是春节的传统习俗呢。", f"{repr(streamed)} in {len(chunks)} chunks")
+
+        self.check("Monitoring counts calls", backend.get_monitoring_stats()['total_calls'] == 5)
+        await backend.aclose()
+
+    async def test_bounded_concurrency(self):
+        from async_llm_backend import AsyncLLMBackend
+
+        backend = AsyncLLMBackend(max_concurrency=2, timeout=5.0)
+        backend.answer_cache = None
+        self.stub.delay = 0.2
+        self.stub.max_in_flight = 0
+
+        start = time.time()
+        answers = await asyncio.gather(*[backend.generate_answer(f"问题{i}") for i in range(6)])
+        elapsed = time.time() - start
+
+        self.stub.delay = 0.0
+        self.check("Bounded concurrency", self.stub.max_in_flight == 2,
+                   f"peak {self.stub.max_in_flight} in flight, {elapsed:.2f}s for 6 calls")
+        self.check("All concurrent calls answered", all(a == "贴福字是春节的传统习俗呢。" for a in answers))
+        await backend.aclose()
+
+    async def test_timeout(self):
+        from async_llm_backend import AsyncLLMBackend
+
+        backend = AsyncLLMBackend(timeout=0.5, max_retries=0)
+
+        start = time.time()
+        answer = await backend.generate_answer("慢一点的问题")
+        elapsed = time.time() - start
+        self.check("Call timeout", answer == "抱歉，我暂时无法回答这个问题。" and elapsed < 1.5, f"{elapsed:.2f}s")
+
+        start = time.time()
+        chunks = [chunk async for chunk in backend.generate_stream("慢一点的问题")]
+        elapsed = time.time() - start
+        self.check("Stream timeout", chunks == ["抱歉，我暂时无法回答这个问题。"] and elapsed < 1.5, f"{elapsed:.2f}s")
+        await backend.aclose()
+
+    async def test_answer_cache(self):
+        from async_llm_backend import AsyncLLMBackend
+
+        from llm_cache import LLMAnswerCache
+
+        backend = AsyncLLMBackend(timeout=5.0)
+        backend.answer_cache = LLMAnswerCache(':memory:', similarity_threshold=0.6)
+        requests_before = self.stub.request_count
+
+        first = await backend.generate_answer("圣诞节在中国有什么习俗？")
+        second = await backend.generate_answer("圣诞节在中国有什么习俗?")
+        replayed = ''.join([chunk async for chunk in backend.generate_stream(" 圣诞节在中国有什么习俗？")])
+        requests = self.stub.request_count - requests_before
+        self.check("Answer cache hit", first == second == replayed and requests == 1,
+                   f"{requests} upstream call(s) for 3 identical questions")
+
+        similar = await backend.generate_answer("圣诞节在中国都有什么习俗？")
+        self.check("Near-duplicate hit", similar == first and self.stub.request_count - requests_before == 1,
+                   str(backend.get_cache_stats()))
+
+        context = [{'role': 'user', 'content': '你好'}, {'role': 'system', 'content': '你好呀'}]
+        await backend.generate_answer("圣诞节在中国有什么习俗？", context)
+        self.check("Context is part of the key", self.stub.request_count - requests_before == 2)
+        await backend.aclose()
+
+    def run_tests(self):
+        """
+        Run async backend tests
+        """
+        print("===========================================")
+        print("Async LLM Backend Test")
+        print("===========================================")
+        print(f"Stub server: {self.stub.base_url}")
+        print("===========================================")
+
+        try:
+            asyncio.run(self.test_answer_and_stream())
+            asyncio.run(self.test_bounded_concurrency())
+            asyncio.run(self.test_timeout())
+            asyncio.run(self.test_answer_cache())
+        finally:
+            self.stub.stop()
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestAsyncLLMBackend()
+    sys.exit(0 if test.run_tests() else 1)
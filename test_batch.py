@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for batch retrieval and the batch query API
+"""
+
+import os
+import sys
+import tempfile
+
+# Add src directory and benchmarks to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+
+from knowledge_retriever import KnowledgeRetriever
+from question_processor import QuestionProcessor
+from stub_llm_server import StubLLMServer
+from synthetic_corpus import generate_corpus, generate_queries, write_corpus
+
+
+class TestBatch:
+    """
+    Test class for batch processing
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        self.knowledge_base_path = os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
+        self.stub = StubLLMServer(delay=0.05)
+        self.stub.start()
+
+        os.environ['OPENAI_API_KEY'] = 'test-key'
+        os.environ['OPENAI_API_BASE'] = self.stub.base_url
+        os.environ['LLM_CACHE_PATH'] = ':memory:'
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    def test_retrieve_batch_parity(self):
+        corpus = generate_corpus(5000)
+        processor = QuestionProcessor()
+        queries = [processor.process_question(question) for question, _ in generate_queries(corpus, 500)]
+
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, 'kb.json')
+            write_corpus(corpus, path)
+            for scorer in ['weighted', 'bm25']:
+                retriever = KnowledgeRetriever(path, scorer=scorer)
+                single = [[entry['id'] for entry in retriever.retrieve(query)] for query in queries]
+                batch = [[entry['id'] for entry in entries] for entries in retriever.retrieve_batch(queries)]
+                self.check(f"retrieve_batch matches retrieve ({scorer})", single == batch,
+                           f"{sum(1 for a, b in zip(single, batch) if a != b)} mismatches")
+
+    def test_process_batch(self):
+        from rag_controller import RAGController
+        controller = RAGController(self.knowledge_base_path)
+        controller.llm_backend.answer_cache = None
+
+        misses = [f"推荐第{i}部电影" for i in range(6)]
+        questions = ["为啥要倒贴福？", misses[0], "守岁是干啥的？", "为啥要倒贴福？"] + misses[1:] + [misses[0]]
+        requests_before = self.stub.request_count
+
+        results = list(controller.process_batch(questions, max_workers=3))
+        expected = {question: controller.process_query(question)[0] for question in ["为啥要倒贴福？", "守岁是干啥的？"]}
+        controller.clear_dialogue_history()
+
+        self.check("Results are in question order",
+                   [result['index'] for result in results] == list(range(len(questions))) and
+                   [result['question'] for result in results] == questions)
+        self.check("Knowledge base answers match process_query",
+                   all(result['answer'] == expected[result['question']]
+                       for result in results if result['source'] == 'knowledge_base'))
+        self.check("Duplicate questions call the LLM once", self.stub.request_count - requests_before == len(misses),
+                   f"{self.stub.request_count - requests_before} call(s) for {len(misses)} distinct misses")
+        self.check("LLM calls are bounded by the worker pool", 1 < self.stub.max_in_flight <= 3,
+                   f"peak {self.stub.max_in_flight} in flight")
+        self.check("Dialogue history is untouched", controller.get_dialogue_history() == [])
+
+        # Stopping early must not wait for the remaining LLM calls
+        batch = controller.process_batch([f"推荐第{i}首歌" for i in range(20)], max_workers=2)
+        next(batch)
+        batch.close()
+        self.check("Closing the batch drops queued LLM calls", self.stub.request_count - requests_before < len(misses) + 20)
+
+    def run_tests(self):
+        """
+        Run batch tests
+        """
+        print("===========================================")
+        print("Batch Test")
+        print("===========================================")
+
+        try:
+            self.test_retrieve_batch_parity()
+            self.test_process_batch()
+        finally:
+            self.stub.stop()
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestBatch()
+    sys.exit(0 if test.run_tests() else 1)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for dense retrieval and its memory-mapped vector file
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from dense_retriever import DenseScorer
+from knowledge_index import KnowledgeIndex
+from question_processor import QuestionProcessor
+
+# Question templates asked about every title and keyword of the knowledge base
+QUESTION_TEMPLATES = ['{term}是什么？', '为什么要{term}？', '{term}在什么时候？', '怎么{term}？']
+
+
+class TestDenseRetriever:
+    """
+    Test class for dense retrieval
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        self.workdir = tempfile.mkdtemp()
+        self.vector_path = os.path.join(self.workdir, 'vectors.npy')
+        knowledge_base_path = os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
+        with open(knowledge_base_path, 'r', encoding='utf-8') as f:
+            self.entries = json.load(f)['data']
+        self.index_a = KnowledgeIndex(self.entries)
+        # Another build: the same entries in reverse order
+        self.index_b = KnowledgeIndex(self.entries[::-1])
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    @staticmethod
+    def build(index: KnowledgeIndex, vector_path=None, **options) -> DenseScorer:
+        scorer = DenseScorer(vector_path=vector_path, **options)
+        scorer.build(index)
+        return scorer
+
+    def test_search(self):
+        processor = QuestionProcessor()
+        terms = [entry['title'] for entry in self.entries] + [keyword for entry in self.entries
+                                                              for keyword in entry['keywords']]
+        queries = [processor.process_question(template.format(term=term))
+                   for term in terms for template in QUESTION_TEMPLATES]
+
+        brute = self.build(self.index_a)
+        exact = [brute.search(query, 3) for query in queries]
+        wrong = []
+        for query, results in zip(queries, exact):
+            similarities = np.asarray(brute.vectors) @ brute.encode_query(query)
+            expected = [position for position in np.argsort(-similarities, kind='stable')[:3]
+                        if similarities[position] >= brute.min_similarity]
+            if [position for position, _ in results] != expected:
+                wrong.append(query['keywords'])
+        self.check("Brute-force search returns the most similar entries", not wrong, str(wrong[:3]))
+
+        recalls = []
+        for num_probes in (1, 3):
+            scorer = self.build(self.index_a, use_ivf=True, num_probes=num_probes)
+            found = sum(len({position for position, _ in scorer.search(query, 3)}
+                            & {position for position, _ in results})
+                        for query, results in zip(queries, exact))
+            recalls.append(found / max(1, sum(len(results) for results in exact)))
+        self.check("IVF recall grows with the probed cells", recalls[0] < recalls[1] and recalls[1] >= 0.85,
+                   str([round(recall, 3) for recall in recalls]))
+
+        # Entries with equal similarity may come in another order
+        scorer = self.build(self.index_a, use_ivf=True, num_probes=len(self.entries))
+        self.check("Probing every cell equals brute force",
+                   all(np.allclose([similarity for _, similarity in scorer.search(query, 3)],
+                                   [similarity for _, similarity in results])
+                       for query, results in zip(queries, exact)))
+
+    def test_vector_file(self):
+        expected = np.asarray(self.build(self.index_a).vectors)
+        first = self.build(self.index_a, self.vector_path)
+        mtime = os.stat(self.vector_path).st_mtime_ns
+        second = self.build(self.index_a, self.vector_path)
+        self.check("Matching vector files are mapped, not rebuilt",
+                   os.stat(self.vector_path).st_mtime_ns == mtime and isinstance(second.vectors, np.memmap)
+                   and np.array_equal(second.vectors, expected) and np.array_equal(first.vectors, expected))
+
+        # Vectors of another build next to this build's meta, as a reader may see between the two renames
+        other_path = os.path.join(self.workdir, 'other.npy')
+        self.build(self.index_b, other_path)
+        shutil.copy(other_path, self.vector_path)
+        rebuilt = self.build(self.index_a, self.vector_path)
+        self.check("A vector file from another build is rejected", np.array_equal(rebuilt.vectors, expected))
+
+    def test_concurrent_builders(self):
+        path = os.path.join(self.workdir, 'shared.npy')
+        errors = []
+
+        def builder(index):
+            try:
+                self.build(index, path)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=builder, args=(index,))
+                   for index in [self.index_a, self.index_b] * 3]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        expected = {name: np.asarray(self.build(index).vectors)
+                    for name, index in (('a', self.index_a), ('b', self.index_b))}
+        loaded = {name: self.build(index, path).vectors
+                  for name, index in (('a', self.index_a), ('b', self.index_b))}
+        leftovers = [name for name in os.listdir(self.workdir) if '.tmp.' in name]
+        self.check("Concurrent builders leave a consistent vector file",
+                   not errors and not leftovers and all(np.array_equal(loaded[name], expected[name]) for name in expected),
+                   f"{errors[:1]} {leftovers}")
+
+    def run_tests(self):
+        """
+        Run dense retrieval tests
+        """
+        print("===========================================")
+        print("Dense Retrieval Test")
+        print("===========================================")
+
+        try:
+            self.test_search()
+            self.test_vector_file()
+            self.test_concurrent_builders()
+        finally:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestDenseRetriever()
+    sys.exit(0 if test.run_tests() else 1)
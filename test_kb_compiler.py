@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the compiled knowledge base format
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from kb_compiler import CompiledKnowledgeBase, MappedFeatures, compile_knowledge_base
+from knowledge_index import EntryFeatures
+from knowledge_retriever import KnowledgeRetriever
+from question_processor import QuestionProcessor
+from segmenter import Segmenter
+
+# Question templates asked about every title and keyword of the knowledge base
+QUESTION_TEMPLATES = ['{term}是什么？', '为什么要{term}？', '{term}在什么时候？', '怎么{term}？', '在哪里{term}？']
+
+
+class TestKBCompiler:
+    """
+    Test class for the compiled knowledge base
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        self.workdir = tempfile.mkdtemp()
+        self.json_path = os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
+        self.compiled_path = os.path.join(self.workdir, 'kb.kbc')
+        compile_knowledge_base(self.json_path, self.compiled_path)
+        self.from_json = KnowledgeRetriever(self.json_path)
+        self.entries = self.from_json.knowledge_base['data']
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    def test_retrieval_parity(self):
+        processor = QuestionProcessor()
+        terms = [entry['title'] for entry in self.entries] + [keyword for entry in self.entries
+                                                              for keyword in entry['keywords']]
+        queries = [processor.process_question(template.format(term=term))
+                   for term in terms for template in QUESTION_TEMPLATES]
+        for scorer in ('weighted', 'bm25'):
+            from_json = KnowledgeRetriever(self.json_path, scorer)
+            compiled = KnowledgeRetriever(self.compiled_path, scorer)
+            wrong = [query['original_question'] for query in queries
+                     if compiled.retrieve(query, 10) != from_json.retrieve(query, 10)]
+            self.check(f"Compiled retrieval equals JSON retrieval ({scorer})", not wrong, str(wrong[:3]))
+
+    def test_lookups(self):
+        compiled = KnowledgeRetriever(self.compiled_path)
+        ids = [entry['id'] for entry in self.entries] + ['missing']
+        self.check("Compiled id and related lookups equal JSON lookups",
+                   all(compiled.get_entry(entry_id) == self.from_json.get_entry(entry_id)
+                       and compiled.get_related_entries(entry_id, None, 2)
+                       == self.from_json.get_related_entries(entry_id, None, 2) for entry_id in ids))
+
+    def test_stored_features(self):
+        compiled = KnowledgeRetriever(self.compiled_path)
+        processor = QuestionProcessor()
+        for term in [entry['title'] for entry in self.entries]:
+            compiled.scorer.rank(processor.process_question(f"为什么要{term}？"), 10)
+        self.check("Scoring decodes no entries", not compiled.knowledge_base['data']._cache,
+                   f"{len(compiled.knowledge_base['data']._cache)} entries decoded")
+
+        slots = [slot for slot in EntryFeatures.__slots__ if slot != 'ngrams']
+        mismatches = []
+        for entry, stored in zip(self.entries, compiled.index.features):
+            expected = EntryFeatures(entry)
+            if (any(getattr(stored, slot) != getattr(expected, slot) for slot in slots)
+                    or stored.ngrams != expected.ngrams):
+                mismatches.append(entry['id'])
+        self.check("Stored features equal computed features", not mismatches, str(mismatches[:3]))
+
+    def test_concurrent_compilers(self):
+        errors = []
+
+        def compiler():
+            try:
+                compile_knowledge_base(self.json_path, self.compiled_path)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=compiler) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        leftovers = [name for name in os.listdir(self.workdir) if name.endswith('.tmp')]
+        compiled = KnowledgeRetriever(self.compiled_path)
+        self.check("Concurrent compilers leave one complete file",
+                   not errors and not leftovers and len(compiled.knowledge_base['data']) == len(self.entries),
+                   f"{errors[:1]} {leftovers}")
+
+    def test_reload(self):
+        path = os.path.join(self.workdir, 'reload.kbc')
+        compile_knowledge_base(self.json_path, path)
+        retriever = KnowledgeRetriever(path)
+
+        entries = [dict(entry) for entry in self.entries[1:]]
+        entries[0]['description'] += "新增的说明。"
+        changed_path = os.path.join(self.workdir, 'changed.json')
+        with open(changed_path, 'w', encoding='utf-8') as f:
+            json.dump({'data': entries}, f, ensure_ascii=False)
+        compile_knowledge_base(changed_path, path)
+        changes = retriever.reload_knowledge_base()
+        self.check("Compiled reloads count the changed entries",
+                   changes == {'added': 0, 'updated': 1, 'removed': 1, 'unchanged': len(entries) - 1}, str(changes))
+
+    def test_bounded_caches(self):
+        compiled = CompiledKnowledgeBase(self.compiled_path)
+        features = MappedFeatures(compiled.table('features', lambda value: value, key_type=bytes),
+                                  compiled.ngram_size, cache_size=10)
+        for position in range(len(features)):
+            features[position]
+        self.check("Decoded features are bounded", len(features._cache) <= 10, str(len(features._cache)))
+        self.check("Features are decoded again after eviction",
+                   features[0].title == self.entries[0]['title'] and features[-1].title == self.entries[-1]['title'])
+
+    def test_terms(self):
+        compiled = CompiledKnowledgeBase(self.compiled_path)
+        index = compiled.index()
+        decoded = len(compiled.entries._cache)
+        terms = index.terms()
+        self.check("Segmenter terms are read without decoding entries", len(compiled.entries._cache) == decoded,
+                   f"{len(compiled.entries._cache) - decoded} entries decoded")
+        expected = Segmenter.from_entries(self.entries)
+        segmenter = Segmenter.from_terms(terms)
+        self.check("Compiled terms give the same dictionary",
+                   segmenter.trie.words == expected.trie.words and segmenter._log_probs == expected._log_probs)
+
+    def run_tests(self):
+        """
+        Run compiled knowledge base tests
+        """
+        print("===========================================")
+        print("Compiled Knowledge Base Test")
+        print("===========================================")
+
+        try:
+            self.test_retrieval_parity()
+            self.test_lookups()
+            self.test_stored_features()
+            self.test_concurrent_compilers()
+            self.test_reload()
+            self.test_bounded_caches()
+            self.test_terms()
+        finally:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestKBCompiler()
+    sys.exit(0 if test.run_tests() else 1)
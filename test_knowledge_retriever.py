@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for indexed knowledge retrieval against brute-force scoring
+"""
+
+import copy
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from kb_watcher import KnowledgeBaseWatcher
+from knowledge_index import COMMON_QUESTIONS, INTENT_CUE_WORDS, EntryFeatures, KnowledgeIndex
+from knowledge_retriever import KnowledgeRetriever
+from pattern_matcher import AhoCorasick
+from question_processor import QuestionProcessor
+from scorers import BM25Scorer
+
+# Question templates asked about every title and keyword of the knowledge base
+QUESTION_TEMPLATES = ['{term}是什么？', '为什么要{term}？', '{term}在什么时候？', '怎么{term}？', '在哪里{term}？',
+                      '春节{term}有什么讲究？']
+MISS_QUESTIONS = ['今天天气怎么样？', '推荐一部电影', '圣诞节在中国有什么习俗？']
+
+
+def reference_score(entry: dict, query: dict) -> float:
+    """
+    Score an entry the way retrieval did before the index, by scanning all of its fields.
+    """
+    keywords = query.get('keywords', [])
+    title = entry.get('title', '')
+    description = entry.get('description', '')
+    score = 0.0
+    for keyword in keywords:
+        if keyword in title:
+            score += 3.0
+            if keyword == title:
+                score += 2.0
+        if keyword in description:
+            score += 2.0
+        if keyword in entry.get('keywords', []):
+            score += 2.5
+        for scenario in entry.get('scenarios', []):
+            if keyword in scenario:
+                score += 1.5
+
+    cue_words = INTENT_CUE_WORDS.get(query.get('intent', ''), [])
+    if any(cue_word in description for cue_word in cue_words):
+        score += 1.5
+
+    for question, entry_id in COMMON_QUESTIONS.items():
+        if question in query.get('original_question', '') or question in query.get('cleaned_question', ''):
+            if entry.get('id') == entry_id:
+                score += 5.0
+    return score
+
+
+def reference_rank(entries: list, query: dict) -> list:
+    """
+    Rank every entry with a positive reference_score, knowledge base order on ties.
+    """
+    scored = [(reference_score(entry, query), position) for position, entry in enumerate(entries)]
+    scored = [item for item in scored if item[0] > 0]
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [entries[position] for _, position in scored]
+
+
+def reference_bm25(entries: list, query: dict, k1: float = 1.2, b: float = 0.75) -> dict:
+    """
+    Compute BM25 scores with field-boosted term frequencies straight from the formula.
+    """
+    lengths = [len(entry['title']) + len(entry['description']) + sum(len(scenario) for scenario in entry['scenarios'])
+               + sum(len(keyword) for keyword in set(entry['keywords'])) for entry in entries]
+    avg_length = sum(lengths) / len(lengths)
+    scores = {}
+    keywords = query.get('keywords', [])
+    for term in set(keywords):
+        frequencies = {}
+        for position, entry in enumerate(entries):
+            tf = (3.0 * entry['title'].count(term) + 2.0 * entry['description'].count(term)
+                  + 1.5 * sum(scenario.count(term) for scenario in entry['scenarios'])
+                  + (2.5 if term in entry['keywords'] else 0.0))
+            if tf:
+                frequencies[position] = tf
+        idf = math.log(1 + (len(entries) - len(frequencies) + 0.5) / (len(frequencies) + 0.5))
+        for position, tf in frequencies.items():
+            norm = k1 * (1 - b + b * lengths[position] / avg_length)
+            scores[position] = scores.get(position, 0.0) + idf * keywords.count(term) * (k1 + 1) * tf / (tf + norm)
+
+    for question, entry_id in COMMON_QUESTIONS.items():
+        if question in query.get('original_question', '') or question in query.get('cleaned_question', ''):
+            for position, entry in enumerate(entries):
+                if entry['id'] == entry_id:
+                    scores[position] = scores.get(position, 0.0) + 5.0
+    return scores
+
+
+def reference_related(entries: list, entry_id: str, hops: int) -> list:
+    """
+    Follow related links by scanning all entries, nearer hops first and knowledge base order within a hop.
+    """
+    def neighbours(position):
+        related_ids = entries[position].get('related', [])
+        return [other for other, entry in enumerate(entries) if entry.get('id') in related_ids]
+
+    targets = [position for position, entry in enumerate(entries) if entry.get('id') == entry_id]
+    if not targets:
+        return []
+    related = neighbours(targets[0])
+    visited = {targets[0]} | set(related)
+    frontier = related
+    for _ in range(hops - 1):
+        frontier = sorted({other for position in frontier for other in neighbours(position)} - visited)
+        visited.update(frontier)
+        related = related + frontier
+    return [entries[position] for position in related]
+
+
+class TestKnowledgeRetriever:
+    """
+    Test class for the knowledge retriever
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        self.workdir = tempfile.mkdtemp()
+        self.knowledge_base_path = os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
+        with open(self.knowledge_base_path, 'r', encoding='utf-8') as f:
+            self.knowledge_base = json.load(f)
+        self.entries = self.knowledge_base['data']
+        self.retriever = KnowledgeRetriever(self.knowledge_base_path)
+
+        processor = QuestionProcessor()
+        terms = [entry['title'] for entry in self.entries] + [keyword for entry in self.entries
+                                                              for keyword in entry['keywords']]
+        questions = [template.format(term=term) for term in terms for template in QUESTION_TEMPLATES]
+        self.queries = [processor.process_question(question) for question in questions + MISS_QUESTIONS]
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    def write_knowledge_base(self, name: str, entries: list) -> str:
+        """
+        Write a knowledge base with the given entries into the work directory
+        """
+        path = os.path.join(self.workdir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(dict(self.knowledge_base, data=entries), f, ensure_ascii=False)
+        return path
+
+    def test_candidates(self):
+        index = self.retriever.index
+        probes = {'春', '春节', '习俗', '不存在的词', '寓意'}
+        for entry in self.entries:
+            probes.update([entry['title'], entry['title'][:2], entry['description'][5:9]])
+            probes.update(entry['keywords'])
+
+        missed = []
+        for keyword in sorted(probes):
+            candidates = index.candidates(keyword)
+            for position, entry in enumerate(self.entries):
+                text_fields = [entry['title'], entry['description']] + entry.get('scenarios', [])
+                if any(keyword in field for field in text_fields) and position not in candidates:
+                    missed.append((keyword, position))
+        self.check("Candidates cover every substring match", not missed, str(missed[:3]))
+
+    def test_ranking_parity(self):
+        wrong = [query['original_question'] for query in self.queries
+                 if self.retriever.retrieve(query, len(self.entries)) != reference_rank(self.entries, query)]
+        self.check("Indexed ranking equals brute-force ranking", not wrong, str(wrong[:3]))
+
+    def test_aho_corasick(self):
+        patterns = ['春节', '春', '节日', '日子', '过年', '年', '除夕夜', '夕']
+        matcher = AhoCorasick(patterns)
+        rng = random.Random(0)
+        alphabet = '春节日子过年除夕夜好'
+        wrong = []
+        for _ in range(500):
+            text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            occurrences = sorted((start, pattern) for pattern in patterns
+                                 for start in range(len(text)) if text.startswith(pattern, start))
+            found = sorted((start, matcher.patterns[index]) for start, index in matcher.iter_matches(text))
+            if found != occurrences or matcher.find_all(text) != {pattern for _, pattern in occurrences}:
+                wrong.append(text)
+        self.check("Aho-Corasick finds every occurrence, overlaps included", not wrong, str(wrong[:3]))
+
+    def test_common_questions(self):
+        index = self.retriever.index
+        wrong = []
+        for query in self.queries:
+            texts = (query['original_question'], query['cleaned_question'])
+            expected = sorted(position for question, entry_id in COMMON_QUESTIONS.items()
+                              if any(question in text for text in texts)
+                              for position, entry in enumerate(self.entries) if entry['id'] == entry_id)
+            if sorted(index.common_question_hits(*texts)) != expected:
+                wrong.append(query['original_question'])
+        self.check("Common question hits equal a scan of every phrase", not wrong, str(wrong[:3]))
+
+    def test_entry_features(self):
+        index = self.retriever.index
+        wrong = []
+        for position, entry in enumerate(self.entries):
+            features = index.features[position]
+            if (features.title, features.description, features.scenarios, features.keywords) != (
+                    entry['title'], entry['description'], tuple(entry['scenarios']), frozenset(entry['keywords'])):
+                wrong.append(entry['id'])
+            for intent, cue_words in INTENT_CUE_WORDS.items():
+                has_cue = any(cue_word in entry['description'] for cue_word in cue_words)
+                if features.has_intent_cue(intent) != has_cue or (position in index.intent_postings[intent]) != has_cue:
+                    wrong.append((entry['id'], intent))
+        self.check("Precomputed features and intent flags match the entries", not wrong, str(wrong[:3]))
+        self.check("Unknown intents earn no bonus", not EntryFeatures(self.entries[0]).has_intent_cue('what'))
+
+    def test_vector_scorer(self):
+        vector = KnowledgeRetriever(self.knowledge_base_path, 'numpy')
+        queries = self.queries + [
+            {'original_question': '', 'cleaned_question': '', 'intent': 'why', 'keywords': ['春节', '春节', '寓意']},
+            {'original_question': '', 'cleaned_question': '', 'intent': 'what', 'keywords': ['节习', '不存在的词']}
+        ]
+        wrong = [query['keywords'] for query in queries
+                 if vector.retrieve(query, len(self.entries)) != self.retriever.retrieve(query, len(self.entries))]
+        self.check("NumPy ranking equals the indexed ranking", not wrong, str(wrong[:3]))
+
+    def test_bm25(self):
+        scorer = BM25Scorer()
+        scorer.build(self.retriever.index)
+        queries = self.queries[::5] + [
+            {'original_question': '', 'cleaned_question': '', 'intent': 'why', 'keywords': ['春节', '春节', '寓意']}
+        ]
+        wrong = []
+        for query in queries:
+            scores = scorer.score(query)
+            expected = reference_bm25(self.entries, query)
+            if scores.keys() != expected.keys() or any(
+                    abs(scores[position] - expected[position]) > 1e-9 for position in expected):
+                wrong.append(query['keywords'])
+        self.check("BM25 scores follow the formula", not wrong, str(wrong[:3]))
+
+    def test_reload(self):
+        path = self.write_knowledge_base('reload.json', self.entries)
+        retriever = KnowledgeRetriever(path)
+        old_index = retriever.index
+
+        changed = dict(self.entries[10], description=self.entries[10]['description'] + "新增的说明。")
+        added = {'id': 'new-entry', 'title': '测试新条目', 'description': '新条目', 'keywords': ['测试新条目'],
+                 'scenarios': [], 'related': []}
+        self.write_knowledge_base('reload.json', self.entries[:10] + [changed] + self.entries[12:] + [added])
+        changes = retriever.reload_knowledge_base()
+        self.check("Reload counts the changed entries",
+                   changes == {'added': 1, 'updated': 1, 'removed': 1, 'unchanged': len(self.entries) - 2},
+                   str(changes))
+        self.check("Features of unchanged entries are carried over",
+                   retriever.index.features[0] is old_index.features[0]
+                   and retriever.index.features[10] is not old_index.features[10])
+        query = {'original_question': '测试新条目', 'cleaned_question': '测试新条目', 'intent': 'what',
+                 'keywords': ['测试新条目']}
+        self.check("Reloaded entries are retrieved", retriever.retrieve(query)[:1] == [added]
+                   and all(entry['id'] != self.entries[11]['id'] for entry in retriever.knowledge_base['data']))
+
+    def test_incremental_reload(self):
+        path = self.write_knowledge_base('incremental.json', self.entries)
+        retriever = KnowledgeRetriever(path)
+        old_index = retriever.index
+        old_postings = copy.deepcopy((old_index.gram_postings, old_index.keyword_postings,
+                                      old_index.intent_postings, old_index.id_postings, old_index.related_graph))
+
+        # Edit entries in place, drop the last one and append a new one linking to an edited entry
+        entries = copy.deepcopy(self.entries[:-1])
+        entries[10]['description'] += "为什么要测试？因为要增量更新。"
+        entries[10]['keywords'].append('增量更新')
+        entries[20]['related'] = [self.entries[-1]['id'], entries[5]['id']]
+        entries.append({'id': 'new-entry', 'title': '测试新条目', 'description': '新条目在门上贴', 'keywords': ['增量更新'],
+                        'scenarios': ['测试'], 'related': [entries[10]['id']]})
+        self.write_knowledge_base('incremental.json', entries)
+        changes = retriever.reload_knowledge_base()
+        self.check("Incremental reload counts the changed entries",
+                   changes == {'added': 1, 'updated': 2, 'removed': 1, 'unchanged': len(entries) - 3},
+                   str(changes))
+
+        index = retriever.index
+        expected = KnowledgeIndex(entries)
+        touched = set()
+        for position in (10, 20, -1):
+            touched.update(old_index.features[position].ngrams, expected.features[position].ngrams)
+        untouched = [gram for gram in old_index.gram_postings if gram not in touched]
+        self.check("Unchanged postings are shared",
+                   untouched and all(index.gram_postings[gram] is old_index.gram_postings[gram] for gram in untouched))
+        self.check("Patched postings equal a full build",
+                   index.gram_postings == expected.gram_postings and index.keyword_postings == expected.keyword_postings
+                   and index.intent_postings == expected.intent_postings and index.id_postings == expected.id_postings
+                   and index.related_graph == expected.related_graph)
+        self.check("The previous index is left intact",
+                   (old_index.gram_postings, old_index.keyword_postings, old_index.intent_postings,
+                    old_index.id_postings, old_index.related_graph) == old_postings)
+        query = {'original_question': '增量更新', 'cleaned_question': '增量更新', 'intent': 'what',
+                 'keywords': ['增量更新']}
+        self.check("Patched entries are retrieved",
+                   [entry['id'] for entry in retriever.retrieve(query)] == [entries[10]['id'], 'new-entry']
+                   and retriever.get_related_entries('new-entry') == [entries[10]])
+
+    def test_watcher(self):
+        path = self.write_knowledge_base('watched.json', self.entries)
+        retriever = KnowledgeRetriever(path)
+        reloaded = threading.Event()
+        retriever.add_reload_listener(lambda changes: reloaded.set())
+
+        watcher = KnowledgeBaseWatcher(path, retriever.reload_knowledge_base)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"data": [')
+        failed = watcher.check()
+        self.write_knowledge_base('watched.json', self.entries[:50])
+        self.check("A half-written file is retried on the next poll",
+                   not failed and watcher.check() and len(retriever.knowledge_base['data']) == 50)
+
+        reloaded.clear()
+        retriever.start_watching(interval=0.05)
+        try:
+            self.write_knowledge_base('watched.json', self.entries[:10])
+            self.check("The watcher reloads a changed file",
+                       reloaded.wait(5) and len(retriever.knowledge_base['data']) == 10)
+        finally:
+            retriever.stop_watching()
+
+    def test_related_entries(self):
+        wrong = []
+        for entry in self.entries:
+            for hops in (1, 2, 3):
+                expected = reference_related(self.entries, entry['id'], hops)
+                if self.retriever.get_related_entries(entry['id'], None, hops) != expected:
+                    wrong.append((entry['id'], hops))
+            if self.retriever.get_related_entries(entry['id']) != reference_related(self.entries, entry['id'], 1)[:2]:
+                wrong.append((entry['id'], 'top 2'))
+        self.check("Related entries equal a scan of the related links", not wrong, str(wrong[:3]))
+        self.check("Ids are looked up directly",
+                   self.retriever.get_entry(self.entries[30]['id']) == self.entries[30]
+                   and self.retriever.get_entry('missing') is None
+                   and self.retriever.get_related_entries('missing') == [])
+
+    def run_tests(self):
+        """
+        Run knowledge retriever tests
+        """
+        print("===========================================")
+        print("Knowledge Retriever Test")
+        print("===========================================")
+
+        try:
+            self.test_candidates()
+            self.test_ranking_parity()
+            self.test_aho_corasick()
+            self.test_common_questions()
+            self.test_entry_features()
+            self.test_vector_scorer()
+            self.test_bm25()
+            self.test_reload()
+            self.test_incremental_reload()
+            self.test_watcher()
+            self.test_related_entries()
+        finally:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestKnowledgeRetriever()
+    sys.exit(0 if test.run_tests() else 1)
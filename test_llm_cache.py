@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the persistent LLM answer cache
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from llm_cache import LLMAnswerCache
+
+CONFIG = {'model': 'stub', 'temperature': 0.7}
+
+
+class TestLLMCache:
+    """
+    Test class for the LLM answer cache
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        self.workdir = tempfile.mkdtemp()
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    def test_keys(self):
+        cache = LLMAnswerCache(':memory:')
+        cache.put("腊八节是什么？", CONFIG, "回答")
+        self.check("Questions are normalized", cache.get("  腊八节是什么 ", CONFIG) == "回答")
+        self.check("Other model configurations miss", cache.get("腊八节是什么？", {**CONFIG, 'temperature': 0.2}) is None)
+        self.check("Keys and cache settings are ignored",
+                   cache.get("腊八节是什么？", {**CONFIG, 'api_key': 'secret', 'cache_ttl': 1}) == "回答")
+        context = [{'role': 'user', 'content': '春节'}]
+        self.check("Other dialogue contexts miss", cache.get("腊八节是什么？", CONFIG, context) is None)
+
+    def test_near_duplicates(self):
+        cache = LLMAnswerCache(':memory:', similarity_threshold=0.5)
+        cache.put("腊八节有什么习俗", CONFIG, "喝腊八粥")
+        self.check("Near-duplicate questions hit", cache.get("腊八节有什么习俗呢", CONFIG) == "喝腊八粥")
+        self.check("Different questions miss", cache.get("端午节吃什么", CONFIG) is None)
+        stats = cache.get_stats()
+        self.check("Near hits are counted", stats['near_hits'] == 1 and stats['misses'] == 1, str(stats))
+
+    def test_expiry_and_eviction(self):
+        cache = LLMAnswerCache(':memory:', ttl=0.05)
+        cache.put("问题一", CONFIG, "回答一")
+        time.sleep(0.1)
+        self.check("Expired answers miss", cache.get("问题一", CONFIG) is None)
+
+        cache = LLMAnswerCache(':memory:', max_entries=2)
+        for number in "一二三":
+            cache.put(f"问题{number}", CONFIG, f"回答{number}")
+            time.sleep(0.01)
+        self.check("Least recently used answers are evicted",
+                   cache.get("问题一", CONFIG) is None and cache.get_stats()['size'] == 2)
+
+    def test_persistence(self):
+        path = os.path.join(self.workdir, 'persisted.db')
+        cache = LLMAnswerCache(path, similarity_threshold=0.5)
+        cache.put("腊八节有什么习俗", CONFIG, "喝腊八粥")
+        cache.close()
+        reopened = LLMAnswerCache(path, similarity_threshold=0.5)
+        self.check("Answers survive a restart",
+                   reopened.get("腊八节有什么习俗", CONFIG) == "喝腊八粥"
+                   and reopened.get("腊八节有什么习俗呢", CONFIG) == "喝腊八粥")
+        reopened.close()
+
+    def test_batched_touches(self):
+        cache = LLMAnswerCache(':memory:', touch_flush_size=50)
+        questions = [f"第{i}个问题" for i in range(50)]
+        for question in questions:
+            cache.put(question, CONFIG, "回答")
+        statements = []
+        cache._conn.set_trace_callback(statements.append)
+        for question in questions[:49] * 3:
+            cache.get(question, CONFIG)
+        updates = [statement for statement in statements if statement.startswith('UPDATE')]
+        self.check("Hits do not write one by one", not updates and 'COMMIT' not in statements, str(statements[-1:]))
+        cache.get(questions[49], CONFIG)
+        updates = [statement for statement in statements if statement.startswith('UPDATE')]
+        self.check("Buffered last uses are written in one batch", len(updates) == 50 and not cache._touches,
+                   f"{len(updates)} rows")
+
+    def test_eviction_order(self):
+        cache = LLMAnswerCache(':memory:', max_entries=2, touch_flush_size=1000)
+        cache.put("问题一", CONFIG, "回答一")
+        time.sleep(0.01)
+        cache.put("问题二", CONFIG, "回答二")
+        time.sleep(0.01)
+        # Only buffered: the first answer is now the most recently used
+        cache.get("问题一", CONFIG)
+        cache.put("问题三", CONFIG, "回答三")
+        self.check("Eviction sees buffered last uses",
+                   cache.get("问题一", CONFIG) == "回答一" and cache.get("问题二", CONFIG) is None)
+
+    def test_close_flushes(self):
+        path = os.path.join(self.workdir, 'answers.db')
+        cache = LLMAnswerCache(path)
+        cache.put("问题一", CONFIG, "回答一")
+        stored = sqlite3.connect(path).execute('SELECT last_used FROM answers').fetchone()[0]
+        time.sleep(0.01)
+        cache.get("问题一", CONFIG)
+        cache.close()
+        flushed = sqlite3.connect(path).execute('SELECT last_used FROM answers').fetchone()[0]
+        self.check("Closing writes the buffered last uses", flushed > stored)
+
+    def test_running_size(self):
+        path = os.path.join(self.workdir, 'sized.db')
+        cache = LLMAnswerCache(path, ttl=0.2, max_entries=3)
+        statements = []
+        cache._conn.set_trace_callback(statements.append)
+        for number in "一二三四":
+            cache.put(f"问题{number}", CONFIG, f"回答{number}")
+        cache.put("问题四", CONFIG, "新回答")
+        counts = [statement for statement in statements if 'COUNT' in statement]
+        self.check("Inserts do not count the table", not counts, str(counts[:1]))
+
+        stored = sqlite3.connect(path).execute('SELECT COUNT(*) FROM answers').fetchone()[0]
+        self.check("Running size follows inserts, replacements and evictions",
+                   cache.get_stats()['size'] == stored == 3, f"{cache.get_stats()['size']} vs {stored}")
+        time.sleep(0.3)
+        cache.get("问题四", CONFIG)
+        self.check("Expired answers leave the running size", cache.get_stats()['size'] == 2)
+        cache.close()
+
+        reopened = LLMAnswerCache(path, ttl=0)
+        size = reopened.get_stats()['size']
+        reopened.clear()
+        self.check("Running size is read on open and reset by clear",
+                   size == 2 and reopened.get_stats()['size'] == 0, str(size))
+        reopened.close()
+
+    def test_backend_opt_in(self):
+        from llm_backend import LLMBackend
+        environ = dict(os.environ)
+        try:
+            os.environ['OPENAI_API_KEY'] = 'test-key'
+            os.environ.pop('LLM_CACHE_PATH', None)
+            self.check("The backend has no answer cache by default", LLMBackend().answer_cache is None)
+            path = os.path.join(self.workdir, 'backend.db')
+            os.environ['LLM_CACHE_PATH'] = path
+            cache = LLMBackend().answer_cache
+            self.check("LLM_CACHE_PATH enables the answer cache", cache is not None and cache.path == path)
+            cache.close()
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+
+    def run_tests(self):
+        """
+        Run LLM answer cache tests
+        """
+        print("===========================================")
+        print("LLM Answer Cache Test")
+        print("===========================================")
+
+        try:
+            self.test_keys()
+            self.test_near_duplicates()
+            self.test_expiry_and_eviction()
+            self.test_persistence()
+            self.test_batched_touches()
+            self.test_eviction_order()
+            self.test_close_flushes()
+            self.test_running_size()
+            self.test_backend_opt_in()
+        finally:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestLLMCache()
+    sys.exit(0 if test.run_tests() else 1)
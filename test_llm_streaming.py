@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for LLM streaming against a local stub server
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from stub_llm_server import StubLLMServer
+
+KNOWLEDGE_BASE_PATH = os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
+# Asked of a fresh dialogue, this question has no knowledge base answer
+LLM_QUESTION = "推荐一部电影"
+KB_QUESTION = "年兽是什么？"
+STUB_ANSWER = "圣诞节在中国主要是商场促销和朋友聚会，年轻人会互送苹果，寓意平平安安。"
+# Streamed answers are cleaned like non-streamed ones
+EXPECTED_ANSWER = STUB_ANSWER[:-1] + "呢。"
+
+
+class TestLLMStreaming:
+    """
+    Test class for LLM streaming
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        self.stub = StubLLMServer(reply=lambda messages: STUB_ANSWER, chunk_size=4, chunk_delay=0.02)
+        self.stub.start()
+
+        # Point the backend at the stub server, with a throwaway answer cache
+        os.environ['OPENAI_API_KEY'] = 'test-key'
+        os.environ['OPENAI_API_BASE'] = self.stub.base_url
+        os.environ['LLM_CACHE_PATH'] = ':memory:'
+
+        from llm_backend import LLMBackend
+        self.backend = LLMBackend()
+        self.backend.answer_cache = None
+
+        from rag_controller import RAGController
+        self.controller = RAGController(KNOWLEDGE_BASE_PATH)
+        self.controller.llm_backend.answer_cache = None
+
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    def test_single_flight(self):
+        requests_before = self.stub.request_count
+        outputs = {}
+
+        def consume(name, delay):
+            time.sleep(delay)
+            outputs[name] = ''.join(self.backend.generate_answer("圣诞节在中国有什么习俗？", stream=True))
+
+        # Ten callers at once, plus one joining after the first chunks arrived
+        threads = [threading.Thread(target=consume, args=(i, 0.0)) for i in range(10)]
+        threads.append(threading.Thread(target=consume, args=('late', 0.15)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        requests = self.stub.request_count - requests_before
+        self.check("Single upstream call", requests == 1, f"{requests} call(s) for {len(threads)} callers")
+        self.check("Every caller got the full answer", all(output == EXPECTED_ANSWER for output in outputs.values()),
+                   f"{len(outputs)} outputs")
+        self.check("Late joiner replayed buffered chunks", outputs.get('late') == EXPECTED_ANSWER)
+
+        calls_before = self.backend.monitoring['total_calls']
+        ''.join(self.backend.generate_answer("圣诞节在中国有什么习俗？", stream=True))
+        self.check("Finished streams are not reused", self.stub.request_count - requests_before == 2)
+        self.check("A stream counts as one call", self.backend.monitoring['total_calls'] - calls_before == 1)
+
+    def test_abandoned_leader(self):
+        requests_before = self.stub.request_count
+
+        leader = self.backend.generate_answer("万圣节为什么要讨糖？", stream=True)
+        first = next(leader)
+        follower = self.backend.generate_answer("万圣节为什么要讨糖？", stream=True)
+        leader.close()
+
+        rest = ''.join(follower)
+        self.check("Follower continues after the leader leaves", rest == EXPECTED_ANSWER and EXPECTED_ANSWER.startswith(first),
+                   f"{self.stub.request_count - requests_before} call(s)")
+        self.check("No stream left in flight", self.backend.stream_coalescer.in_flight() == 0)
+
+    def test_stream_filter(self):
+        reply = self.stub.reply
+        self.stub.reply = lambda messages: "<think>用户问的是\n年兽</think>回答：年兽是传说中的怪兽。\n\n思考：补充一句\n人们用红色吓跑它。"
+        self.stub.chunk_size = 3
+
+        chunks = list(self.backend.generate_answer("年兽是什么？", stream=True))
+        streamed = ''.join(chunks)
+        expected = "年兽是传说中的怪兽。\n人们用红色吓跑它呢。"
+        self.check("Split tags and reasoning lines filtered", streamed == expected, f"{repr(streamed)} in {len(chunks)} chunks")
+
+        self.stub.reply = reply
+        self.stub.chunk_size = 4
+
+    def test_controller_stream(self):
+        from dialogue_manager import DialogueManager
+
+        dialogue = DialogueManager()
+        requests_before = self.stub.request_count
+        events = list(self.controller.process_query_stream(LLM_QUESTION, dialogue))
+        chunks = [event['chunk'] for event in events[1:] if event['type'] == 'chunk']
+        self.check("LLM stream starts with its source, then chunks",
+                   events[0] == {'type': 'source', 'source': 'llm'} and len(chunks) == len(events) - 1 > 1,
+                   f"{[event['type'] for event in events]}")
+        self.check("One upstream call per streamed question", self.stub.request_count - requests_before == 1,
+                   f"{self.stub.request_count - requests_before} call(s)")
+        turns = list(dialogue.dialogue_history)
+        self.check("Dialogue records the joined answer",
+                   len(turns) == 2 and turns[0]['content'] == LLM_QUESTION
+                   and turns[-1]['content'] == ''.join(chunks) == EXPECTED_ANSWER, repr(turns[-1]['content']))
+
+        dialogue = DialogueManager()
+        requests_before = self.stub.request_count
+        events = list(self.controller.process_query_stream(KB_QUESTION, dialogue))
+        self.check("Knowledge base stream is its source and one chunk",
+                   [event['type'] for event in events] == ['source', 'chunk']
+                   and events[0]['source'] == 'knowledge_base'
+                   and list(dialogue.dialogue_history)[-1]['content'] == events[1]['chunk'])
+        self.check("Knowledge base answers call no LLM", self.stub.request_count == requests_before)
+
+    def test_web_server_stream(self):
+        if importlib.util.find_spec('flask') is None or importlib.util.find_spec('flask_socketio') is None:
+            print("Flask or Flask-SocketIO not installed, skipping web server stream tests")
+            return
+
+        os.environ['KNOWLEDGE_BASE_PATH'] = KNOWLEDGE_BASE_PATH
+        from web_server import ChatServer
+        server = ChatServer()
+        server.rag_controller.llm_backend.answer_cache = None
+
+        requests_before = self.stub.request_count
+        response = server.app.test_client().post('/api/chat', json={'message': LLM_QUESTION, 'session_id': 'http'})
+        data = response.get_json()
+        history = server.session_store.get('http', create=False).get_history()
+        self.check("HTTP chat returns the streamed answer",
+                   data['source'] == 'llm' and data['response'] == EXPECTED_ANSWER
+                   and history[-1]['content'] == EXPECTED_ANSWER, str(data))
+        self.check("HTTP chat calls the LLM once", self.stub.request_count - requests_before == 1)
+
+        client = server.socketio.test_client(server.app)
+        client.get_received()
+        requests_before = self.stub.request_count
+        client.emit('user_message', {'message': LLM_QUESTION, 'session_id': 'socket'})
+        received = [message for message in client.get_received() if message['name'] != 'typing']
+        chunks = [message['args'][0] for message in received if message['name'] == 'bot_stream_chunk']
+        history = server.session_store.get('socket', create=False).get_history()
+        self.check("Socket chunks are streamed, then completed",
+                   len(chunks) == len(received) and chunks[-1]['is_complete']
+                   and not any(chunk['is_complete'] for chunk in chunks[:-1])
+                   and ''.join(chunk['chunk'] for chunk in chunks) == EXPECTED_ANSWER
+                   and history[-1]['content'] == EXPECTED_ANSWER, str([message['name'] for message in received]))
+        self.check("Socket chat calls the LLM once", self.stub.request_count - requests_before == 1)
+        client.disconnect()
+
+    def run_tests(self):
+        """
+        Run streaming tests
+        """
+        print("===========================================")
+        print("LLM Streaming Test")
+        print("===========================================")
+        print(f"Stub server: {self.stub.base_url}")
+        print("===========================================")
+
+        try:
+            self.test_single_flight()
+            self.test_abandoned_leader()
+            self.test_stream_filter()
+            self.test_controller_stream()
+            self.test_web_server_stream()
+        finally:
+            self.stub.stop()
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestLLMStreaming()
+    sys.exit(0 if test.run_tests() else 1)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for latency metrics
+"""
+
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from metrics import Histogram, Metrics
+from rag_controller import RAGController
+
+
+class TestMetrics:
+    """
+    Test class for latency metrics
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        self.knowledge_base_path = os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    def test_histogram(self):
+        histogram = Histogram(buckets=(0.01, 0.02, 0.05, 0.1))
+        for i in range(100):
+            histogram.observe((i + 1) / 1000)
+        histogram.observe(1.0)
+
+        p50, p99 = histogram.quantile(0.5), histogram.quantile(0.99)
+        self.check("Median is interpolated in its bucket", 0.04 < p50 < 0.06, f"p50={p50:.4f}")
+        self.check("Tail quantile stays within the bucket range", 0.05 < p99 <= 0.1, f"p99={p99:.4f}")
+        self.check("Empty histogram has no quantile", Histogram().quantile(0.5) is None)
+
+    def test_prometheus_text(self):
+        metrics = Metrics()
+        metrics.describe('demo_seconds', 'Demo latency')
+        metrics.observe('demo_seconds', 0.003, stage='retrieve')
+        metrics.increment('demo_total', source='knowledge_base')
+        text = metrics.render_prometheus()
+
+        self.check("Histogram buckets are cumulative", 'demo_seconds_bucket{stage="retrieve",le="+Inf"} 1' in text)
+        self.check("Quantiles are exported", 'demo_seconds_quantile{stage="retrieve",quantile="0.95"}' in text)
+        self.check("Counters are exported", 'demo_total{source="knowledge_base"} 1' in text)
+
+    def test_pipeline_stages(self):
+        controller = RAGController(self.knowledge_base_path, cache_size=0, metrics_enabled=True)
+        controller.process_query("为啥要倒贴福？")
+        ''.join(event.get('chunk', '') for event in controller.process_query_stream("守岁是干啥的？"))
+
+        stats = controller.metrics.get_stats()
+        stages = ['dialogue_manager', 'question_processor', 'knowledge_retriever', 'answer_generator']
+        self.check("Every stage is timed", all(stats.get(f"rag_stage_duration_seconds[{stage}]", {}).get('count') == 2
+                                               for stage in stages), str(sorted(stats)))
+        self.check("Stream latency is recorded",
+                   stats.get('rag_stream_first_chunk_seconds[knowledge_base]', {}).get('count') == 1 and
+                   stats.get('rag_stream_duration_seconds[knowledge_base]', {}).get('count') == 1)
+        self.check("Queries are counted by source", stats.get('rag_queries_total[knowledge_base]') == 2)
+
+    def test_disabled(self):
+        controller = RAGController(self.knowledge_base_path)
+        controller.process_query("为啥要倒贴福？")
+        self.check("Disabled metrics record nothing", controller.metrics.get_stats() == {})
+
+    def run_tests(self):
+        """
+        Run metrics tests
+        """
+        print("===========================================")
+        print("Metrics Test")
+        print("===========================================")
+
+        self.test_histogram()
+        self.test_prometheus_text()
+        self.test_pipeline_stages()
+        self.test_disabled()
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestMetrics()
+    sys.exit(0 if test.run_tests() else 1)
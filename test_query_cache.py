@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the query cache
+"""
+
+import os
+import sys
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from query_cache import QueryCache
+
+
+class TestQueryCache:
+    """
+    Test class for the query cache
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        self.knowledge_base_path = os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    def test_lru(self):
+        cache = QueryCache(max_size=2, ttl=0)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.check("The least recently used entry is evicted",
+                   cache.get('b') is None and cache.get('a') == 1 and cache.get('c') == 3
+                   and cache.get_stats()['evictions'] == 1, str(cache.get_stats()))
+
+        disabled = QueryCache(max_size=0)
+        disabled.put('a', 1)
+        self.check("A cache of size 0 stores nothing", disabled.get('a') is None)
+
+    def test_ttl(self):
+        cache = QueryCache(ttl=0.05)
+        cache.put('a', 1)
+        fresh = cache.get('a')
+        time.sleep(0.1)
+        self.check("Entries expire after the TTL",
+                   fresh == 1 and cache.get('a') is None and cache.get_stats()['size'] == 0)
+
+    def test_keys(self):
+        query = {'cleaned_question': '守岁是干啥的', 'intent': 'what', 'keywords': ['守岁', '除夕']}
+        reordered = dict(query, keywords=['除夕', '守岁'])
+        other_intent = dict(query, intent='why')
+        self.check("Keys ignore the keyword order but not the intent",
+                   QueryCache.make_key(query) == QueryCache.make_key(reordered)
+                   and QueryCache.make_key(query) != QueryCache.make_key(other_intent))
+
+    def test_generation(self):
+        cache = QueryCache()
+        generation = cache.generation
+        cache.clear()
+        cache.put('key', 'stale', generation)
+        self.check("Values computed before a clear are dropped", cache.get('key') is None)
+        cache.put('key', 'fresh', cache.generation)
+        self.check("Values of the current generation are stored", cache.get('key') == 'fresh')
+
+    def test_controller(self):
+        from rag_controller import RAGController
+        os.environ.pop('OPENAI_API_KEY', None)
+
+        controller = RAGController(self.knowledge_base_path)
+        first = controller.process_query("守岁是干啥的？")
+        second = controller.process_query("守岁是干啥的？")
+        stats = controller.get_cache_stats()
+        self.check("Repeated questions are answered from the cache",
+                   first == second and stats['hits'] == 1 and stats['size'] == 1, str(stats))
+        controller.knowledge_retriever.reload_knowledge_base()
+        self.check("Reloading the knowledge base clears the cache", controller.get_cache_stats()['size'] == 0)
+
+    def test_reload_during_query(self):
+        from rag_controller import RAGController
+        os.environ.pop('OPENAI_API_KEY', None)
+
+        controller = RAGController(self.knowledge_base_path)
+        retrieve = controller.knowledge_retriever.retrieve
+
+        def retrieve_then_reload(query, top_n=3):
+            entries = retrieve(query, top_n)
+            # The reload listener runs after this query retrieved from the old snapshot
+            controller._on_knowledge_base_reload({})
+            return entries
+
+        controller.knowledge_retriever.retrieve = retrieve_then_reload
+        controller.process_query("守岁是干啥的？")
+        self.check("Answers retrieved before a reload are not cached", controller.get_cache_stats()['size'] == 0)
+
+        controller.knowledge_retriever.retrieve = retrieve
+        controller.process_query("守岁是干啥的？")
+        self.check("Answers after the reload are cached", controller.get_cache_stats()['size'] == 1)
+
+    def run_tests(self):
+        """
+        Run query cache tests
+        """
+        print("===========================================")
+        print("Query Cache Test")
+        print("===========================================")
+
+        self.test_lru()
+        self.test_ttl()
+        self.test_keys()
+        self.test_generation()
+        self.test_controller()
+        self.test_reload_during_query()
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestQueryCache()
+    sys.exit(0 if test.run_tests() else 1)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for question normalization and intent classification
+"""
+
+import json
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from dialogue_manager import DialogueManager
+from pattern_matcher import LongestMatcher
+from question_processor import STOP_WORDS, QuestionProcessor
+from segmenter import BASE_LEXICON, knowledge_terms
+
+
+class TestQuestionProcessor:
+    """
+    Test class for the question processor
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        knowledge_base_path = os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
+        with open(knowledge_base_path, 'r', encoding='utf-8') as f:
+            self.entries = json.load(f)['data']
+        self.processor = QuestionProcessor()
+        self.processor.set_vocabulary(self.entries)
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    def test_longest_matcher(self):
+        matcher = LongestMatcher(['什么', '是什么', '什么时候', '为什么'])
+        matches = [matcher.patterns[index] for _, _, index in matcher.longest_matches('春节是什么时候为什么')]
+        self.check("Overlaps go to the longest pattern", matches == ['什么时候', '为什么'], str(matches))
+        self.check("Empty matcher finds nothing", LongestMatcher([]).longest_matches('什么') == [])
+
+    def test_cleaning(self):
+        cleaned = self.processor._clean_question("  ＱＱ红包？怎么抢！（急）  ")
+        self.check("Widths are folded and punctuation removed", cleaned == 'QQ红包 怎么抢 急', repr(cleaned))
+
+    def test_intent(self):
+        cases = {
+            "春节是什么时候？": 'when',
+            "为啥要倒贴福？": 'why',
+            "什么是福字，为什么倒贴？": 'why',
+            "饺子怎么包？": 'how',
+            "在什么地方看灯会？": 'where',
+            "守岁是干啥的？": 'what',
+            "拜年": 'what',
+        }
+        for question, expected in cases.items():
+            intent = self.processor.process_question(question)['intent']
+            self.check(f"Intent of {question}", intent == expected, intent)
+
+        # Without overlapping cues the intent is the one of the original first-match loop
+        baseline_patterns = {
+            'why': ['为什么', '为啥', '何故', '何以'],
+            'what': ['什么', '啥', '何谓', '是什么'],
+            'when': ['什么时候', '何时', '几时'],
+            'how': ['怎么', '如何', '怎样', '如何做'],
+            'where': ['哪里', '哪儿', '在什么地方', '位置']
+        }
+        questions = ["为何要守岁？", "干嘛要贴春联？", "红包给多少？", "哪个地方吃汤圆？", "年夜饭怎么样？",
+                     "什么样的灯笼好看？", "元宵节何时开始？", "饺子如何包？"]
+        mismatches = []
+        for question in questions:
+            cleaned = self.processor._clean_question(question)
+            expected = next((intent for intent, patterns in baseline_patterns.items()
+                             if any(pattern in cleaned for pattern in patterns)), 'what')
+            intent = self.processor.process_question(question)['intent']
+            if intent != expected:
+                mismatches.append((question, intent, expected))
+        self.check("Intent cues are the original ones", not mismatches, str(mismatches))
+
+    def test_keywords(self):
+        query = self.processor.process_question("春节是什么时候？")
+        self.check("Question words leave no fragments", query['keywords'] == ['春节'], str(query['keywords']))
+        query = self.processor.process_question("中秋吃什么")
+        self.check("Year-related words are kept", query['keywords'] == ['中秋'], str(query['keywords']))
+
+        # The original extractor split the question on whitespace once question words were removed; with
+        # the words already separated, segmenting must drop only what it dropped
+        baseline_patterns = [pattern for patterns in self.processor.question_patterns.values() for pattern in patterns]
+        year_related_words = ['新年', '春节', '除夕', '元宵', '清明', '端午', '七夕', '中秋', '重阳']
+        # Question words themselves are cues, 什么时候 no longer leaves 时候 behind
+        terms = sorted(term for term in set(BASE_LEXICON) | set(knowledge_terms(self.entries))
+                       if not any(pattern in term for pattern in baseline_patterns))
+        templates = ['{term} 是 什么', '为什么 要 {term}', '{term} 有 什么 讲究', '那 {term} 呢', '{term} 怎么 过']
+        mismatches = []
+        for question in (template.format(term=term) for term in terms for template in templates):
+            keyword_question = question
+            for pattern in baseline_patterns:
+                keyword_question = keyword_question.replace(pattern, '')
+            expected = [word for word in keyword_question.split() if word not in STOP_WORDS and len(word) > 1]
+            expected += sorted((word for word in year_related_words if word in question and word not in expected),
+                               key=question.find)
+            keywords = self.processor.process_question(question)['keywords']
+            if keywords != list(dict.fromkeys(expected)):
+                mismatches.append((question, keywords, expected))
+        self.check("Keywords are the ones of the original extractor", not mismatches,
+                   f"{len(mismatches)} mismatches, e.g. {mismatches[:3]}")
+
+    def test_turn_analysis(self):
+        dialogue = DialogueManager()
+        dialogue.add_turn('user', "守岁是干啥的？")
+        # The stored analysis is used as is, the long answer is not segmented again
+        dialogue.add_turn('system', "守岁就是除夕夜熬夜迎接新年。" * 200,
+                          {'keywords': ['守岁', '年兽'], 'entry_ids': ['shou-sui']})
+        query = self.processor.process_question("那它有什么讲究？", dialogue.get_recent_context())
+        self.check("Follow-ups borrow the stored keywords", query['keywords'] == ['讲究', '守岁', '年兽'],
+                   str(query['keywords']))
+        self.check("Entry ids of the answer are passed on", query['recent_context']['entry_ids'] == ['shou-sui'])
+
+        # Turns without analysis still work
+        dialogue.add_turn('system', "拜年要说吉祥话。")
+        query = self.processor.process_question("那它有什么讲究？", dialogue.get_recent_context())
+        self.check("Turns without analysis are segmented", '拜年' in query['keywords'], str(query['keywords']))
+
+        misses = self.processor.segmenter.cache_info().misses
+        analysis = self.processor.analyze_turn("春节" + "。".join(f"第{i}段很长的回答" for i in range(2000)))
+        self.check("Turn analysis stops after the first keywords",
+                   len(analysis['keywords']) == 5 and self.processor.segmenter.cache_info().misses - misses < 10,
+                   str(analysis))
+        self.check("History hides the analysis", all('analysis' not in turn for turn in dialogue.get_history()))
+
+    def test_controller_turns(self):
+        from rag_controller import RAGController
+        os.environ.pop('OPENAI_API_KEY', None)
+
+        knowledge_base_path = os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
+        controller = RAGController(knowledge_base_path)
+        controller.process_query("守岁是干啥的？")
+        controller.process_query("守岁是干啥的？")
+        user_turn, system_turn = list(controller.dialogue_manager.dialogue_history)[-2:]
+        self.check("Cached answers keep their entry ids", system_turn['analysis']['entry_ids'][:1] == ['shou-sui'],
+                   str(system_turn.get('analysis')))
+        self.check("User turns store intent and keywords",
+                   user_turn['analysis'] == {'keywords': ['守岁'], 'intent': 'what'}, str(user_turn.get('analysis')))
+
+    def run_tests(self):
+        """
+        Run question processor tests
+        """
+        print("===========================================")
+        print("Question Processor Test")
+        print("===========================================")
+
+        self.test_longest_matcher()
+        self.test_cleaning()
+        self.test_intent()
+        self.test_keywords()
+        self.test_turn_analysis()
+        self.test_controller_turns()
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestQuestionProcessor()
+    sys.exit(0 if test.run_tests() else 1)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the word segmenter
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from question_processor import QuestionProcessor
+from segmenter import DoubleArrayTrie, Segmenter
+
+
+class TestSegmenter:
+    """
+    Test class for the word segmenter
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        self.knowledge_base_path = os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
+        with open(self.knowledge_base_path, 'r', encoding='utf-8') as f:
+            self.knowledge_base = json.load(f)
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    def test_trie(self):
+        words = ['春', '春节', '春节快乐', '节日', '贴福', '倒贴福', 'ab']
+        trie = DoubleArrayTrie(words)
+        found = [trie.words[word_id] for _, word_id in trie.prefixes('春节快乐吗')]
+        self.check("Prefix lookup finds every dictionary prefix", found == ['春', '春节', '春节快乐'], str(found))
+        self.check("Membership matches the word list",
+                   all(word in trie for word in words) and '春节快' not in trie and '福' not in trie and '' not in trie)
+        self.check("Empty dictionary finds nothing", list(DoubleArrayTrie([]).prefixes('春节')) == [])
+
+    def test_segmentation(self):
+        segmenter = Segmenter.from_entries(self.knowledge_base['data'])
+        cases = {
+            '为啥要倒贴福': ['为啥', '要', '倒贴福'],
+            '春节为什么要放鞭炮': ['春节', '为什么', '要', '放鞭炮'],
+            '什么时候贴春联': ['什么时候', '贴', '春联'],
+            'QQ红包2024': ['QQ', '红包', '2024'],
+        }
+        for text, expected in cases.items():
+            words = segmenter.cut(text)
+            self.check(f"Segments {text}", words == expected, str(words))
+
+        before = segmenter.cache_info()
+        segmenter.cut('为啥要倒贴福')
+        after = segmenter.cache_info()
+        self.check("Repeated questions hit the LRU cache", after.hits == before.hits + 1 and after.misses == before.misses)
+
+    def test_keywords(self):
+        processor = QuestionProcessor()
+        processor.set_vocabulary(self.knowledge_base['data'])
+        query = processor.process_question("为啥要倒贴福？")
+        self.check("Keywords are words, not the sentence", query['keywords'] == ['倒贴福'], str(query['keywords']))
+        query = processor.process_question("守岁是干啥的？")
+        self.check("Question words are dropped", query['keywords'] == ['守岁'], str(query['keywords']))
+
+    def test_controller(self):
+        from rag_controller import RAGController
+        os.environ.pop('OPENAI_API_KEY', None)
+
+        workdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(workdir, 'kb.json')
+            shutil.copy(self.knowledge_base_path, path)
+            controller = RAGController(path)
+            for question in ["为啥要倒贴福？", "守岁是干啥的？", "春节为什么要放鞭炮？"]:
+                _, source = controller.process_query(question)
+                self.check(f"Answered from the knowledge base: {question}", source == 'knowledge_base', source)
+
+            # Reloading adds the new entry's terms to the dictionary
+            knowledge_base = json.loads(json.dumps(self.knowledge_base))
+            knowledge_base['data'].append({
+                'id': 'ice-lantern', 'title': '冰灯会', 'description': '冰灯会是北方冬季的灯会。',
+                'keywords': ['冰灯会', '冰雕'], 'scenarios': [], 'related': []
+            })
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(knowledge_base, f, ensure_ascii=False)
+            self.check("New terms are unknown before reload", '冰雕' not in controller.question_processor.segmenter.trie)
+            controller.reload_knowledge_base()
+            query = controller.question_processor.process_question("冰灯会有冰雕吗")
+            self.check("Reload refreshes the vocabulary", query['keywords'] == ['冰灯会', '冰雕'], str(query['keywords']))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run_tests(self):
+        """
+        Run segmenter tests
+        """
+        print("===========================================")
+        print("Segmenter Test")
+        print("===========================================")
+
+        self.test_trie()
+        self.test_segmentation()
+        self.test_keywords()
+        self.test_controller()
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestSegmenter()
+    sys.exit(0 if test.run_tests() else 1)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for the session stores, against a local Redis stand-in
+"""
+
+import os
+import sys
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from rag_controller import RAGController
+from session_store import InMemorySessionStore, create_session_store
+from stub_redis_server import StubRedisServer
+
+
+class TestSessionStore:
+    """
+    Test class for session stores
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        self.redis = StubRedisServer(password='secret')
+        self.redis.start()
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    def test_memory_lru(self):
+        store = InMemorySessionStore(max_sessions=3, idle_ttl=0)
+        for session_id in ['a', 'b', 'c']:
+            dialogue = store.get(session_id)
+            dialogue.add_turn('user', session_id)
+            store.save(session_id, dialogue)
+        store.get('a')
+        store.save('d', store.get('d'))
+
+        self.check("Memory store evicts least recently used", store.session_ids() == ['c', 'a', 'd'],
+                   str(store.session_ids()))
+        self.check("Unknown sessions are not created on lookup", store.get('b', create=False) is None)
+
+    def test_memory_ttl(self):
+        store = InMemorySessionStore(idle_ttl=0.1)
+        store.save('old', store.get('old'))
+        time.sleep(0.15)
+        store.save('new', store.get('new'))
+        self.check("Memory store expires idle sessions", store.session_ids() == ['new'],
+                   f"{store.get_stats()['expirations']} expired")
+
+    def test_memory_cap(self):
+        store = InMemorySessionStore(max_memory_bytes=4000, idle_ttl=0, max_history_length=4)
+        for i in range(20):
+            session_id = f"s{i}"
+            dialogue = store.get(session_id)
+            for _ in range(6):
+                dialogue.add_turn('user', '春节为什么要贴福字？' * 5)
+            store.save(session_id, dialogue)
+
+        stats = store.get_stats()
+        self.check("History length is bounded", len(store.get('s19').get_history()) == 4)
+        self.check("Memory stays under the cap", 0 < stats['memory_bytes'] <= 4000,
+                   f"{stats['memory_bytes']} bytes in {stats['sessions']} sessions")
+
+    def test_redis_round_trip(self):
+        store = create_session_store('redis', redis_url=self.redis.url, max_sessions=3, max_history_length=4)
+        store.client.execute('FLUSHDB')
+
+        dialogue = store.get('user-1')
+        dialogue.add_turn('user', '年兽是什么？')
+        dialogue.add_turn('system', '年兽是传说中的怪兽。')
+        store.save('user-1', dialogue)
+
+        restored = store.get('user-1')
+        self.check("Redis store restores the history",
+                   [turn['content'] for turn in restored.get_history()] == ['年兽是什么？', '年兽是传说中的怪兽。'])
+        self.check("Unknown sessions are not created on lookup", store.get('nobody', create=False) is None)
+
+        for session_id in ['user-2', 'user-3', 'user-4']:
+            store.save(session_id, store.get(session_id))
+        self.check("Redis store evicts least recently used", store.session_ids() == ['user-2', 'user-3', 'user-4'],
+                   str(store.session_ids()))
+        self.check("Evicted session data is deleted", store.client.execute('EXISTS', store._key('user-1')) == 0)
+        self.check("Delete removes the session", store.delete('user-2') and 'user-2' not in store.session_ids())
+        store.client.close()
+
+    def test_redis_ttl(self):
+        store = create_session_store('redis', redis_url=self.redis.url, idle_ttl=1)
+        store.client.execute('FLUSHDB')
+        store.save('short', store.get('short'))
+        time.sleep(1.1)
+        self.check("Redis store expires idle sessions",
+                   store.get('short', create=False) is None and store.session_ids() == [])
+        store.client.close()
+
+    def test_session_isolation(self):
+        knowledge_base_path = os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
+        controller = RAGController(knowledge_base_path)
+        store = InMemorySessionStore()
+
+        first = store.get('first')
+        controller.process_query("为啥要倒贴福？", first)
+        store.save('first', first)
+        second = store.get('second')
+        controller.process_query("年兽是什么？", second)
+        store.save('second', second)
+
+        self.check("Sessions keep separate histories",
+                   len(store.get('first').get_history()) == 2 and len(store.get('second').get_history()) == 2
+                   and store.get('first').get_history()[0]['content'] == "为啥要倒贴福？")
+        self.check("Controller history is untouched", controller.get_dialogue_history() == [])
+
+    def run_tests(self):
+        """
+        Run session store tests
+        """
+        print("===========================================")
+        print("Session Store Test")
+        print("===========================================")
+        print(f"Stub Redis server: {self.redis.url}")
+        print("===========================================")
+
+        try:
+            self.test_memory_lru()
+            self.test_memory_ttl()
+            self.test_memory_cap()
+            self.test_redis_round_trip()
+            self.test_redis_ttl()
+            self.test_session_isolation()
+        finally:
+            self.redis.stop()
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestSessionStore()
+    sys.exit(0 if test.run_tests() else 1)
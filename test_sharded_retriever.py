@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for sharded retrieval
+"""
+
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+
+# Add src directory and benchmarks to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+
+from knowledge_retriever import KnowledgeRetriever
+from question_processor import QuestionProcessor
+from sharded_retriever import ShardedRetriever, ShardPoolClosed, partition
+from synthetic_corpus import generate_corpus, generate_queries, write_corpus
+
+
+class TestShardedRetriever:
+    """
+    Test class for sharded retrieval
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, 'kb.json')
+        self.corpus = generate_corpus(3000)
+        write_corpus(self.corpus, self.path)
+
+        processor = QuestionProcessor()
+        self.queries = [processor.process_question(question) for question, _ in generate_queries(self.corpus, 400)]
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    @staticmethod
+    def ids(results):
+        return [[entry['id'] for entry in entries] for entries in results]
+
+    def test_partition(self):
+        ranges = partition(self.corpus['data'], 4)
+        covered = [position for start, end in ranges for position in range(start, end)]
+        self.check("Shards cover every entry once", covered == list(range(len(self.corpus['data']))),
+                   str(ranges))
+        self.check("Tiny bases get fewer shards", len(partition(self.corpus['data'][:2], 4)) <= 2)
+
+    def test_parity(self, sharded: ShardedRetriever):
+        single = KnowledgeRetriever(self.path)
+        expected = self.ids(single.retrieve(query) for query in self.queries)
+        self.check("Sharded retrieve matches single process",
+                   self.ids(sharded.retrieve(query) for query in self.queries) == expected)
+        self.check("Sharded retrieve_batch matches single process",
+                   self.ids(sharded.retrieve_batch(self.queries, top_n=3)) == expected)
+        self.check("Related entries are resolved in the parent",
+                   sharded.get_related_entries('fu-character') == single.get_related_entries('fu-character'))
+
+    def test_reload(self, sharded: ShardedRetriever):
+        corpus = generate_corpus(3000)
+        corpus['data'] = corpus['data'][:2000] + generate_corpus(4000, seed=1)['data'][3000:]
+        write_corpus(corpus, os.path.join(self.workdir, 'next.json'))
+        os.replace(os.path.join(self.workdir, 'next.json'), self.path)
+
+        # Queries keep being answered while the new pool is built and swapped in
+        errors = []
+        stop = threading.Event()
+
+        def query_loop():
+            while not stop.is_set():
+                try:
+                    sharded.retrieve(self.queries[0])
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        thread = threading.Thread(target=query_loop)
+        thread.start()
+        changes = sharded.reload_knowledge_base()
+        stop.set()
+        thread.join()
+
+        self.check("Reload reports the changes", changes['added'] == 1000 and changes['removed'] == 1000, str(changes))
+        self.check("Queries survive the pool swap", not errors, str(errors[:1]))
+
+        processor = QuestionProcessor()
+        queries = [processor.process_question(question) for question, _ in generate_queries(corpus, 200)]
+        single = KnowledgeRetriever(self.path)
+        self.check("Reloaded shards match single process",
+                   self.ids(sharded.retrieve_batch(queries)) == self.ids(single.retrieve_batch(queries)))
+
+        sharded.rebalance(2)
+        self.check("Rebalance changes the shard count", len(sharded.scorer.ranges) == 2 and
+                   self.ids(sharded.retrieve_batch(queries)) == self.ids(single.retrieve_batch(queries)))
+
+    def test_unsupported_scorer(self):
+        try:
+            ShardedRetriever(self.path, 2, scorer='bm25')
+            self.check("BM25 is rejected", False)
+        except ValueError:
+            self.check("BM25 is rejected", True)
+
+    def test_worker_death(self, sharded: ShardedRetriever):
+        single = KnowledgeRetriever(self.path)
+        expected = self.ids(single.retrieve(query) for query in self.queries[:50])
+        pool = sharded.scorer
+        os.kill(pool._workers[0].process.pid, signal.SIGKILL)
+        pool._workers[0].process.join(timeout=5)
+        results = self.ids(sharded.retrieve(query) for query in self.queries[:50])
+        self.check("A dead worker is restarted", pool.restarts == 1 and results == expected, f"{pool.restarts} restart(s)")
+
+    def test_concurrent_queries(self, sharded: ShardedRetriever):
+        single = KnowledgeRetriever(self.path)
+        expected = self.ids(single.retrieve(query) for query in self.queries)
+        results = {}
+
+        def query_loop(offset):
+            results[offset] = self.ids(sharded.retrieve(query) for query in self.queries[offset:] + self.queries[:offset])
+
+        threads = [threading.Thread(target=query_loop, args=(offset,)) for offset in (0, 100, 200, 300, 350, 399)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.check("Concurrent queries get their own replies",
+                   all(ranked == expected[offset:] + expected[:offset] for offset, ranked in results.items())
+                   and len(results) == len(threads))
+
+    def test_closed(self):
+        sharded = ShardedRetriever(self.path, num_shards=2)
+        sharded.close()
+        outcome = []
+
+        def query():
+            try:
+                sharded.retrieve(self.queries[0])
+                outcome.append('answered')
+            except ShardPoolClosed:
+                outcome.append('closed')
+
+        thread = threading.Thread(target=query, daemon=True)
+        thread.start()
+        thread.join(timeout=5)
+        self.check("Queries on a closed retriever fail instead of retrying", outcome == ['closed'], str(outcome))
+
+    def run_tests(self):
+        """
+        Run sharded retrieval tests
+        """
+        print("===========================================")
+        print("Sharded Retrieval Test")
+        print("===========================================")
+
+        self.test_partition()
+        sharded = ShardedRetriever(self.path, num_shards=3)
+        try:
+            self.test_parity(sharded)
+            self.test_concurrent_queries(sharded)
+            self.test_worker_death(sharded)
+            self.test_reload(sharded)
+            self.test_unsupported_scorer()
+            self.test_closed()
+        finally:
+            sharded.close()
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestShardedRetriever()
+    sys.exit(0 if test.run_tests() else 1)
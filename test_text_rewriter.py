@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test script for single-pass text rewriting
+"""
+
+import json
+import os
+import random
+import re
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from answer_generator import AnswerGenerator
+from llm_backend import LLMBackend
+from stream_filter import StreamFilter
+from text_rewriter import COLLOQUIAL_REPLACEMENTS, TextRewriter
+
+RAW_ANSWERS = [
+    "<think>用户问的是\n年兽</think>回答：年兽是怪兽。\n\n思考：补充一句\n人们  用红色吓跑它。",
+    "答：  可以的。",
+    "让我想想\n春节是正月初一。  ",
+    "分析过程：略\n\n\n好的呀。",
+    "我来回答：因此必须这样。",
+    "第一行\n\n\n第二行   结束。。",
+]
+
+
+class TestTextRewriter:
+    """
+    Test class for the text rewriter
+    """
+
+    def __init__(self):
+        """
+        Initialize test class
+        """
+        knowledge_base_path = os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
+        with open(knowledge_base_path, 'r', encoding='utf-8') as f:
+            self.entries = json.load(f)['data']
+        self.random = random.Random(7)
+        self.results = []
+
+    def check(self, name: str, passed: bool, detail: str = ''):
+        """
+        Record and print a test result
+        """
+        self.results.append(passed)
+        print(f"{name}: {'PASS' if passed else 'FAIL'} {detail}")
+
+    def chunkings(self, text: str, count: int = 50):
+        for _ in range(count):
+            cuts = sorted(self.random.sample(range(1, len(text)), min(len(text) - 1, self.random.randint(0, 8))))
+            yield [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+    def test_single_pass(self):
+        rewriter = TextRewriter({'可以': '可以啊', '可': '能', '啊': '呀'})
+        result = rewriter.rewrite('可以吗？可能啊')
+        self.check("Longest key wins and replacements are not rewritten", result == '可以啊吗？能能呀', result)
+
+        rewriter = TextRewriter(COLLOQUIAL_REPLACEMENTS)
+        texts = [entry['description'] for entry in self.entries] + ['此外因此也就是说需要注意的是必须应该']
+        mismatches = []
+        for text in texts:
+            expected = text
+            for formal, colloquial in COLLOQUIAL_REPLACEMENTS.items():
+                expected = expected.replace(formal, colloquial)
+            if rewriter.rewrite(text) != expected:
+                mismatches.append(text[:20])
+        self.check("Colloquial table matches the replace chain", not mismatches, str(mismatches[:3]))
+
+        rewriter = TextRewriter({}, collapse='。 ')
+        result = rewriter.rewrite('好。。。 你  好。')
+        self.check("Runs are collapsed", result == '好。 你 好。', result)
+        self.check("Empty rewriter keeps the text", TextRewriter({}).rewrite('原样') == '原样')
+
+    def test_stream(self):
+        rewriter = TextRewriter(dict(COLLOQUIAL_REPLACEMENTS, **{'需要': '要'}), collapse='。\n')
+        texts = ['也就是说需要注意的是此外。。。\n\n因此必须', '可以', '需要注意', '是因为。', '综上所述'] + \
+                [entry['description'] for entry in self.entries[:10]]
+        failures = []
+        for text in texts:
+            expected = rewriter.rewrite(text)
+            for chunks in self.chunkings(text):
+                stream = rewriter.stream()
+                streamed = ''.join(stream.feed(chunk) for chunk in chunks) + stream.flush()
+                if streamed != expected:
+                    failures.append((chunks, streamed))
+        self.check("Streams match whole-text rewriting for any chunking", not failures, str(failures[:1]))
+
+        stream = rewriter.stream()
+        held = stream.feed('要说也就')
+        self.check("Only possible key starts are held", held == '要说' and stream.flush() == '也就', held)
+
+    @staticmethod
+    def make_colloquial(answer: str) -> str:
+        # The replace chain of the answer generator before the rewriter
+        for formal, colloquial in COLLOQUIAL_REPLACEMENTS.items():
+            answer = answer.replace(formal, colloquial)
+        if not any(particle in answer for particle in ['啊', '呀', '呢', '吧', '嘛']):
+            answer = answer[:-1] + '呢。' if answer.endswith('。') else answer + '呢'
+        return re.sub(r'。+', '。', answer)
+
+    def test_answer_generator(self):
+        generator = AnswerGenerator()
+        raw_answers = ['守岁是一种习俗。。', '可以。。。', '必须早起'] + [
+            generator._generate_intent_based_answer(entry, intent, {'intent': intent})
+            for entry in self.entries for intent in generator.intent_templates
+        ] + [generator._generate_generic_answer(entry, {'intent': 'other'}) for entry in self.entries]
+        mismatches = [answer for answer in raw_answers
+                      if generator._make_colloquial(answer) != self.make_colloquial(answer)]
+        self.check("Colloquial answers equal the replace chain output", not mismatches, str(mismatches[:3]))
+        result = generator._make_colloquial('守岁是一种习俗。。')
+        self.check("'。' is collapsed after the particle is added", result == '守岁是一种习俗。呢。', result)
+
+    def test_llm_parity(self):
+        backend = LLMBackend.__new__(LLMBackend)
+        failures = []
+        for raw in RAW_ANSWERS:
+            expected = backend._post_process_answer(raw)
+            for chunks in self.chunkings(raw):
+                stream_filter = StreamFilter(clean=True)
+                streamed = ''.join(stream_filter.feed(chunk) for chunk in chunks) + stream_filter.flush()
+                if streamed != expected:
+                    failures.append((chunks, streamed, expected))
+        self.check("Streamed and complete LLM answers match", not failures, str(failures[:1]))
+        result = backend._post_process_answer(RAW_ANSWERS[0])
+        self.check("Line breaks after an answer prefix are kept", result == "年兽是怪兽。\n人们 用红色吓跑它呢。",
+                   repr(result))
+
+    def run_tests(self):
+        """
+        Run text rewriter tests
+        """
+        print("===========================================")
+        print("Text Rewriter Test")
+        print("===========================================")
+
+        self.test_single_pass()
+        self.test_stream()
+        self.test_answer_generator()
+        self.test_llm_parity()
+
+        print("\n" + "=" * 50)
+        print(f"Passed: {sum(self.results)}/{len(self.results)}")
+        return all(self.results)
+
+
+if __name__ == "__main__":
+    test = TestTextRewriter()
+    sys.exit(0 if test.run_tests() else 1)
@@ -12,7 +12,7 @@ import json
 import uuid
 from datetime import datetime
 from typing import Dict, List, Optional
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_socketio import SocketIO, emit
 from werkzeug.exceptions import HTTPException
 
@@ -20,6 +20,7 @@ from werkzeug.exceptions import HTTPException
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from rag_controller import RAGController
+from session_store import create_session_store
 
 class ChatServer:
     """Chat server for Chinese New Year customs QA system."""
@@ -32,11 +33,35 @@ class ChatServer:
         self.socketio = SocketIO(self.app, cors_allowed_origins="*")
 
         # Initialize RAG controller
-        knowledge_base_path = os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
-        self.rag_controller = RAGController(knowledge_base_path)
-
-        # Session storage (use Redis in production)
-        self.sessions: Dict[str, List[Dict]] = {}
+        # KNOWLEDGE_BASE_PATH may point to a file compiled by src/kb_compiler.py,
+        # which every worker memory-maps instead of parsing
+        knowledge_base_path = os.getenv('KNOWLEDGE_BASE_PATH') or \
+            os.path.join(os.path.dirname(__file__), 'openspec', 'knowledge-base.json')
+        # METRICS_ENABLED=true records per-stage latency histograms served at /api/metrics
+        metrics_enabled = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+        # RETRIEVAL_SHARDS=N ranks in N worker processes, keeping retrieval CPU off the event loop
+        num_shards = int(os.getenv('RETRIEVAL_SHARDS', '0'))
+        self.rag_controller = RAGController(knowledge_base_path, metrics_enabled=metrics_enabled,
+                                            num_shards=num_shards)
+
+        # Reload the knowledge base in place when the file changes (disabled if 0)
+        watch_interval = float(os.getenv('KB_WATCH_INTERVAL', '0'))
+        if watch_interval > 0:
+            self.rag_controller.knowledge_retriever.start_watching(watch_interval)
+
+        # Batch endpoint limits
+        self.max_batch_size = int(os.getenv('BATCH_MAX_QUESTIONS', '10000'))
+        self.batch_workers = int(os.getenv('BATCH_LLM_WORKERS', '8'))
+
+        # Per-session dialogue state (SESSION_STORE=redis with REDIS_URL for a shared store)
+        self.session_store = create_session_store(
+            os.getenv('SESSION_STORE', 'memory'),
+            redis_url=os.getenv('REDIS_URL'),
+            max_sessions=int(os.getenv('SESSION_MAX_COUNT', '10000')),
+            max_memory_bytes=int(os.getenv('SESSION_MAX_MEMORY_MB', '64')) * 1024 * 1024,
+            idle_ttl=float(os.getenv('SESSION_IDLE_TTL', '3600')),
+            max_history_length=int(os.getenv('SESSION_MAX_HISTORY', '20'))
+        )
 
         # Register routes
         self._register_routes()
@@ -71,9 +96,20 @@ class ChatServer:
             return jsonify({
                 'status': 'healthy',
                 'service': 'chinese-new-year-customs-qa',
-                'llm_enabled': self.rag_controller.llm_enabled
+                'llm_enabled': self.rag_controller.llm_enabled,
+                'query_cache': self.rag_controller.get_cache_stats(),
+                'sessions': self.session_store.get_stats()
             })
 
+        @self.app.route('/api/metrics')
+        def metrics():
+            """Expose latency histograms in the Prometheus text format."""
+            if not self.rag_controller.metrics.enabled:
+                return jsonify({'error': 'Metrics are disabled'}), 404
+            return self.rag_controller.metrics.render_prometheus(), 200, {
+                'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'
+            }
+
         @self.app.route('/api/chat', methods=['POST'])
         def chat_http():
             """HTTP endpoint for chat (WebSocket alternative)."""
@@ -84,19 +120,24 @@ class ChatServer:
 
                 session_id = data.get('session_id', str(uuid.uuid4()))
                 message = data['message']
-                context = self.sessions.get(session_id, [])
 
-                # Process message
-                response = self.rag_controller.process_query(message)
+                # Process message (single pass, LLM fallback is called once)
+                dialogue = self.session_store.get(session_id)
+                source = None
+                chunks = []
+                for event in self.rag_controller.process_query_stream(message, dialogue):
+                    if event['type'] == 'source':
+                        source = event['source']
+                    else:
+                        chunks.append(event['chunk'])
+                response = ''.join(chunks)
 
                 # Store conversation
-                if session_id not in self.sessions:
-                    self.sessions[session_id] = []
-                self.sessions[session_id].append({'role': 'user', 'content': message})
-                self.sessions[session_id].append({'role': 'system', 'content': response})
+                self.session_store.save(session_id, dialogue)
 
                 return jsonify({
                     'response': response,
+                    'source': source,
                     'session_id': session_id,
                     'timestamp': datetime.now().isoformat()
                 })
@@ -104,18 +145,37 @@ class ChatServer:
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
 
+        @self.app.route('/api/chat/batch', methods=['POST'])
+        def chat_batch():
+            """Answer a batch of independent questions as ordered JSON lines."""
+            data = request.get_json(silent=True)
+            questions = data.get('questions') if isinstance(data, dict) else None
+            if not isinstance(questions, list) or not questions or \
+                    not all(isinstance(question, str) and question.strip() for question in questions):
+                return jsonify({'error': 'questions must be a non-empty list of strings'}), 400
+            if len(questions) > self.max_batch_size:
+                return jsonify({'error': f'At most {self.max_batch_size} questions per batch'}), 400
+
+            def generate():
+                for result in self.rag_controller.process_batch(questions, self.batch_workers):
+                    yield json.dumps(result, ensure_ascii=False) + '\n'
+
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
         @self.app.route('/api/history/<session_id>', methods=['GET'])
         def get_history(session_id: str):
             """Get conversation history for a session."""
-            history = self.sessions.get(session_id, [])
+            dialogue = self.session_store.get(session_id, create=False)
+            history = dialogue.get_history() if dialogue else []
             return jsonify({'history': history, 'session_id': session_id})
 
         @self.app.route('/api/sessions', methods=['GET'])
         def list_sessions():
             """List all active sessions."""
+            sessions = self.session_store.session_ids()
             return jsonify({
-                'sessions': list(self.sessions.keys()),
-                'count': len(self.sessions)
+                'sessions': sessions,
+                'count': len(sessions)
             })
 
         @self.app.errorhandler(HTTPException)
@@ -142,13 +202,10 @@ class ChatServer:
                     emit('error', {'error': 'Empty message'})
                     return
 
-                # Store conversation
-                if session_id not in self.sessions:
-                    self.sessions[session_id] = []
-                self.sessions[session_id].append({'role': 'user', 'content': message})
-
-                # Process message
-                response, source = self.rag_controller.process_query(message)
+                # Process message in a single pass; LLM answers are streamed from one upstream call
+                dialogue = self.session_store.get(session_id)
+                events = self.rag_controller.process_query_stream(message, dialogue)
+                source = next(events)['source']
 
                 # Check if response is from LLM
                 if source == 'llm':
@@ -156,7 +213,8 @@ class ChatServer:
                     emit('typing', {'session_id': session_id}, broadcast=True)
 
                     full_response = ""
-                    for chunk in self.rag_controller.llm_backend.generate_answer(message, self.sessions.get(session_id, []), stream=True):
+                    for event in events:
+                        chunk = event['chunk']
                         full_response += chunk
                         emit('bot_stream_chunk', {
                             'chunk': chunk,
@@ -170,17 +228,17 @@ class ChatServer:
                         'session_id': session_id,
                         'is_complete': True
                     })
-
-                    self.sessions[session_id].append({'role': 'system', 'content': full_response})
                 else:
                     # Use non-streaming response (knowledge base or fallback)
+                    response = ''.join(event['chunk'] for event in events)
                     emit('bot_message', {
                         'response': response,
                         'session_id': session_id,
                         'timestamp': datetime.now().isoformat()
                     })
 
-                    self.sessions[session_id].append({'role': 'system', 'content': response})
+                # Store conversation
+                self.session_store.save(session_id, dialogue)
 
             except Exception as e:
                 emit('error', {'error': str(e)})
@@ -200,8 +258,7 @@ class ChatServer:
         def handle_clear_history(data):
             """Clear conversation history for a session."""
             session_id = data.get('session_id', '')
-            if session_id and session_id in self.sessions:
-                del self.sessions[session_id]
+            if session_id and self.session_store.delete(session_id):
                 emit('history_cleared', {'session_id': session_id})
 
     def run(self, host: str = '0.0.0.0', port: int = 5000, debug: bool = False):